@@ -2,6 +2,7 @@
 # Further modified to be pure new numpy June 24th 2008
 
 "CDMS Variable objects, MaskedArray interface"
+import contextlib
 import numpy
 from numpy import character, float, float32, float64  # noqa
 from numpy import int, int8, int16, int32, int64, byte  # noqa
@@ -19,6 +20,8 @@ from cdms2.grid import AbstractRectGrid
 from cdms2.error import CDMSError
 # from numpy.ma import *
 from cdms2.axis import allclose as axisAllclose, TransientAxis, concatenate as axisConcatenate, take as axisTake
+from cdms2 import lazy
+from cdms2.lazy import Expression
 
 create_mask = make_mask_none
 e = numpy.e
@@ -26,6 +29,8 @@ pi = numpy.pi
 # NewAxis = numpy.oldnumeric.NewAxis
 newaxis = numpy.newaxis
 counter = 0
+# If true, elementwise operations and reductions return a lazy.Expression
+_deferred = False
 
 load = numpy.load
 dump = numpy.ndarray.dump
@@ -35,8 +40,17 @@ def fill_value(ar):
     return ar.fill_value
 
 
+def _evaluated(x):
+    """Return x, or its value if it is a deferred expression."""
+    if isinstance(x, Expression):
+        return x.compute()
+    return x
+
+
 def _makeMaskedArg(x):
     """If x is a variable, turn it into a TransientVariable."""
+    if isinstance(x, Expression):
+        return x.compute()
     if isinstance(x, AbstractVariable) and not isinstance(
             x, TransientVariable):
         return x.subSlice()
@@ -77,19 +91,28 @@ def _extractMetadata(a, axes=None, attributes=None,
 
 
 class var_unary_operation:
-    def __init__(self, mafunc):
+    def __init__(self, mafunc, elementwise=True):
         """
         Parameters
         ----------
 
-        var_unary_operation(mafunc)
+        var_unary_operation(mafunc, elementwise=True)
 
         mafunc is an numpy.ma masked_unary_function.
+        elementwise is false if the result does not have the shape of the
+        operand (e.g. nonzero). Such operations are never deferred, and
+        their result is returned as is, without the operand's metadata.
         """
         self.mafunc = mafunc
+        self.elementwise = elementwise
         self.__doc__ = mafunc.__doc__
 
     def __call__(self, a, **kwargs):
+        if not self.elementwise:
+            return self.mafunc(_makeMaskedArg(a), **kwargs)
+        if _deferred:
+            return lazy.Unary(self.mafunc, a, kwargs)
+        a = _evaluated(a)
         axes, attributes, id, grid = _extractMetadata(a)
         maresult = self.mafunc(_makeMaskedArg(a), **kwargs)
         return TransientVariable(
@@ -111,6 +134,7 @@ class var_unary_operation_with_axis:
 
     def __call__(self, a, axis=0, **kwargs):
         axis = _conv_axis_arg(axis)
+        a = _evaluated(a)
         ta = _makeMaskedArg(a)
         maresult = self.mafunc(ta, axis=axis, **kwargs)
         axes, attributes, id, grid = _extractMetadata(
@@ -280,6 +304,10 @@ class var_binary_operation:
         self.__doc__ = mafunc.__doc__
 
     def __call__(self, a, b, **kwargs):
+        if _deferred:
+            return lazy.Binary(self.mafunc, a, b, kwargs)
+        a = _evaluated(a)
+        b = _evaluated(b)
         id = "variable_%i" % TransientVariable.variable_count
         TransientVariable.variable_count += 1
         axes = commonDomain(a, b)
@@ -419,6 +447,43 @@ def set_print_limit(limit=numpy.inf):
     set_printoptions(threshold=limit)
 
 
+def setDeferred(value):
+    """Set deferred evaluation of elementwise operations and reductions.
+
+    When on, elementwise operations and the sum and average reductions return
+    a lazy.Expression instead of a TransientVariable. The expression is
+    evaluated in blocks, without full size temporaries, by its compute()
+    method, or when it is passed to an operation that is not deferred: any
+    MV2 function called while deferred mode is off, or a non-elementwise
+    function such as nonzero.
+    Operands are checked for compatible shapes but, unlike immediate
+    operations, not for matching axis values.
+    """
+    global _deferred
+    _deferred = bool(value)
+
+
+def getDeferred():
+    """Return true if elementwise operations and reductions are deferred."""
+    return _deferred
+
+
+@contextlib.contextmanager
+def deferred():
+    """Context manager for deferred evaluation, see setDeferred::
+
+        with MV2.deferred():
+            anomaly = (a - b) * w / MV2.sum(w)
+        result = anomaly.compute()
+    """
+    previous = _deferred
+    setDeferred(1)
+    try:
+        yield
+    finally:
+        setDeferred(previous)
+
+
 subtract.reduce = None
 log = var_unary_operation(numpy.ma.log)
 log10 = var_unary_operation(numpy.ma.log10)
@@ -434,7 +499,7 @@ sinh = var_unary_operation(numpy.ma.sinh)
 cosh = var_unary_operation(numpy.ma.cosh)
 tanh = var_unary_operation(numpy.ma.tanh)
 fabs = var_unary_operation(numpy.ma.fabs)
-nonzero = var_unary_operation(numpy.ma.nonzero)
+nonzero = var_unary_operation(numpy.ma.nonzero, elementwise=False)
 around = var_unary_operation(numpy.ma.around)
 floor = var_unary_operation(numpy.ma.floor)
 ceil = var_unary_operation(numpy.ma.ceil)
@@ -481,9 +546,18 @@ def count(a, axis=None):
 
 
 def sum(a, axis=None, fill_value=0, dtype=None):
-    "Sum of elements along a certain axis."
+    """Sum of elements along a certain axis.
+
+    Masked elements are skipped. If fill_value is not 0, they count as
+    fill_value instead, and the result is not masked.
+    """
     axis = _conv_axis_arg(axis)
+    if _deferred and fill_value == 0 and (axis is None or isinstance(axis, int)):
+        return lazy.Reduction('sum', a, axis, dtype)
+    a = _evaluated(a)
     ta = _makeMaskedArg(a)
+    if fill_value != 0:
+        ta = numpy.ma.filled(ta, fill_value)
     maresult = numpy.ma.sum(ta, axis, dtype=dtype)
     axes, attributes, id, grid = _extractMetadata(
         a, omit=axis, omitall=(axis is None))
@@ -504,6 +578,9 @@ def product(a, axis=0, dtype=None):
 
 def average(a, axis=None, weights=None, returned=False):
     axis = _conv_axis_arg(axis)
+    if _deferred and weights is None and not returned and (axis is None or isinstance(axis, int)):
+        return lazy.Reduction('average', a, axis)
+    a = _evaluated(a)
     ta = _makeMaskedArg(a)
     maresult = numpy.ma.average(ta, axis, weights, returned)
     axes, attributes, id, grid = _extractMetadata(
@@ -6,6 +6,7 @@ CDMS module-level API
 from .error import CDMSError  # noqa
 from lazy_object_proxy import Proxy
 from . import dataset
+from . import cdmsNode
 from . import selectors
 from . import avariable
 from . import tvariable
@@ -23,7 +24,7 @@ import MV2
 
 __all__ = ["cdmsobj", "axis", "coord", "grid", "hgrid", "avariable",
            "sliceut", "error", "variable", "fvariable", "tvariable", "dataset",
-           "database", "cache", "selectors", "MV2", "convention", "bindex",
+           "database", "cache", "cdmlcache", "aiocdms", "lazy", "chunked", "selectors", "MV2", "convention", "bindex",
            "auxcoord", "gengrid", "gsHost", "gsStaticVariable", "gsTimeVariable",
            "mvBaseWriter", "mvSphereMesh", "mvVsWriter", "mvCdmsRegrid"]
 
@@ -83,6 +84,10 @@ getNetcdfDeflateLevelFlag = Proxy(lambda: dataset.getNetcdfDeflateLevelFlag)
 getNetcdfUseNCSwitchModeFlag = Proxy(lambda: dataset.getNetcdfUseNCSwitchModeFlag)
 
 setCompressionWarnings = Proxy(lambda: dataset.setCompressionWarnings)
+setCdmlCache = Proxy(lambda: dataset.setCdmlCache)
+setAxisCacheSize = Proxy(lambda: cdmsNode.setAxisCacheSize)
+getAxisCacheSize = Proxy(lambda: cdmsNode.getAxisCacheSize)
+getCdmlCache = Proxy(lambda: dataset.getCdmlCache)
 
 setNetcdf4Flag = Proxy(lambda: dataset.setNetcdf4Flag)
 getNetcdf4Flag = Proxy(lambda: dataset.getNetcdf4Flag)
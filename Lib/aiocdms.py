@@ -0,0 +1,312 @@
+"""
+Asyncio facade for CDMS files, datasets and variables.
+
+Reads run on a bounded thread pool, so they do not block the event loop::
+
+    from cdms2 import aiocdms
+
+    async with await aiocdms.open('clt.nc') as f:
+        clt = await f.read('clt', time=('1979-1', '1980-1'))
+        lat = await f['clt'].getRegion(latitude=(-30, 30))
+
+Concurrent slice and region reads of the same variable are coalesced: requests
+issued together whose hyperslabs overlap are served by a single read of their
+bounding box, and a request contained in a read already in progress waits for
+that read instead of issuing its own. Cancelling a request cancels the
+underlying read once no other request is waiting for it.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from .error import CDMSError
+from . import dataset
+
+_maxWorkers = 4
+_executor = None
+
+
+def setMaxWorkers(n):
+    """Set the number of threads of the default executor used for reads."""
+    global _maxWorkers, _executor
+    if n < 1:
+        raise CDMSError("setMaxWorkers: number of workers must be >= 1")
+    _maxWorkers = n
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+def getExecutor():
+    """Return the default (bounded) executor used for reads."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=_maxWorkers)
+    return _executor
+
+
+async def open(uri, mode='r', executor=None, **keys):
+    """Open a file or dataset without blocking the event loop.
+
+    Parameters
+    ----------
+    uri : (str) Filename to open, as for cdms2.open
+    mode : (str) Open mode, as for cdms2.open
+    executor : executor for the reads on this dataset, defaults to getExecutor()
+    keys : other arguments of cdms2.open
+
+    Returns
+    -------
+    an AsyncDataset
+    """
+    if executor is None:
+        executor = getExecutor()
+    loop = asyncio.get_running_loop()
+    f = await loop.run_in_executor(
+        executor, functools.partial(dataset.openDataset, uri, mode, **keys))
+    return AsyncDataset(f, executor)
+
+
+def _volume(slicelist):
+    result = 1
+    for s in slicelist:
+        result *= max(s.stop - s.start, 0)
+    return result
+
+
+def _bounds(a, b):
+    return [slice(min(x.start, y.start), max(x.stop, y.stop), 1) for x, y in zip(a, b)]
+
+
+def _contains(outer, inner):
+    for o, i in zip(outer, inner):
+        if i.start < o.start or i.stop > o.stop:
+            return False
+    return True
+
+
+class _Read(object):
+    """One read of a bounding hyperslab, shared by the requests it covers."""
+
+    def __init__(self, slicelist):
+        self.slicelist = slicelist
+        self.future = None              # asyncio future of the read, once started
+        self.waiters = 0
+
+
+class AsyncVariable(object):
+    """Asyncio facade for a file, dataset or transient variable.
+
+    Metadata access (attributes, axes, shape, ...) is delegated to the
+    wrapped variable. Data access methods are coroutines.
+    """
+
+    def __init__(self, var, executor=None):
+        self.__dict__['_var_'] = var
+        if executor is None:
+            executor = getExecutor()
+        self.__dict__['_executor_'] = executor
+        self.__dict__['_pending_'] = []     # (slicelist, future) waiting for a batch
+        self.__dict__['_reads_'] = []       # _Read in progress
+
+    def __getattr__(self, name):
+        return getattr(self._var_, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._var_, name, value)
+
+    def __repr__(self):
+        return "<AsyncVariable: %s>" % repr(self._var_)
+
+    def _run(self, func, *args, **keys):
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self._executor_, functools.partial(func, *args, **keys))
+
+    async def __call__(self, *args, **keys):
+        """Selection of a subregion using selectors, see AbstractVariable.__call__."""
+        return await self._run(self._var_, *args, **keys)
+
+    select = __call__
+
+    async def __getitem__(self, key):
+        """Index the variable, as var[key]: await avar[key]."""
+        return await self._run(self._var_.__getitem__, key)
+
+    async def getValue(self, squeeze=1):
+        return await self._run(self._var_.getValue, squeeze=squeeze)
+
+    async def getSlice(self, *specs, **keys):
+        """Read a slice, see AbstractVariable.getSlice."""
+        keys['numericSqueeze'] = keys.get('numericSqueeze', 0)
+        keys['squeeze'] = keys.get('squeeze', 1 - keys['numericSqueeze'])
+        keys['raw'] = keys.get('raw', 1)
+        if keys.get('isitem', 0):
+            return await self._run(self._var_.getSlice, *specs, **keys)
+        return await self.subSlice(*specs, **keys)
+
+    async def subSlice(self, *specs, **keys):
+        """Read a slice, see AbstractVariable.subSlice."""
+        var = self._var_
+        if keys.get('numericSqueeze', 0) or keys.get('forceaxes') is not None or var.rank() == 0:
+            return await self._run(var.subSlice, *specs, **keys)
+        slicelist = await self._run(_slices, var, specs, keys)
+        if slicelist is None:
+            return await self._run(var.subSlice, *specs, **keys)
+        return await self._coalesce(slicelist, keys)
+
+    async def getRegion(self, *specs, **keys):
+        """Read a region in coordinate space, see AbstractVariable.getRegion."""
+        keys['squeeze'] = keys.get('squeeze', 1)
+        keys['raw'] = keys.get('raw', 1)
+        return await self.subRegion(*specs, **keys)
+
+    async def subRegion(self, *specs, **keys):
+        """Read a region in coordinate space, see AbstractVariable.subRegion."""
+        var = self._var_
+        if var.rank() == 0:
+            return await self._run(var.subRegion, *specs, **keys)
+        slicelist = await self._run(_regionSlices, var, specs, keys)
+        if slicelist is None:
+            return await self._run(var.subRegion, *specs, **keys)
+        return await self._coalesce(slicelist, keys)
+
+    async def _coalesce(self, slicelist, keys):
+        options = {k: keys[k] for k in ('squeeze', 'raw', 'order', 'grid') if k in keys}
+
+        # Join a read in progress which covers the request, if any
+        for read in self._reads_:
+            if not read.future.cancelled() and _contains(read.slicelist, slicelist):
+                return await self._wait(read, slicelist, options)
+
+        # Otherwise batch with the other requests of this event loop iteration
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if len(self._pending_) == 0:
+            loop.call_soon(self._flush)
+        self._pending_.append((slicelist, future))
+        read = await future
+        return await self._wait(read, slicelist, options)
+
+    def _flush(self):
+        """Group the pending requests and start one read per group."""
+        pending = self._pending_
+        self.__dict__['_pending_'] = []
+        groups = []
+        for slicelist, future in pending:
+            if future.cancelled():
+                continue
+            for group in groups:
+                box = _bounds(group[0], slicelist)
+                if _volume(box) <= _volume(group[0]) + _volume(slicelist):
+                    group[0] = box
+                    group[1].append(future)
+                    break
+            else:
+                groups.append([slicelist, [future]])
+
+        for box, futures in groups:
+            read = _Read(box)
+            read.future = self._run(self._var_.subSlice, *box, squeeze=0, raw=0)
+            self._reads_.append(read)
+            read.future.add_done_callback(functools.partial(self._done, read))
+            for future in futures:
+                future.set_result(read)
+
+    def _done(self, read, future):
+        self._reads_.remove(read)
+
+    async def _wait(self, read, slicelist, options):
+        read.waiters += 1
+        try:
+            result = await asyncio.shield(read.future)
+        except asyncio.CancelledError:
+            # Cancel the read itself if nobody else is waiting for it
+            read.waiters -= 1
+            if read.waiters == 0:
+                read.future.cancel()
+            raise
+        read.waiters -= 1
+        relative = [slice(s.start - b.start, s.stop - b.start, s.step) for s, b in zip(slicelist, read.slicelist)]
+        return await self._run(result.subSlice, *relative, **options)
+
+
+class AsyncDataset(object):
+    """Asyncio facade for a CdmsFile or Dataset.
+
+    Metadata access is delegated to the wrapped dataset; f[name] returns an
+    AsyncVariable.
+    """
+
+    def __init__(self, dset, executor=None):
+        if executor is None:
+            executor = getExecutor()
+        self.__dict__['_dataset_'] = dset
+        self.__dict__['_executor_'] = executor
+        self.__dict__['_variables_'] = {}
+
+    def __getattr__(self, name):
+        return getattr(self._dataset_, name)
+
+    def __repr__(self):
+        return "<AsyncDataset: %s>" % repr(self._dataset_)
+
+    def __getitem__(self, name):
+        result = self._variables_.get(name)
+        if result is None:
+            var = self._dataset_[name]
+            if var is None:
+                raise KeyError(name)
+            result = AsyncVariable(var, self._executor_)
+            self._variables_[name] = result
+        return result
+
+    async def read(self, name, *args, **keys):
+        """Read a variable with selectors, as f(name, ...) does."""
+        return await self[name](*args, **keys)
+
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor_, self._dataset_.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, type, value, traceback):
+        await self.close()
+        return False
+
+
+# Helpers run on the executor
+
+def _slices(var, specs, keys):
+    """Resolve subSlice arguments, or None if they cannot be coalesced."""
+    speclist = var._process_specs(specs, keys)
+    return _plain(var.specs2slices(speclist, force=1))
+
+
+def _regionSlices(var, specs, keys):
+    """Resolve subRegion arguments as subRegion does, or None if they wrap around
+    or cannot be coalesced."""
+    speclist = var._process_specs(specs, keys)
+    slicelist = var.reg_specs2slices(speclist)
+    circulardim = None
+    for idim in range(len(slicelist)):
+        item = slicelist[idim]
+        axis = var.getAxis(idim)
+        axislen = len(axis)
+        if axis.isCircular():
+            circulardim = idim
+        start, stop = item.start, item.stop
+        if not ((start is None or 0 <= start < axislen) and (stop is None or 0 <= stop <= axislen)):
+            return None
+    if circulardim is not None:
+        slicelist = var.reg_specs2slices(speclist, force=circulardim)
+    return _plain(slicelist)
+
+
+def _plain(slicelist):
+    """Return slicelist if every slice is a plain forward range, else None."""
+    for s in slicelist:
+        if s.start is None or s.stop is None or s.start < 0 or s.step not in (None, 1):
+            return None
+    return [slice(s.start, s.stop, 1) for s in slicelist]
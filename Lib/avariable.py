@@ -14,6 +14,8 @@ from .error import CDMSError
 from .axis import axisMatchIndex, axisMatchAxis, axisMatches, unspecified, CdtimeTypes, AbstractAxis
 from . import selectors
 import copy
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from .mvCdmsRegrid import CdmsRegrid, getBoundList, _getCoordList
 from regrid2.mvGenericRegrid import guessPeriodicity
 # import PropertiedClasses
@@ -38,6 +40,10 @@ def getMinHorizontalMask(var):
     Get the minimum mask associated with 'x' and 'y'
     (i.e. with the min number of ones) across all axes
 
+    The mask is the logical AND of the masks over the non-horizontal
+    axes. A variable which is not in memory (e.g. a file variable) is read
+    and reduced one block at a time.
+
     Parameters
     ----------
     var : CDMS variable with a mask
@@ -48,9 +54,7 @@ def getMinHorizontalMask(var):
     mask array or None : if order 'x' and 'y' were not found
 
     """
-    from distarray import MultiArrayIter
-
-    if not hasattr(var, 'mask'):
+    if not hasattr(var, 'mask') and not isinstance(var, AbstractVariable):
         return None
 
     shp = var.shape
@@ -69,8 +73,6 @@ Not able to locate the horizontal (y, x) axes for order = %s in getMinHorizontal
         raise CDMSError(msg)
 
     ps = []  # index position of x/y, e.g. [1,3]
-    es = []  # end indices, sizes of x/y axes
-    nonHorizShape = []
     found = False
     for i in range(ndims - 1, -1, -1):
         # iterate backwards because the horizontal
@@ -81,37 +83,39 @@ Not able to locate the horizontal (y, x) axes for order = %s in getMinHorizontal
         # we found the x and y coords
         if not found and (o in 'xy') or (not hasXY and o == '-'):
             ps = [i, ] + ps
-            es = [shp[i], ] + es
             if len(ps) == 2:
                 found = True
-        else:
-            nonHorizShape = [shp[i], ] + nonHorizShape
-
-    if len(ps) == 2:
-        # found all the horizontal axes, start with mask
-        # set to invalid everywhere
-        mask = numpy.ones(es, numpy.bool8)
-        # iterate over all non-horizontal axes, there can be as
-        # many as you want...
-        for it in MultiArrayIter(nonHorizShape):
-            inds = it.getIndices()  # (i0, i1, i2)
-            # build the slice operator, there are three parts
-            # (head, middle, and tail), some parts may be
-            # missing
-            # slce = 'i0,' + ':,'   +   'i1,'  +   ':,' + 'i2,'
-            slce = ('%d,' * ps[0]) % tuple(inds[:ps[0]]) + ':,'            \
-                + ('%d,' * (ps[1] - ps[0] - 1)) % tuple(inds[ps[0]:ps[1] - 1])   \
-                + ':,' + ('%d,' * (ndims - ps[1] - 1)
-                          ) % tuple(inds[ps[1] - 1:])
-            # evaluate the slice for this time, level....
-            mask &= eval('var.mask[' + slce + ']')
-        return mask
-    else:
+
+    if len(ps) != 2:
         msg = """
 Could not find all the horizontal axes for order = %s in getMinHorizontalMask
         """ % str(order)
         raise CDMSError(msg)
-    return None
+
+    # AND over all the non-horizontal axes, there can be as many as you want...
+    nonHoriz = tuple(i for i in range(ndims) if i not in ps)
+    if hasattr(var, 'mask'):
+        return numpy.all(numpy.broadcast_to(var.mask, shp), axis=nonHoriz)
+
+    # ... one block of the first of them at a time
+    if nonHoriz == ():
+        return numpy.ma.getmaskarray(var.getSlice(squeeze=0, raw=1))
+    from .lazy import getBlockSize
+    mask = numpy.ones([shp[i] for i in ps], numpy.bool_)
+    axis = nonHoriz[0]
+    rowsize = 1
+    for i in range(ndims):
+        if i != axis:
+            rowsize *= shp[i]
+    nrows = max(1, getBlockSize() // max(rowsize, 1))
+    specs = [slice(None)] * ndims
+    for start in range(0, shp[axis], nrows):
+        specs[axis] = slice(start, min(start + nrows, shp[axis]))
+        block = numpy.ma.getmaskarray(var.getSlice(*specs, squeeze=0, raw=1))
+        mask &= numpy.all(block, axis=nonHoriz)
+        if not mask.any():
+            break
+    return mask
 
 
 def setNumericCompatibility(mode):
@@ -500,6 +504,11 @@ class AbstractVariable(CdmsObj, Slab):
 
     # Return the grid
     def getGrid(self):
+        # Files opened with metadata_only=True build their grids on first use.
+        # _initGrids checks the flag again under the grids lock of the file, and
+        # returns once the grids are built by this or another thread.
+        if self._grid_ is None and getattr(self.parent, '_gridsPending_', False):
+            self.parent._initGrids()
         return self._grid_
 
     def getMissing(self, asarray=0):
@@ -863,6 +872,87 @@ class AbstractVariable(CdmsObj, Slab):
     def expertSlice(self, slicelist):
         raise CDMSError(NotImplemented + 'expertSlice')
 
+    def iterblocks(self, axis='time', size=1, prefetch=True):
+        """Iterate over the variable in blocks along an axis::
+
+            for block in f['tas'].iterblocks('time', 12):
+                ...
+
+        The blocks are planned once, so the selectors are not processed for
+        each block as in a loop over v[i], and the data files of a dataset are
+        kept open until the iteration ends.
+
+        Parameters
+        ----------
+        axis : axis to iterate along, as an index or an axis specification
+        size : (int) number of values of the axis in a block, the last block may be shorter
+        prefetch : if true, read the next block in a background thread while
+            the current block is used
+
+        Returns
+        -------
+        a generator of TransientVariables, the successive blocks of the
+        variable along axis
+        """
+        if isinstance(axis, (int, numpy.integer)):
+            index = axis + self.rank() if axis < 0 else axis
+        else:
+            index = self.getAxisIndex(axis)
+        if not 0 <= index < self.rank():
+            raise CDMSError('iterblocks: no axis matches %s' % repr(axis))
+        if size < 1:
+            raise CDMSError('iterblocks: block size must be >= 1')
+        n = self.shape[index]
+        plan = []
+        for start in range(0, n, size):
+            slicelist = [slice(0, length, 1) for length in self.shape]
+            slicelist[index] = slice(start, min(start + size, n), 1)
+            plan.append(slicelist)
+        return self._iterblocks(plan, index, prefetch)
+
+    def _iterblocks(self, plan, index, prefetch):
+        selfgrid = self.getGrid()
+        if selfgrid is None or isinstance(selfgrid, AbstractRectGrid):
+            # The axes are read once, the blocks are sliced from the block axis
+            axes = [self.getAxis(i).subaxis(0, length, 1) for i, length in enumerate(self.shape)]
+        else:
+            axes = None
+        handles = OrderedDict()
+
+        def read(slicelist):
+            with cdms2.dataset.keepFilesOpen(handles):
+                if axes is None:
+                    return self.subSlice(*slicelist, squeeze=0)
+                data = self._returnArray(self.expertSlice(slicelist), 0)
+            if self.isEncoded():
+                data = self.decode(data)
+                missing = data.fill_value
+            else:
+                missing = self.getMissing()
+            blockaxes = list(axes)
+            blockaxes[index] = axes[index].subaxis(slicelist[index].start, slicelist[index].stop, 1)
+            return TransientVariable(data, copy=0, fill_value=missing, axes=blockaxes,
+                                     attributes=self.attributes, id=self.id)
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        future = None
+        try:
+            for k, slicelist in enumerate(plan):
+                if executor is None:
+                    yield read(slicelist)
+                    continue
+                if future is None:
+                    future = executor.submit(read, slicelist)
+                block = future.result()
+                future = executor.submit(read, plan[k + 1]) if k + 1 < len(plan) else None
+                yield block
+        finally:
+            if executor is not None:
+                if future is not None:
+                    future.cancel()
+                executor.shutdown(wait=True)
+            cdms2.dataset.closeFiles(handles)
+
     def getRegion(self, *specs, **keys):
         """ Read a region of data. A region is an n-dimensional rectangular region specified in coordinate space.
 
@@ -1208,7 +1298,7 @@ class AbstractVariable(CdmsObj, Slab):
         # principle, cdms2 files should not import regrid2, we're bending
         # rules here...
         import regrid2
-        from regrid2 import Horizontal
+        from regrid2.horizontal import getHorizontal
 
         if togrid is None:
             return self
@@ -1324,8 +1414,8 @@ avariable.regrid: We chose regridMethod = %s for you among the following choices
                         isinstance(keywords['diag'], dict):
                     keywords['diag']['regridTool'] = 'regrid'
 
-                # the original cdms2 regridder
-                regridf = Horizontal(fromgrid, togrid)
+                # the original cdms2 regridder, reused for the same pair of grids
+                regridf = getHorizontal(fromgrid, togrid)
                 return regridf(self, missing=missing, order=order,
                                mask=mask, **keywords)
 
@@ -6,7 +6,10 @@ from future import standard_library
 import sys
 import types
 import copy
+import hashlib
+import weakref
 import numpy
+from collections import OrderedDict
 # import regrid2._regrid
 from . import cdmsNode
 import cdtime
@@ -126,13 +129,34 @@ def createAxis(data, bounds=None, id=None, copy=0, genericBounds=False):
     return TransientAxis(data, bounds=bounds, id=id,
                          copy=copy, genericBounds=genericBounds)
 
+
+# Reference latitude tables, (nlat, gridtype) => (pts, wts, bnds)
+_latitudeTables = {}
+
+
+def gridattr(nlat, gridtype):
+    """Return the (pts, wts, bnds) latitude table of regrid2._regrid.gridattr.
+
+    Tables are computed once per (nlat, gridtype) and shared, so the arrays
+    are read-only.
+    """
+    key = (nlat, gridtype)
+    result = _latitudeTables.get(key)
+    if result is None:
+        import regrid2._regrid
+
+        result = regrid2._regrid.gridattr(nlat, gridtype)
+        for ar in result:
+            ar.flags.writeable = False
+        result = _latitudeTables.setdefault(key, tuple(result))
+    return result
+
 # Generate a Gaussian latitude axis, north-to-south
 
 
 def createGaussianAxis(nlat):
-    import regrid2._regrid
-
-    lats, wts, bnds = regrid2._regrid.gridattr(nlat, 'gaussian')
+    lats, wts, bnds = gridattr(nlat, 'gaussian')
+    lats = numpy.array(lats)
 
     # For odd number of latitudes, gridattr returns 0 in the second half of
     # lats
@@ -152,9 +176,7 @@ def createGaussianAxis(nlat):
 
 
 def createEqualAreaAxis(nlat):
-    import regrid2._regrid
-
-    lats, wts, bnds = regrid2._regrid.gridattr(nlat, 'equalarea')
+    lats, wts, bnds = gridattr(nlat, 'equalarea')
     latBounds = numpy.zeros((nlat, 2), numpy.float)
     latBounds[:, 0] = bnds[:-1]
     latBounds[:, 1] = bnds[1:]
@@ -719,9 +741,91 @@ def allclose(ax1, ax2, rtol=1.e-5, atol=1.e-8):
     >>> b = ma.array([1e10, 1e-8, 42.0], mask=[0, 0, 1])
     >>> ma.allclose(a, b)
     False
+
+    Notes
+    -----
+    Results for pairs of axis objects are cached, keyed on the identity and
+    the version stamp (see AbstractAxis.getVersion) of both axes, so
+    repeated comparisons of unchanged axes do not compare coordinates.
+    """
+    if ax1 is ax2:
+        return True
+    if not (isinstance(ax1, AbstractAxis) and isinstance(ax2, AbstractAxis)):
+        return numpy.ma.allclose(ax1[:], ax2[:], rtol=rtol, atol=atol)
+    key = (id(ax1), id(ax2), rtol, atol)
+    entry = _allcloseCache.get(key)
+    if entry is not None:
+        ref1, ref2, version1, version2, result = entry
+        if ref1() is ax1 and ref2() is ax2 and version1 == ax1.getVersion() and version2 == ax2.getVersion():
+            try:
+                _allcloseCache.move_to_end(key)
+            except KeyError:
+                pass
+            return result
+    result = bool(numpy.ma.allclose(ax1[:], ax2[:], rtol=rtol, atol=atol))
+    _allcloseCache[key] = (weakref.ref(ax1), weakref.ref(ax2), ax1.getVersion(), ax2.getVersion(), result)
+    while len(_allcloseCache) > _allcloseCacheSize:
+        try:
+            _allcloseCache.popitem(last=False)
+        except KeyError:
+            break
+    return result
+
+
+# Cache of allclose results, (id(ax1), id(ax2), rtol, atol) => (ref1, ref2, version1, version2, result)
+_allcloseCache = OrderedDict()
+_allcloseCacheSize = 1024
+
+
+def _intervalKey(interval, indicator, cycle, epsilon):
+    """Return a hashable key for the arguments of mapIntervalExt, or None if
+    they cannot be memoized."""
+    key = []
+    for x in tuple(interval) + (indicator, cycle, epsilon):
+        if isinstance(x, numpy.generic):
+            x = x.item()
+        elif type(x) is ComptimeType:
+            x = ('comptime', x.year, x.month, x.day, x.hour, x.minute, x.second)
+        elif type(x) is ReltimeType:
+            x = ('reltime', x.value, x.units)
+        elif not isinstance(x, (string_types, int, float, type(None))):
+            return None
+        key.append(x)
+    return tuple(key)
+
+
+# Cache of interval mappings, (id(axis), interval, indicator, cycle, epsilon) => (ref, state, result)
+_intervalCache = OrderedDict()
+_intervalCacheSize = 4096
+
+# Interning table of read-only axis value and bounds arrays, keyed on
+# (dtype, shape, digest of the contents)
+_internTable = weakref.WeakValueDictionary()
+
+
+def internArray(ar, copy=1):
+    """Return a read-only array equal to ar, for storage shared between axes.
+
+    Read-only arrays are already shareable and are returned as is. Otherwise
+    the result is an array interned before with the same contents if there is
+    one, else a read-only copy of ar (or ar itself, made read-only, if copy is
+    0 and ar owns its data). Axes holding a read-only array copy it before
+    modifying their values (copy on write).
     """
-    return ((ax1 is ax2) or numpy.ma.allclose(
-        ax1[:], ax2[:], rtol=rtol, atol=atol))
+    if ar is None or not isinstance(ar, numpy.ndarray) or not ar.flags.writeable:
+        return ar
+    if ar.dtype.hasobject:
+        return numpy.array(ar) if copy else ar
+    ar = numpy.ascontiguousarray(ar)
+    key = (ar.dtype.str, ar.shape, hashlib.sha1(ar).digest())
+    result = _internTable.get(key)
+    if result is not None and numpy.array_equal(result, ar):
+        return result
+    if copy or not ar.flags.owndata:
+        ar = numpy.array(ar)
+    ar.flags.writeable = False
+    _internTable[key] = ar
+    return ar
 
 # AbstractAxis defines the common axis interface.
 # Concrete axis classes are derived from this class.
@@ -738,6 +842,8 @@ class AbstractAxis(CdmsObj):
         self._data_ = None
         # Cached wraparound values for circular axes
         self._doubledata_ = None
+        # Version stamp, incremented when the values are modified
+        self._version_ = 0
 
     def __str__(self):
         return "\n".join(self.listall()) + "\n"
@@ -769,6 +875,18 @@ class AbstractAxis(CdmsObj):
     def rank(self):
         return len(self.shape)
 
+    def getVersion(self):
+        """Return the version stamp of the axis values.
+
+        The stamp changes whenever the values or bounds are modified through
+        the axis (item or slice assignment, assignValue, setBounds), so it can
+        be used to validate cached comparisons and interval mappings."""
+        return self._version_
+
+    def _touch(self):
+        self._version_ = self._version_ + 1
+        self._doubledata_ = None
+
     # Designate axis as a latitude axis.
     # If persistent is true, write metadata to the container.
     def designateLatitude(self, persistent=0):
@@ -1282,7 +1400,52 @@ class AbstractAxis(CdmsObj):
     def mapIntervalExt(self, interval, indicator='ccn',
                        cycle=None, epsilon=None):
         """Like mapInterval, but returns (i,j,k) where k is stride,
-        and (i,j) is not restricted to one cycle."""
+        and (i,j) is not restricted to one cycle.
+
+        Results are memoized, keyed on the identity of the axis and the
+        interval. An entry is only used while the version stamp, units,
+        calendar and topology of the axis are unchanged."""
+        if interval is None or interval == ':':
+            return (0, len(self), 1)
+        key = _intervalKey(interval, indicator, cycle, epsilon)
+        if key is None:
+            return self._mapIntervalExt(interval, indicator, cycle, epsilon)
+        key = (id(self),) + key
+        state = self._intervalState()
+        entry = _intervalCache.get(key)
+        if entry is not None:
+            ref, entryState, result = entry
+            if ref() is self and entryState == state:
+                try:
+                    _intervalCache.move_to_end(key)
+                except KeyError:
+                    pass
+                return result
+        result = self._mapIntervalExt(interval, indicator, cycle, epsilon)
+        _intervalCache[key] = (weakref.ref(self), state, result)
+        while len(_intervalCache) > _intervalCacheSize:
+            try:
+                _intervalCache.popitem(last=False)
+            except KeyError:
+                break
+        return result
+
+    def _intervalState(self):
+        """Return the state of the axis which an interval mapping depends on.
+
+        Besides the version stamp, this holds the length of the axis and the
+        identity of its cached values, so that values rebound without going
+        through the axis also invalidate the mappings."""
+        modulo = getattr(self, 'modulo', None)
+        if modulo is not None:
+            modulo = repr(modulo)
+        return (self._version_, len(self), id(self.__dict__.get('_data_')),
+                getattr(self, 'units', None), self.getCalendar(),
+                getattr(self, 'topology', None), getattr(self, 'realtopology', None),
+                getattr(self, 'axis', None), modulo, _autobounds)
+
+    def _mapIntervalExt(self, interval, indicator='ccn',
+                        cycle=None, epsilon=None):
 
         # nCycleMax : max number of cycles a user a specify in wrapping
 
@@ -1565,12 +1728,15 @@ class AbstractAxis(CdmsObj):
             else:
                 bounds = None
 
+        # The values are shared with equal axes (see internArray), and the
+        # bounds are private copies made by setBounds.
         newaxis = TransientAxis(
-            data,
+            internArray(data),
             bounds,
             id=self.id,
-            copy=1,
+            copy=0,
             genericBounds=isGeneric[0])
+        newaxis._bounds_ = internArray(newaxis._bounds_, copy=0)
 
         if self.isLatitude():
             newaxis.designateLatitude()
@@ -1789,6 +1955,21 @@ class Axis(AbstractAxis):
                 self.attributes['partition'] = self.partition
         self.id = axisNode.id
 
+    # Vector data values are held by the node, which parses them on demand
+    # and may drop them again under cdmsNode.setAxisCacheSize, so they are
+    # not pinned here. Linear (generated) values are cached on the axis.
+    def _getCachedData(self):
+        data = self.__dict__.get('_data_')
+        node = self.__dict__.get('_node_')
+        if data is None and node is not None and node.dataRepresent != cdmsNode.CdLinear:
+            data = node.data
+        return data
+
+    def _setCachedData(self, data):
+        self.__dict__['_data_'] = data
+
+    _data_ = property(_getCachedData, _setCachedData)
+
     def typecode(self):
         return cdmsNode.CdToNumericType.get(self._node_.datatype)
 
@@ -1942,10 +2123,51 @@ class TransientAxis(AbstractAxis):
         return self._data_[low:high]
 
     def __setitem__(self, index, value):
-        self._data_[index] = numpy.ma.filled(value)
+        self._writeableData()[index] = numpy.ma.filled(value)
+        self._touch()
 
     def __setslice__(self, low, high, value):
-        self._data_[low:high] = numpy.ma.filled(value)
+        self._writeableData()[low:high] = numpy.ma.filled(value)
+        self._touch()
+
+    # Rebinding the values, as in axis._data_ = values, changes the version stamp
+    def _getValues(self):
+        return self.__dict__.get('_data_')
+
+    def _setValues(self, data):
+        self.__dict__['_data_'] = data
+        if '_version_' in self.__dict__:
+            self._touch()
+
+    _data_ = property(_getValues, _setValues)
+
+    def _writeableData(self):
+        # Values shared with other axes are read-only: copy on write. The copy
+        # holds the same values, so the version stamp is kept.
+        data = self.__dict__.get('_data_')
+        if isinstance(data, numpy.ndarray) and not data.flags.writeable:
+            self.__dict__['_data_'] = data = numpy.array(data)
+        return data
+
+    def share(self):
+        """Return a transient copy of the axis which shares its storage.
+
+        The values and bounds are made read-only and shared by both axes;
+        whichever axis is modified first copies its values (copy on write).
+        Attributes are copied.
+        """
+        isGeneric = [self._genericBounds_]
+        # Same values, read-only: the version stamp is kept
+        self.__dict__['_data_'] = internArray(self._data_)
+        if self._bounds_ is not None:
+            self._bounds_ = internArray(self._bounds_)
+            bounds = self._bounds_
+        else:
+            bounds = internArray(self.getBounds(isGeneric), copy=0)
+        result = TransientAxis(self._data_, bounds, id=self.id, copy=0, genericBounds=isGeneric[0])
+        for k, v in list(self.attributes.items()):
+            setattr(result, k, v)
+        return result
 
     def __len__(self):
         return len(self._data_)
@@ -2001,7 +2223,10 @@ class TransientAxis(AbstractAxis):
                     bounds2[:, 0] = bounds[:-1]
                     bounds2[:, 1] = bounds[1::]
                     bounds = bounds2
-            self._bounds_ = copy.copy(bounds)
+            # Read-only bounds are shared (see internArray)
+            if not isinstance(bounds, numpy.ndarray) or bounds.flags.writeable:
+                bounds = copy.copy(bounds)
+            self._bounds_ = bounds
             self._genericBounds_ = isGeneric
         else:
             if (getAutoBounds() == 1 or (getAutoBounds() ==
@@ -2010,6 +2235,7 @@ class TransientAxis(AbstractAxis):
                 self._genericBounds_ = True
             else:
                 self._bounds_ = None
+        self._touch()
 
     def isLinear(self):
         return False
@@ -2041,6 +2267,10 @@ class TransientVirtualAxis(TransientAxis):
         If copyData is 1, make a separate copy of the data."""
         return TransientVirtualAxis(self.id, len(self))
 
+    def share(self):
+        "A virtual axis has no storage to share."
+        return self.clone()
+
     def getData(self):
         return numpy.arange(float(self._virtualLength))
 
@@ -2253,8 +2483,10 @@ class FileAxis(AbstractAxis):
                     if(self.isUnlimited() and (high >= Max32int)):
                         high = self.__len__()
                     high = min(Max32int, high)
+                    self._touch()
                     return self._obj_.setslice(
                         *(low, high, numpy.ma.filled(value)))
+        self._touch()
         return self._obj_.setitem(*(index, numpy.ma.filled(value)))
 
     def __setslice__(self, low, high, value):
@@ -2266,6 +2498,7 @@ class FileAxis(AbstractAxis):
             raise CDMSError(ReadOnlyAxis + self.id)
         if self.parent is None:
             raise CDMSError(FileWasClosed + self.id)
+        self._touch()
         return self._obj_.setslice(*(low, high, numpy.ma.filled(value)))
 
     def __len__(self):
@@ -2366,6 +2599,7 @@ class FileAxis(AbstractAxis):
 
         else:
             self._boundsArray_ = copy.copy(bounds)
+        self._touch()
 
     def getCalendar(self):
         if hasattr(self, 'calendar'):
@@ -1,15 +1,16 @@
 """
 CDMS cache management and file movement objects
 """
-import cdurllib
+from . import cdurllib
 import urllib.parse
 import tempfile
+import contextlib
+import fcntl
+import hashlib
 import os
+import sqlite3
 import time
-import cdmsobj
-import sys
-import errno
-import shelve
+from . import cdmsobj
 from .error import CDMSError
 MethodNotImplemented = "Method not yet implemented"
 SchemeNotSupported = "Scheme not supported: "
@@ -18,9 +19,45 @@ TimeOutError = "Wait for read completion timed out:"
 GlobusNotSupported = "Globus interface not supported"
 RequestManagerNotSupported = "Request manager interface not supported (module reqm not found)"
 
-_lock_max_tries = 10                    # Number of tries for a lock
-_lock_naptime = 1                       # Seconds between lock tries
 _cache_tempdir = None                   # Default temporary directory
+_locks = {}                             # Lock path => descriptor, for locks held by lock()
+_maxCacheSize = 4 << 30                 # Maximum total size of the cached files in bytes, or None
+_maxCacheAge = None                     # Maximum time in seconds since a cached file was used, or None
+
+
+def setMaxCacheSize(nbytes):
+    """
+    Set the maximum total size of the files in the data cache, in bytes.
+
+    When the cache grows larger, the least recently used files are deleted.
+    None means no limit.
+    """
+    global _maxCacheSize
+    if nbytes is not None and nbytes < 0:
+        raise CDMSError("setMaxCacheSize: size must be >= 0")
+    _maxCacheSize = nbytes
+
+
+def getMaxCacheSize():
+    """Return the maximum total size of the files in the data cache, in bytes, or None."""
+    return _maxCacheSize
+
+
+def setMaxCacheAge(seconds):
+    """
+    Set the maximum time in seconds that a file stays in the data cache without being used.
+
+    None means no limit.
+    """
+    global _maxCacheAge
+    if seconds is not None and seconds < 0:
+        raise CDMSError("setMaxCacheAge: age must be >= 0")
+    _maxCacheAge = seconds
+
+
+def getMaxCacheAge():
+    """Return the maximum time in seconds that an unused file stays in the data cache, or None."""
+    return _maxCacheAge
 
 
 def lock(filename):
@@ -37,61 +74,29 @@ def lock(filename):
     -----
     This function is UNIX-specific.
 
-    It is important to delete the lock via unlock() if the process is
-    interrupted, otherwise subsequent locks will fail.
+    The lock is an flock(2) lock: the call blocks until the lock is free, and
+    the lock is released by the system if the process dies.
     """
 
     path = lockpath(filename)
-
-    # Try to acquire a file-based lock
-    success = 0
-    tries = 0
-    while (not success) and (tries < _lock_max_tries):
-        try:
-            if cdmsobj._debug:
-                print(
-                    'Process %d: Trying to acquire lock %s' %
-                    (os.getpid(), path))
-            fd = os.open(path, os.O_CREAT | os.O_WRONLY | os.O_EXCL, 0o666)
-
-        # If the open failed because the file already exists, keep trying, otherwise
-        # reraise the error
-        except OSError:
-            if sys.exc_value.errno != errno.EEXIST:
-                raise
-            tries = tries + 1
-        else:
-            if cdmsobj._debug:
-                print(
-                    'Process %d: Acquired lock %s after %d tries' %
-                    (os.getpid(), path, tries))
-            success = 1
-            break
-
-        # Sleep until next retry
-        if cdmsobj._debug:
-            print(
-                'Process %d: Failed to acquire lock %s, sleeping' %
-                (os.getpid(), path))
-        time.sleep(_lock_naptime)
-
-    # Error if the lock could not be acquired
-    if not success:
-        raise CDMSError(LockError + 'Could not acquire a lock on %s' % path)
-
-    # The lock succeeded, so just close the file - we don't need to write
-    # anything here
-    else:
+    if cdmsobj._debug:
+        print('Process %d: Trying to acquire lock %s' % (os.getpid(), path))
+    fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o666)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    except BaseException:
         os.close(fd)
+        raise CDMSError(LockError + 'Could not acquire a lock on %s' % path)
+    _locks[path] = fd
 
 
 def unlock(filename):
     """
-    Delete a file-based lock with the given name.
+    Release a file-based lock with the given name.
 
     Usage : unlock(filename)
 
-    If the function returns, the lock was successfully deleted.
+    If the function returns, the lock was successfully released.
 
 
     Notes
@@ -102,7 +107,28 @@ def unlock(filename):
     path = lockpath(filename)
     if cdmsobj._debug:
         print('Process %d: Unlocking %s' % (os.getpid(), path))
-    os.unlink(path)
+    fd = _locks.pop(path, None)
+    if fd is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+@contextlib.contextmanager
+def _flock(path, blocking=True):
+    """Hold an exclusive flock(2) lock on <path>. Yields False if not blocking and the lock is taken."""
+    fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o666)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if blocking else (fcntl.LOCK_EX | fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
 
 
 def lockpath(filename):
@@ -231,6 +257,20 @@ def copyFile(fromURL, toURL, callback=None,
         else:
             raise CDMSError(SchemeNotSupported + scheme)
         return
+    elif scheme in ('http', 'https') and _transferMethod == _pythonTransfer:
+        # Fetch in blocks with range requests, through a sparse file at the target
+        reader = cdurllib.RangeReader(fromURL, toURL, reporthook=callback,
+                                      userObject=(dialog if _useWindow else None))
+        try:
+            reader.fetchAll()
+        finally:
+            reader.close()
+            # The block map goes with the partial file, whether or not the fetch completed
+            try:
+                os.unlink(reader.mappath)
+            except OSError:
+                pass
+        return
     elif _transferMethod == _requestManagerTransfer:  # Request manager gransfer
         import reqm
         import signal
@@ -267,7 +307,21 @@ def copyFile(fromURL, toURL, callback=None,
     else:
         raise CDMSError(SchemeNotSupported + scheme)
 
-# A simple data cache
+
+def _diskUsage(st):
+    """Return the disk space used by a file from its stat result; sparse files count their blocks."""
+    blocks = getattr(st, "st_blocks", None)
+    if blocks is None:
+        return st.st_size
+    return min(st.st_size, blocks * 512)
+
+
+# A simple data cache. Files are stored under a name derived from their key,
+# so a cache hit is a stat of that name and never takes a lock. Transfers
+# write a partial file which is renamed into place when complete, under an
+# flock on the key, so concurrent requests for a file wait for one transfer.
+# The sqlite index records the entries for size- and age-based eviction of
+# the least recently used files (a hit refreshes the modification time).
 
 
 class Cache:
@@ -276,27 +330,43 @@ class Cache:
 
     def __init__(self):
         if self.indexpath is None:
-            self.indexpath = lockpath(".index")
-            # This is a kluge to handle the very real possibility that
-            # a lock was left over from an aborted process. Unfortunately,
-            # this might also screw up a transfer in progress ...
-            try:
-                unlock("index_lock")
-            except BaseException:
-                pass
-            lock("index_lock")
-            self.index = shelve.open(self.indexpath)  # Persistent cache index
+            self.direc = os.path.dirname(lockpath(".index"))  # Cache directory
+            self.indexpath = os.path.join(self.direc, ".index.sqlite")
+            with _flock(lockpath("index_lock")):
+                with contextlib.closing(self._connect()) as conn:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    with conn:
+                        conn.execute("CREATE TABLE IF NOT EXISTS entries "
+                                     "(key TEXT PRIMARY KEY, path TEXT NOT NULL, size INTEGER NOT NULL)")
+                try:
+                    # Make index file world writeable
+                    os.chmod(self.indexpath, 0o666)
+                except BaseException:
+                    pass
+            # Clean up transfers interrupted by aborted processes
+            self.clean()
+
+    def _connect(self):
+        return sqlite3.connect(self.indexpath, timeout=60)
+
+    def _path(self, filekey):
+        """Return the path of the cache file for <filekey>."""
+        return os.path.join(self.direc, hashlib.sha1(filekey.encode()).hexdigest())
+
+    def _isCacheFile(self, path):
+        """Return True if <path> is stored in the cache directory, rather than registered by put()."""
+        return os.path.dirname(os.path.realpath(path)) == os.path.realpath(self.direc)
+
+    def _removeFile(self, path):
+        """Remove a cached file, and the block map of a sparse file of openRemote."""
+        paths = [path]
+        if path.endswith(".sparse"):
+            paths.append(path + ".blocks")
+        for name in paths:
             try:
-                # Make index file world writeable
-                os.chmod(self.indexpath, 0o666)
-            except BaseException:
+                os.unlink(name)
+            except OSError:
                 pass
-            self.index.close()
-            unlock("index_lock")
-            # Clean up pending read notifications in the cache. This will also
-            # mess up tranfers in progress...
-            self.clean()
-            self.direc = os.path.dirname(self.indexpath)  # Cache directory
 
     def get(self, filekey):
         """
@@ -307,19 +377,19 @@ class Cache:
         <filekey> : filekey for cache
         """
         filekey = str(filekey)
-        lock("index_lock")
+        path = self._path(filekey)
         try:
-            self.index = shelve.open(self.indexpath)
-            value = self.index[filekey]
-        except KeyError:
-            value = None
-        except BaseException:
-            self.index.close()
-            unlock("index_lock")
-            raise
-        self.index.close()
-        unlock("index_lock")
-        return value
+            os.utime(path)                  # Mark as recently used, fails if not cached
+            return path
+        except OSError:
+            pass
+
+        # Entries stored by put() under another path
+        with contextlib.closing(self._connect()) as conn:
+            row = conn.execute("SELECT path FROM entries WHERE key = ?", (filekey,)).fetchone()
+        if row is None or not os.path.isfile(row[0]):
+            return None
+        return row[0]
 
     def put(self, filekey, path):
         """
@@ -331,47 +401,115 @@ class Cache:
         """
 
         filekey = str(filekey)
-
-        # Create a semaphore
-        lock("index_lock")
-        try:
-            if cdmsobj._debug:
-                print(
-                    'Process %d: Adding cache file %s,\n   key %s' %
-                    (os.getpid(), path, filekey))
-            self.index = shelve.open(self.indexpath)
-            self.index[filekey] = path
-        except BaseException:
-            self.index.close()
-            unlock("index_lock")
-            raise
-        self.index.close()
-        unlock("index_lock")
+        if cdmsobj._debug:
+            print(
+                'Process %d: Adding cache file %s,\n   key %s' %
+                (os.getpid(), path, filekey))
+        size = os.path.getsize(path) if os.path.isfile(path) else 0
+        with contextlib.closing(self._connect()) as conn:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", (filekey, path, size))
+        self.evict(keep=filekey)
 
     def deleteEntry(self, filekey):
         """
-        Delete a cache index entry.
+        Delete a cache index entry, and its file if it is stored in the cache directory.
 
         Parameters
         ----------
         <filekey> : filekey for cache
         """
         filekey = str(filekey)
-
-        # Create a semaphore
-        lock("index_lock")
-        self.index = shelve.open(self.indexpath)
+        with contextlib.closing(self._connect()) as conn:
+            with conn:
+                conn.execute("DELETE FROM entries WHERE key = ?", (filekey,))
         try:
-            del self.index[filekey]
-        except BaseException:
+            os.unlink(self._path(filekey))
+        except OSError:
             pass
-        unlock("index_lock")
+
+    def evict(self, keep=None):
+        """
+        Delete the least recently used files until the cache is within the limits
+        set by setMaxCacheSize and setMaxCacheAge.
+
+        Parameters
+        ----------
+        <keep> : key of an entry which is not evicted, usually the one just added
+        """
+        if _maxCacheSize is None and _maxCacheAge is None:
+            return
+        with _flock(lockpath("index_lock")):
+            with contextlib.closing(self._connect()) as conn:
+                entries = []
+                removed = []
+                kept = 0
+                for key, path in conn.execute("SELECT key, path FROM entries").fetchall():
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        removed.append(key)
+                        continue
+                    # Files registered by put() outside the cache directory take no cache space
+                    size = _diskUsage(st) if self._isCacheFile(path) else 0
+                    if key != keep:
+                        entries.append((st.st_mtime, key, path, size))
+                    else:
+                        kept = size
+                total = sum(entry[3] for entry in entries) + kept
+
+                now = time.time()
+                entries.sort()
+                for mtime, key, path, size in entries:
+                    tooOld = _maxCacheAge is not None and now - mtime > _maxCacheAge
+                    tooBig = _maxCacheSize is not None and total > _maxCacheSize
+                    if not (tooOld or tooBig):
+                        break           # The remaining entries are more recently used
+                    # Only files in the cache directory are deleted, other entries are dropped
+                    if self._isCacheFile(path):
+                        if cdmsobj._debug:
+                            print('Process %d: Evicting cache file %s' % (os.getpid(), path))
+                        self._removeFile(path)
+                    total -= size
+                    removed.append(key)
+
+                with conn:
+                    conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in removed])
+
+    def openRemote(self, fromURL, filekey, blocksize=1 << 20):
+        """
+        Open the HTTP(S) file <fromURL> for reading, fetching only the blocks which are read.
+
+        If the whole file is in the cache, the cached file is opened. Otherwise the blocks
+        are cached in a sparse file in the cache directory, shared by all readers of <filekey>.
+
+        Parameters
+        ----------
+        <filekey> : is the cache index key, as for getFile
+
+        <blocksize> : is the size in bytes of the blocks fetched
+
+        Returns
+        -------
+        a binary file object, see cdurllib.RangeReader
+        """
+        path = self.get(filekey)
+        if path is not None:
+            return open(path, "rb")
+        filekey = str(filekey)
+        sparsepath = self._path(filekey) + ".sparse"
+        reader = cdurllib.RangeReader(fromURL, sparsepath, blocksize)
+        self.put(filekey + "#blocks", sparsepath)
+        return reader
 
     def copyFile(self, fromURL, filekey, lcpath=None,
                  userid=None, useReplica=None):
         """
         Copy the file <fromURL> into the cache. Return the result path.
 
+        The file is copied to a partial file, which is renamed to the cache path
+        when the transfer is complete.
+
         For request manager transfers, lcpath is the logical collection path,
 
         Parameters
@@ -383,16 +521,16 @@ class Cache:
                        catalog for the actual file to transfer.
         """
 
-        # Put a notification into the cache, that this file is being read.
-        self.put(filekey, "__READ_PENDING__")
+        filekey = str(filekey)
+        with _flock(self._path(filekey) + ".lock"):
+            return self._copyFile(fromURL, filekey, lcpath, userid, useReplica)
 
-        # Get a temporary file in the cache
-        tempdir = tempfile.tempdir
-        tempfile.tempdir = self.direc
-        toPath = tempfile.mktemp()
-        tempfile.tempdir = tempdir
+    def _copyFile(self, fromURL, filekey, lcpath, userid, useReplica):
+        """Copy the file into the cache, holding the lock on <filekey>."""
+        path = self._path(filekey)
+        toPath = "%s.%d.part" % (path, os.getpid())
 
-        # Copy to the temporary file
+        # Copy to the partial file
         try:
             copyFile(
                 fromURL,
@@ -402,18 +540,17 @@ class Cache:
                 useReplica=useReplica)
             # Make cache files world writeable
             os.chmod(toPath, 0o666)
+            os.replace(toPath, path)
         except BaseException:
-            # Remove the notification on error, and the temp file, then
-            # re-raise
-            self.deleteEntry(filekey)
+            # Remove the partial file on error, then re-raise
             if os.path.isfile(toPath):
                 os.unlink(toPath)
             raise
 
         # Add to the cache index
-        self.put(filekey, toPath)
+        self.put(filekey, path)
 
-        return toPath
+        return path
 
     def getFile(self, fromURL, filekey, naptime=5, maxtries=60,
                 lcpath=None, userid=None, useReplica=None):
@@ -428,9 +565,8 @@ class Cache:
 
         Parameters
         ----------
-        <naptime> : is the number of seconds between retries,
-
-        <maxtries> : is the maximum number of retries. Otherwise, copy it from the remote file.
+        <naptime>, <maxtries> : are not used, they are kept for compatibility. A
+                   transfer in progress is waited for on a lock, without polling.
 
         <filekey> : is the cache index key. A good choice is (datasetDN, filename) where
 
@@ -454,50 +590,14 @@ class Cache:
         The function does not guarantee that the file is still in the cache
         by the time it returns.
         """
-        # If the file is being read into the cache, just wait for it
-        tempname = self.get(filekey)
-        # Note: This is not bulletproof: another process could set the cache at
-        # this point
-        if tempname is None:
-            fpath = self.copyFile(
-                fromURL,
-                filekey,
-                lcpath=lcpath,
-                userid=userid,
-                useReplica=useReplica)
-        elif tempname == "__READ_PENDING__":
-            success = 0
-            for i in range(maxtries):
-                if cdmsobj._debug:
-                    print(
-                        'Process %d: Waiting for read completion, %s' %
-                        (os.getpid(), repr(filekey)))
-                time.sleep(naptime)
-                tempname = self.get(filekey)
-
-                # The read failed, or the entry was deleted.
-                if tempname is None:
-                    fpath = self.copyFile(
-                        fromURL,
-                        filekey,
-                        lcpath=lcpath,
-                        userid=userid,
-                        useReplica=useReplica)
-
-                # The read is not yet complete
-                elif tempname == "__READ_PENDING__":
-                    continue
-
-                # The read is finished.
-                else:
-                    fpath = tempname
-                    success = 1
-                    break
-            if not success:
-                raise CDMSError(TimeOutError + repr(filekey))
-
-        else:
-            fpath = tempname
+        filekey = str(filekey)
+        fpath = self.get(filekey)
+        if fpath is None:
+            # One transfer per file: wait for a transfer in progress, if any
+            with _flock(self._path(filekey) + ".lock"):
+                fpath = self.get(filekey)
+                if fpath is None:
+                    fpath = self._copyFile(fromURL, filekey, lcpath, userid, useReplica)
 
         if cdmsobj._debug:
             print(
@@ -510,35 +610,40 @@ class Cache:
         Delete the cache.
         """
         if self.indexpath is not None:
-            lock("index_lock")
-            self.index = shelve.open(self.indexpath)
-            for key in list(self.index.keys()):
-                path = self.index[key]
-                if path == "__READ_PENDING__":
-                    continue  # Don't remove read-pending notifications
-                try:
-                    if cdmsobj._debug:
-                        print(
-                            'Process %d: Deleting cache file %s' %
-                            (os.getpid(), path))
-                    os.unlink(path)
-                except BaseException:
-                    pass
-
-                del self.index[key]
-            self.index.close()
-            unlock("index_lock")
+            with _flock(lockpath("index_lock")):
+                with contextlib.closing(self._connect()) as conn:
+                    for key, path in conn.execute("SELECT key, path FROM entries").fetchall():
+                        try:
+                            if cdmsobj._debug:
+                                print(
+                                    'Process %d: Deleting cache file %s' %
+                                    (os.getpid(), path))
+                            self._removeFile(path)
+                        except BaseException:
+                            pass
+                    with conn:
+                        conn.execute("DELETE FROM entries")
             self.indexpath = None
 
     def clean(self):
         """
-        Clean pending read notifications.
+        Remove partial files of interrupted transfers, and index entries of missing files.
         """
-        lock("index_lock")
-        self.index = shelve.open(self.indexpath)
-        for key in list(self.index.keys()):
-            path = self.index[key]
-            if path == "__READ_PENDING__":
-                del self.index[key]
-        self.index.close()
-        unlock("index_lock")
+        for name in os.listdir(self.direc):
+            if not name.endswith(".part"):
+                continue
+            partial = os.path.join(self.direc, name)
+            key = name.split(".")[0]
+            # The transfer is in progress if its lock is held
+            with _flock(os.path.join(self.direc, key + ".lock"), blocking=False) as locked:
+                if locked:
+                    try:
+                        os.unlink(partial)
+                    except OSError:
+                        pass
+        with _flock(lockpath("index_lock")):
+            with contextlib.closing(self._connect()) as conn:
+                missing = [(key,) for key, path in conn.execute("SELECT key, path FROM entries").fetchall()
+                           if not os.path.isfile(path)]
+                with conn:
+                    conn.executemany("DELETE FROM entries WHERE key = ?", missing)
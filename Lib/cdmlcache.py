@@ -0,0 +1,201 @@
+"""
+Compiled cache of parsed CDML datasets.
+
+Parsing a CDML file rebuilds the node tree (including every axis array) and
+the file map each time the dataset is opened. When the cache is enabled, the
+parse results are pickled to a ``.cdmlc`` file, with NumPy arrays stored as
+raw out-of-band buffers that are mapped back with ``mmap`` on load.
+
+The cache is keyed on the absolute path, modification time and size of the
+CDML file, so a stale entry is simply ignored and rewritten.
+
+Entries are only loaded if they are owned by the user (or root) and are not
+writable by group or others, and they are unpickled with an unpickler which
+only constructs the CDML node classes, containers and NumPy arrays, so that a
+planted cache file cannot run code.
+"""
+import hashlib
+import io
+import mmap
+import os
+import pickle
+import stat
+import struct
+import tempfile
+
+_magic = b'CDMLC\x00\x01\n'
+_version = 1
+_align = 64
+_header = struct.Struct('<QQQ')         # metadata length, pickle length, nbuffers
+_offset = struct.Struct('<QQ')          # buffer offset, buffer length
+
+# Out-of-band pickle buffers need pickle protocol 5 (Python >= 3.8).
+enabled = (pickle.HIGHEST_PROTOCOL >= 5)
+
+# Globals, other than the classes of cdmsNode, which an entry may reference
+_allowed = set([
+    ('collections', 'OrderedDict'),
+    ('builtins', 'set'),
+    ('builtins', 'frozenset'),
+    ('builtins', 'complex'),
+    ('numpy', 'dtype'),
+    ('numpy', 'ndarray'),
+    ('numpy.core.multiarray', '_reconstruct'),
+    ('numpy.core.multiarray', 'scalar'),
+    ('numpy.core.numeric', '_frombuffer'),
+    ('numpy._core.multiarray', '_reconstruct'),
+    ('numpy._core.multiarray', 'scalar'),
+    ('numpy._core.numeric', '_frombuffer'),
+    ('numpy.ma', 'MaskedArray'),
+    ('numpy.ma.core', 'MaskedArray'),
+    ('numpy.ma.core', '_mareconstruct'),
+])
+
+
+class _Unpickler(pickle.Unpickler):
+    """Unpickler which only constructs the objects of a parsed CDML dataset."""
+
+    def find_class(self, module, name):
+        if (module, name) in _allowed:
+            return pickle.Unpickler.find_class(self, module, name)
+        if module == 'cdms2.cdmsNode':
+            result = pickle.Unpickler.find_class(self, module, name)
+            if isinstance(result, type):
+                return result
+        raise pickle.UnpicklingError("cdmlcache: global %s.%s is not allowed" % (module, name))
+
+
+def _loads(data, buffers=None):
+    return _Unpickler(io.BytesIO(data), buffers=buffers).load()
+
+
+def _trusted(st):
+    """Return true if a cache file with stat result <st> may be loaded."""
+    if st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        return False
+    if hasattr(os, 'getuid') and st.st_uid not in (os.getuid(), 0):
+        return False
+    return True
+
+
+def cachePath(path, location):
+    """Return the cache file path for the CDML file <path>.
+
+    Parameters
+    ----------
+    path : absolute path of the CDML file.
+
+    location : 'sidecar' to write the cache next to the CDML file, named
+        from its full file name (x.xml.cdmlc), or a directory name. Entries
+        in a directory cache are named from a hash of the absolute CDML path.
+
+    Returns
+    -------
+    The cache file path, or None if caching is not possible.
+    """
+    if not enabled or location is None:
+        return None
+    if location == 'sidecar':
+        return path + '.cdmlc'
+    key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+    return os.path.join(location, key + '.cdmlc')
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+def read(cachefile, path):
+    """Read a compiled entry for the CDML file <path>.
+
+    Returns
+    -------
+    The cached object, or None if the entry is missing, stale, unreadable or
+    not trusted.
+    """
+    try:
+        fd = os.open(cachefile, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        if not _trusted(os.fstat(fd)):
+            return None
+        try:
+            # ACCESS_COPY gives writable, private pages, so arrays built on
+            # the buffers behave like freshly parsed ones.
+            mm = mmap.mmap(fd, 0, access=mmap.ACCESS_COPY)
+        except (ValueError, OSError):
+            return None
+    finally:
+        os.close(fd)
+
+    try:
+        view = memoryview(mm)
+        pos = len(_magic)
+        if bytes(view[0:pos]) != _magic:
+            return None
+        metalen, picklen, nbuffers = _header.unpack_from(view, pos)
+        pos += _header.size
+        meta = _loads(view[pos:pos + metalen])
+        pos += metalen
+        if meta.get('version') != _version or meta.get('stamp') != _stamp(path):
+            return None
+        buffers = []
+        for i in range(nbuffers):
+            offset, length = _offset.unpack_from(view, pos)
+            pos += _offset.size
+            buffers.append(view[offset:offset + length])
+        return _loads(view[pos:pos + picklen], buffers=buffers)
+    except Exception:
+        return None
+
+
+def write(cachefile, path, obj):
+    """Write <obj> as the compiled entry for the CDML file <path>.
+
+    The entry is written to a temporary file and renamed into place, so
+    concurrent readers never see a partial file. Failures are ignored: the
+    cache is an optimization only.
+    """
+    buffers = []
+    try:
+        meta = pickle.dumps({'version': _version, 'stamp': _stamp(path)}, 2)
+        body = pickle.dumps(obj, 5, buffer_callback=buffers.append)
+        raws = [b.raw() for b in buffers]
+    except Exception:
+        return
+
+    # Buffers follow the header, offset table and pickle, aligned so that
+    # the arrays built on them are aligned too.
+    pos = len(_magic) + _header.size + len(meta) + _offset.size * len(raws) + len(body)
+    offsets = []
+    for raw in raws:
+        pos += (-pos) % _align
+        offsets.append((pos, raw.nbytes))
+        pos += raw.nbytes
+
+    direc = os.path.dirname(cachefile)
+    try:
+        if not os.path.isdir(direc):
+            os.makedirs(direc)
+        fd, tmppath = tempfile.mkstemp(suffix='.tmp', dir=direc)
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_magic)
+            f.write(_header.pack(len(meta), len(body), len(raws)))
+            f.write(meta)
+            for offset, length in offsets:
+                f.write(_offset.pack(offset, length))
+            f.write(body)
+            for (offset, length), raw in zip(offsets, raws):
+                f.write(b'\0' * (offset - f.tell()))
+                f.write(raw)
+        os.replace(tmppath, cachefile)
+    except Exception:
+        try:
+            os.remove(tmppath)
+        except OSError:
+            pass
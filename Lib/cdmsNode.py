@@ -11,6 +11,9 @@ import cdtime
 import re
 import string
 import sys
+import threading
+import weakref
+from collections import OrderedDict
 from .error import CDMSError
 from six import string_types
 
@@ -122,6 +125,67 @@ CdIncreasing = -1
 CdDecreasing = 1
 CdSingleton = 2
 
+# Cache of axis data parsed from CDML content. Axis values are parsed on
+# first use; if a size is set, the least recently used arrays are dropped
+# when the total exceeds it, and parsed again when next needed.
+_axisCacheSize = None                   # Max bytes of parsed axis data, None for no limit
+_axisCacheBytes = 0
+_axisCache = OrderedDict()              # id(node) => (weakref(node), nbytes)
+_axisCacheLock = threading.Lock()
+
+
+def setAxisCacheSize(nbytes):
+    """Bound the memory held by axis values parsed from CDML files.
+
+    Parameters
+    ----------
+    nbytes : maximum number of bytes, or None for no limit.
+    """
+    global _axisCacheSize
+    if nbytes is not None and nbytes < 0:
+        raise CDMSError(InvalidArgumentError + repr(nbytes))
+    with _axisCacheLock:
+        _axisCacheSize = nbytes
+        _trimAxisCache()
+
+
+def getAxisCacheSize():
+    """Return the axis cache size in bytes, or None if unbounded."""
+    return _axisCacheSize
+
+
+def _touchAxisCache(node, nbytes):
+    global _axisCacheBytes
+    if _axisCacheSize is None:
+        return
+    key = id(node)
+    with _axisCacheLock:
+        entry = _axisCache.pop(key, None)
+        if entry is not None:
+            _axisCacheBytes -= entry[1]
+        _axisCache[key] = (weakref.ref(node), nbytes)
+        _axisCacheBytes += nbytes
+        _trimAxisCache(keep=key)
+
+
+def _trimAxisCache(keep=None):
+    # Called with _axisCacheLock held
+    global _axisCacheBytes
+    if _axisCacheSize is None:
+        _axisCache.clear()
+        _axisCacheBytes = 0
+        return
+    while _axisCacheBytes > _axisCacheSize and len(_axisCache) > 0:
+        key, (ref, nbytes) = next(iter(_axisCache.items()))
+        if key == keep:
+            break
+        del _axisCache[key]
+        _axisCacheBytes -= nbytes
+        node = ref()
+        if node is not None and node._datastring_ is not None:
+            node._data_ = None
+
+
 # Map illegal XML characters to entity references:
 # '<' --> &lt;
 # '>' --> &gt;
@@ -543,6 +607,8 @@ class AxisNode(CdmsNode):
                 data, numpy.ndarray), 'data must be a 1-D Numeric array'
         CdmsNode.__init__(self, "axis", id)
         self.datatype = datatype
+        # Unparsed content string, if the data values are parsed on demand
+        self._datastring_ = None
         self.data = data
         # data representation is CdLinear or CdVector
         # If vector, self.data is a numpy array
@@ -565,13 +631,32 @@ class AxisNode(CdmsNode):
         self.setExternalAttr('datatype', self.datatype)
         self.setExternalAttr('length', self.length)
 
-    # Set data from content string
-    # The content of an axis is the data array.
-    def setContentFromString(self, datastring):
-        datatype = self.datatype
-        numericType = CdToNumericType.get(datatype)
-        if numericType is None:
-            raise CDMSError(InvalidDatatype + datatype)
+    # The data array. Content read from a CDML file is kept as a string
+    # and parsed the first time the data is used.
+    def _getData(self):
+        # Work on a local reference: another thread may drop the array
+        # from the cache meanwhile.
+        dataArray = self._data_
+        if dataArray is None and self._datastring_ is not None:
+            dataArray = self._parseData(self._datastring_)
+            if dataArray is None:
+                self._datastring_ = None
+            else:
+                self._data_ = dataArray
+                self.length = len(dataArray)
+                _touchAxisCache(self, dataArray.nbytes)
+        elif dataArray is not None and self._datastring_ is not None:
+            _touchAxisCache(self, dataArray.nbytes)
+        return dataArray
+
+    def _setData(self, data):
+        self._datastring_ = None
+        self._data_ = data
+
+    data = property(_getData, _setData)
+
+    def _parseData(self, datastring):
+        numericType = CdToNumericType.get(self.datatype)
         stringlist = _ArraySep.split(datastring)
         numlist = []
         for numstring in stringlist:
@@ -580,9 +665,23 @@ class AxisNode(CdmsNode):
             numlist.append(float(numstring))
         if len(numlist) > 0:
             # NB! len(zero-length array) causes IndexError on Linux!
-            dataArray = numpy.array(numlist, numericType)
-            self.data = dataArray
-            self.length = len(self.data)
+            return numpy.array(numlist, numericType)
+        return None
+
+    # Parse any pending content, and keep the values permanently
+    def loadData(self):
+        self.data = self.data
+
+    # Set data from content string
+    # The content of an axis is the data array.
+    def setContentFromString(self, datastring):
+        datatype = self.datatype
+        numericType = CdToNumericType.get(datatype)
+        if numericType is None:
+            raise CDMSError(InvalidDatatype + datatype)
+        if _ArraySep.sub('', datastring) != '':
+            self._data_ = None
+            self._datastring_ = datastring
 
     # Set the partition from a string. This does not
     # set the external string representation
@@ -808,6 +907,8 @@ class AxisNode(CdmsNode):
         return self
 
     def __len__(self):
+        if self._data_ is None and self._datastring_ is not None:
+            return self.length
         return len(self.data)
 
 # Linear data element
@@ -8,6 +8,11 @@ import getpass
 import socket
 import string
 import os
+import io
+import fcntl
+import re
+import tempfile
+import threading
 
 MAXFTPCACHE = 10        # Trim the ftp cache beyond this size
 
@@ -154,6 +159,195 @@ class CDURLopener(urllib.request.URLopener):
         return result
 
 
+_contentRange = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+|\*)')
+
+
+class RangeReader(io.RawIOBase):
+    """Read-only file object for a remote HTTP(S) file, fetched in blocks with range requests.
+
+    Only the blocks touched by reads are fetched. Blocks are stored in the local
+    sparse file <cachepath>, and the map of the blocks present is kept in
+    <cachepath>.blocks, so blocks fetched by other readers of the same cache file,
+    in this or another process, are not fetched again. Consecutive missing blocks
+    are fetched with a single request.
+
+    If the server does not support range requests, the whole file is fetched by
+    the first read.
+    """
+
+    def __init__(self, url, cachepath=None, blocksize=1 << 20, reporthook=None, userObject=None):
+        io.RawIOBase.__init__(self)
+        self.url = url
+        self.blocksize = blocksize
+        self.reporthook = reporthook
+        self.userObject = userObject
+        self.nfetched = 0                       # Number of requests for blocks
+        self._lock = threading.Lock()
+        self._pos = 0
+        self.size, self.ranges = self._stat()
+        self.nblocks = (self.size + blocksize - 1) // blocksize
+
+        if cachepath is None:
+            fd, cachepath = tempfile.mkstemp()
+            os.close(fd)
+            self._temporary = True
+        else:
+            self._temporary = False
+        self.cachepath = cachepath
+        self.mappath = cachepath + '.blocks'
+
+        # A cache file of the wrong size is stale, as is a map without its cache file
+        fd = os.open(cachepath, os.O_CREAT | os.O_RDWR, 0o666)
+        self._file = os.fdopen(fd, 'r+b')
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_size != self.size or not os.path.isfile(self.mappath):
+                self._file.truncate(0)
+                self._file.truncate(self.size)
+                with open(self.mappath, 'wb') as f:
+                    f.write(bytes(self.nblocks))
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        self._present = self._readMap()
+
+    def _stat(self):
+        """Return (size, True if the server honours range requests)."""
+        request = urllib.request.Request(self.url, headers={'Range': 'bytes=0-0'})
+        with urllib.request.urlopen(request) as response:
+            match = _contentRange.match(response.headers.get('Content-Range', ''))
+            if response.status == 206 and match is not None and match.group(3) != '*':
+                return int(match.group(3)), True
+            length = response.headers.get('Content-Length')
+            if length is None:
+                raise IOError('Cannot determine the size of %s' % self.url)
+            return int(length), False
+
+    def _readMap(self):
+        with open(self.mappath, 'rb') as f:
+            present = bytearray(f.read())
+        if len(present) != self.nblocks:
+            present = bytearray(self.nblocks)
+        return present
+
+    def _markBlocks(self, first, last):
+        """Record blocks first..last as present, merging with the map of other readers."""
+        with open(self.mappath, 'r+b') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            present = bytearray(f.read())
+            if len(present) != self.nblocks:
+                present = bytearray(self.nblocks)
+            present[first:last + 1] = b'\x01' * (last + 1 - first)
+            f.seek(0)
+            f.write(present)
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        self._present = present
+
+    def _fetch(self, first, last):
+        """Fetch blocks first..last in one request."""
+        start = first * self.blocksize
+        stop = min(self.size, (last + 1) * self.blocksize)
+        if self.ranges:
+            headers = {'Range': 'bytes=%d-%d' % (start, stop - 1)}
+        else:
+            first, last, start, stop = 0, self.nblocks - 1, 0, self.size
+            headers = {}
+        request = urllib.request.Request(self.url, headers=headers)
+        with urllib.request.urlopen(request) as response:
+            if response.status != 206:
+                # The whole file was sent
+                first, last, start, stop = 0, self.nblocks - 1, 0, self.size
+            self._file.seek(start)
+            remaining = stop - start
+            while remaining > 0:
+                data = response.read(min(remaining, self.blocksize))
+                if not data:
+                    raise IOError('Short read of %s at offset %d' % (self.url, stop - remaining))
+                self._file.write(data)
+                remaining -= len(data)
+        self._file.flush()
+        self.nfetched += 1
+        self._markBlocks(first, last)
+        if self.reporthook is not None:
+            if self.reporthook(last + 1, self.blocksize, self.size, self.userObject) == 0:
+                raise KeyboardInterrupt
+
+    def fetch(self, offset, nbytes):
+        """Make sure that the bytes offset:offset+nbytes are in the local cache file."""
+        if nbytes <= 0 or offset >= self.size:
+            return
+        first = offset // self.blocksize
+        last = (min(offset + nbytes, self.size) - 1) // self.blocksize
+        with self._lock:
+            if 0 in self._present[first:last + 1]:
+                self._present = self._readMap()
+            block = first
+            while block <= last:
+                if self._present[block]:
+                    block += 1
+                    continue
+                end = block
+                while end < last and not self._present[end + 1]:
+                    end += 1
+                self._fetch(block, end)
+                block = end + 1
+
+    def fetchAll(self):
+        """Fetch the whole file into the local cache file."""
+        self.fetch(0, self.size)
+
+    def complete(self):
+        """Return True if every block is in the local cache file."""
+        return 0 not in self._present
+
+    # File object interface
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError('negative seek position %d' % offset)
+        self._pos = offset
+        return offset
+
+    def tell(self):
+        return self._pos
+
+    def readinto(self, buffer):
+        nbytes = min(len(buffer), max(self.size - self._pos, 0))
+        if nbytes == 0:
+            return 0
+        self.fetch(self._pos, nbytes)
+        with self._lock:
+            self._file.seek(self._pos)
+            nread = self._file.readinto(memoryview(buffer)[:nbytes])
+        self._pos += nread
+        return nread
+
+    def readall(self):
+        buffer = bytearray(max(self.size - self._pos, 0))
+        nread = self.readinto(buffer)
+        return bytes(buffer[:nread])
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+            if self._temporary:
+                for path in (self.cachepath, self.mappath):
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+        io.RawIOBase.close(self)
+
+
 def sampleReportHook(blocknum, blocksize, size, userObj):
     sizekb = size / 1024
     percent = min(100, int(100.0 * float(blocknum * blocksize) / float(size)))
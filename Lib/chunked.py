@@ -0,0 +1,328 @@
+"""
+Out-of-core reductions of file and dataset variables.
+
+The reductions of MV2 read their argument whole. The functions of this module
+read the variable one block of hyperslabs at a time, along a block axis, and
+accumulate partial sums, counts and extrema, so that memory use is bounded by
+the block size rather than by the size of the variable. The block size is that
+of lazy evaluation, see cdms2.lazy.setBlockSize::
+
+    from cdms2 import chunked
+
+    f = cdms2.open('tas.xml')
+    climatology = chunked.average(f['tas'], axis='time')
+    zonal = chunked.max(f['tas'], axis='longitude', blockaxis='time')
+
+Masked values are ignored. The result is a TransientVariable on the axes which
+are not reduced, masked where no value contributed to it.
+
+Blocks may be read and reduced by a pool of processes (see setProcesses). Each
+worker process opens the file or dataset of the variable by its uri, so this
+applies to variables of files open for reading; other variables are reduced in
+the calling process.
+"""
+import numpy
+from concurrent.futures import ProcessPoolExecutor
+
+from .error import CDMSError
+from .avariable import AbstractVariable
+from .tvariable import TransientVariable
+from .grid import AbstractRectGrid
+from . import dataset
+from . import lazy
+
+# Number of worker processes, 0 to reduce in the calling process
+_processes = 0
+_executor = None
+
+# Files opened by a worker process, keyed on uri
+_openFiles = {}
+
+_kinds = ('sum', 'average', 'max', 'min', 'count')
+
+
+def setProcesses(n):
+    """Set the number of worker processes reducing blocks, 0 to reduce in the calling process."""
+    global _processes, _executor
+    if n < 0:
+        raise CDMSError("setProcesses: number of processes must be >= 0")
+    _processes = int(n)
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+def getProcesses():
+    """Return the number of worker processes reducing blocks."""
+    return _processes
+
+
+def _getExecutor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=_processes)
+    return _executor
+
+
+def sum(var, axis=None, blockaxis=None, dtype=None, processes=None):
+    """Sum of var along axis, see reduce."""
+    return reduce(var, 'sum', axis, blockaxis=blockaxis, dtype=dtype, processes=processes)
+
+
+def average(var, axis=None, weights=None, returned=False, blockaxis=None, processes=None):
+    """(Weighted) average of var along axis, see reduce.
+
+    If returned is true, return the tuple (average, sum of weights).
+    """
+    return reduce(var, 'average', axis, weights=weights, returned=returned, blockaxis=blockaxis,
+                  processes=processes)
+
+
+def max(var, axis=None, blockaxis=None, processes=None):
+    """Maximum of var along axis, see reduce."""
+    return reduce(var, 'max', axis, blockaxis=blockaxis, processes=processes)
+
+
+def min(var, axis=None, blockaxis=None, processes=None):
+    """Minimum of var along axis, see reduce."""
+    return reduce(var, 'min', axis, blockaxis=blockaxis, processes=processes)
+
+
+def count(var, axis=None, blockaxis=None, processes=None):
+    """Number of non-masked values of var along axis, see reduce."""
+    return reduce(var, 'count', axis, blockaxis=blockaxis, processes=processes)
+
+
+def reduce(var, kind, axis=None, weights=None, returned=False, blockaxis=None, dtype=None, processes=None):
+    """Reduce a variable block by block.
+
+    Parameters
+    ----------
+    var : AbstractVariable, typically a file or dataset variable
+    kind : (str) one of 'sum', 'average', 'max', 'min', 'count'
+    axis : axis or sequence of axes to reduce, as an index or an axis
+        specification ('time', '(lat)', ...). None reduces all axes.
+    weights : weights of the average, broadcastable to the shape of var, or
+        one-dimensional along a single reduced axis.
+    returned : if true, the average also returns the sum of the weights
+    blockaxis : axis along which the variable is read in blocks, defaults to
+        the first axis
+    dtype : accumulator type of the sum
+    processes : number of worker processes, defaults to getProcesses()
+
+    Returns
+    -------
+    a TransientVariable on the axes which are not reduced.
+    """
+    if kind not in _kinds:
+        raise CDMSError("reduce: invalid reduction %s, must be one of %s" % (repr(kind), ', '.join(_kinds)))
+    if not isinstance(var, AbstractVariable):
+        raise CDMSError("reduce: argument must be a variable")
+    shape = tuple(var.shape)
+    rank = len(shape)
+    if rank == 0:
+        raise CDMSError("reduce: cannot reduce a scalar variable")
+    if axis is None:
+        reduced = tuple(range(rank))
+    else:
+        if not isinstance(axis, (list, tuple)):
+            axis = (axis,)
+        reduced = tuple(sorted(set(_axisIndex(var, a) for a in axis)))
+    block = 0 if blockaxis is None else _axisIndex(var, blockaxis)
+    if weights is not None:
+        if kind != 'average':
+            raise CDMSError("reduce: weights apply to averages only")
+        weights = _broadcastWeights(weights, shape, reduced)
+
+    # The blocks are ranges of the block axis
+    blocklength = 1
+    for i, n in enumerate(shape):
+        if i != block:
+            blocklength *= n
+    if shape[block] == 0 or blocklength == 0:
+        raise CDMSError("reduce: cannot reduce an empty variable")
+    step = lazy.getBlockSize() // blocklength or 1
+    stops = list(range(step, shape[block], step)) + [shape[block]]
+    ranges = [(i, j) for i, j in zip(range(0, shape[block], step), stops)]
+
+    # Position of the block axis in the result, None if it is reduced
+    kept = [i for i in range(rank) if i not in reduced]
+    outblock = kept.index(block) if block in kept else None
+    outshape = tuple(shape[i] for i in kept)
+
+    if processes is None:
+        processes = _processes
+    source = _source(var) if processes > 0 else None
+    if source is not None:
+        executor = _getExecutor() if processes == _processes else ProcessPoolExecutor(max_workers=processes)
+        try:
+            partials = _mapBlocks(executor, processes, source, rank, block, ranges, kind, reduced, weights, dtype)
+            result = _combine(kind, partials, ranges, outblock, outshape)
+        finally:
+            if executor is not _executor:
+                executor.shutdown()
+    else:
+        partials = (_reduceBlock(_read(var, rank, block, i, j), kind, reduced,
+                                 _weightsBlock(weights, rank, block, i, j), dtype) for i, j in ranges)
+        result = _combine(kind, partials, ranges, outblock, outshape)
+
+    return _result(var, kind, result, reduced, returned)
+
+
+def _axisIndex(var, spec):
+    if isinstance(spec, (int, numpy.integer)):
+        index = int(spec)
+        if index < 0:
+            index += var.rank()
+        if not 0 <= index < var.rank():
+            raise CDMSError("reduce: axis %d out of range" % spec)
+        return index
+    index = var.getAxisIndex(spec)
+    if index < 0:
+        raise CDMSError("reduce: no axis matches %s" % repr(spec))
+    return index
+
+
+def _broadcastWeights(weights, shape, reduced):
+    weights = numpy.ma.filled(weights, 0)
+    if weights.shape != shape and weights.ndim == 1 and len(reduced) == 1:
+        # One-dimensional weights along the reduced axis
+        if len(weights) != shape[reduced[0]]:
+            raise CDMSError("reduce: length of weights does not match the reduced axis")
+        weights = weights.reshape([len(weights) if i == reduced[0] else 1 for i in range(len(shape))])
+    try:
+        return numpy.broadcast_to(weights, shape)
+    except ValueError:
+        raise CDMSError("reduce: weights of shape %s cannot be broadcast to %s" % (weights.shape, shape))
+
+
+def _slices(rank, block, i, j):
+    result = [slice(None)] * rank
+    result[block] = slice(i, j)
+    return tuple(result)
+
+
+def _read(var, rank, block, i, j):
+    return numpy.ma.asarray(var.getSlice(*_slices(rank, block, i, j), squeeze=0, raw=1))
+
+
+def _weightsBlock(weights, rank, block, i, j):
+    if weights is None:
+        return None
+    return weights[_slices(rank, block, i, j)]
+
+
+def _reduceBlock(data, kind, reduced, weights=None, dtype=None):
+    """Return the partial results of a block: a tuple of arrays."""
+    valid = ~numpy.ma.getmaskarray(data)
+    count = valid.sum(reduced)
+    if kind == 'count':
+        return (count,)
+    if kind == 'max':
+        return (numpy.ma.filled(data, numpy.ma.maximum_fill_value(data)).max(reduced), count)
+    if kind == 'min':
+        return (numpy.ma.filled(data, numpy.ma.minimum_fill_value(data)).min(reduced), count)
+    filled = numpy.ma.filled(data, 0)
+    if kind == 'sum':
+        return (filled.sum(reduced, dtype=dtype), count)
+    if weights is None:
+        return (filled.sum(reduced, dtype=numpy.float64), count.astype(numpy.float64), count)
+    weights = numpy.where(valid, weights, 0)
+    return ((filled * weights).sum(reduced, dtype=numpy.float64), weights.sum(reduced, dtype=numpy.float64), count)
+
+
+def _combine(kind, partials, ranges, outblock, outshape):
+    """Combine the partial results of the blocks.
+
+    If the block axis is reduced the partials are accumulated, otherwise each
+    is the block (outblock axis range) of the result.
+    """
+    if kind == 'max':
+        accumulate = (numpy.maximum, numpy.add)
+    elif kind == 'min':
+        accumulate = (numpy.minimum, numpy.add)
+    else:
+        accumulate = (numpy.add,) * 3
+    result = None
+    for (i, j), partial in zip(ranges, partials):
+        if outblock is None:
+            if result is None:
+                result = [numpy.array(p) for p in partial]
+            else:
+                for func, total, p in zip(accumulate, result, partial):
+                    func(total, p, out=total)
+        else:
+            if result is None:
+                result = [numpy.empty(outshape, dtype=numpy.asarray(p).dtype) for p in partial]
+            index = [slice(None)] * len(outshape)
+            index[outblock] = slice(i, j)
+            for total, p in zip(result, partial):
+                total[tuple(index)] = p
+    return result
+
+
+def _result(var, kind, result, reduced, returned):
+    count = result[-1]
+    if kind == 'average':
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            value = numpy.true_divide(result[0], result[1])
+        mask = (count == 0) | (result[1] == 0)
+    elif kind == 'count':
+        value = count
+        mask = numpy.ma.nomask
+    else:
+        value = result[0]
+        mask = (count == 0)
+
+    axes = [ax for i, ax in enumerate(var.getAxisList()) if i not in reduced]
+    grid = var.getGrid()
+    if grid is None or isinstance(grid, AbstractRectGrid) or len(axes) == 0 or \
+            [var.getAxis(i) for i in reduced if var.getAxis(i) in grid.getAxisList()]:
+        grid = None
+    if len(axes) == 0:
+        axes = None
+    id = "variable_%i" % TransientVariable.variable_count
+    TransientVariable.variable_count += 1
+    F = getattr(var, "fill_value", 1.e20)
+    r1 = TransientVariable(numpy.ma.array(value, mask=mask), axes=axes, attributes=var.attributes, grid=grid,
+                           id=id, no_update_from=True, fill_value=F)
+    if kind == 'average' and returned:
+        w1 = TransientVariable(numpy.ma.array(result[1], mask=mask), axes=axes, grid=grid, id=id,
+                               no_update_from=True, fill_value=F)
+        return r1, w1
+    return r1
+
+
+# Process pool. The workers read their blocks from the file or dataset, which
+# they open once.
+
+def _source(var):
+    """Return (uri, variable id) of a variable the workers can read, or None."""
+    if isinstance(var, TransientVariable):
+        return None
+    parent = getattr(var, 'parent', None)
+    uri = getattr(parent, 'uri', None)
+    mode = getattr(parent, '_mode_', None) or getattr(parent, 'mode', None)
+    if uri is None or mode != 'r':
+        return None
+    return uri, var.id
+
+
+def _mapBlocks(executor, processes, source, rank, block, ranges, kind, reduced, weights, dtype):
+    """Generate the partial results of the blocks in order, keeping 2 * processes blocks in flight."""
+    pending = []
+    for i, j in ranges:
+        if len(pending) >= 2 * processes:
+            yield pending.pop(0).result()
+        pending.append(executor.submit(_reduceFileBlock, source, rank, block, i, j, kind, reduced,
+                                       _weightsBlock(weights, rank, block, i, j), dtype))
+    for future in pending:
+        yield future.result()
+
+
+def _reduceFileBlock(source, rank, block, i, j, kind, reduced, weights, dtype):
+    uri, varid = source
+    f = _openFiles.get(uri)
+    if f is None:
+        f = _openFiles[uri] = dataset.openDataset(uri)
+    return _reduceBlock(_read(f[varid], rank, block, i, j), kind, reduced, weights, dtype)
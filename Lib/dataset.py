@@ -31,7 +31,10 @@ from .fvariable import FileVariable
 from .tvariable import asVariable
 from .cdmsNode import CdDatatypes
 from . import convention
+from . import cdmlcache
 import warnings
+import contextlib
+import threading
 from collections import OrderedDict
 from six import string_types
 
@@ -111,6 +114,7 @@ _IndexList5 = re.compile(
 
 _NPRINT = 20
 _showCompressWarnings = True
+_cdmlCache = None
 
 
 def setCompressionWarnings(value=None):
@@ -389,6 +393,36 @@ def getNetcdfDeflateLevelFlag():
     return Cdunif.CdunifGetNCFLAGS("deflate_level")
 
 
+def setCdmlCache(value):
+    """Enable/Disable the compiled cache of parsed CDML datasets.
+
+       Parameters
+       ----------
+       value : None/False to disable the cache, True/'sidecar' to write a
+               .cdmlc file next to each CDML file, or a directory name to
+               keep all cache entries in that directory.
+
+       Returns
+       -------
+       No return value.
+    """
+    global _cdmlCache
+    if value in [None, False, 0]:
+        _cdmlCache = None
+    elif value in [True, 1, 'sidecar']:
+        _cdmlCache = 'sidecar'
+    elif isinstance(value, string_types):
+        _cdmlCache = os.path.abspath(os.path.expanduser(value))
+    else:
+        raise CDMSError(
+            "setCdmlCache value must be None/False, True/'sidecar' or a directory name")
+
+
+def getCdmlCache():
+    """Return the CDML cache setting: None, 'sidecar' or a directory name."""
+    return _cdmlCache
+
+
 def useNetcdf3():
     """ Turns off (0) NetCDF flags for shuffle/cuDa/deflatelevel
     Output files are generated as NetCDF3 Classic after that
@@ -415,6 +449,38 @@ def load(path):
     p.close()
     return p.getRoot()
 
+
+def loadCompiled(path):
+    """Load a CDML file and compile its filemap, using the CDML cache if enabled.
+
+       Parameters
+       ----------
+       path : absolute path of the CDML file.
+
+       Returns
+       -------
+       (datanode, filemap) where filemap is the result of compileFileMap,
+       or None if the dataset has no cdms_filemap.
+    """
+    cachefile = cdmlcache.cachePath(path, _cdmlCache)
+    if cachefile is not None:
+        result = cdmlcache.read(cachefile, path)
+        if result is not None:
+            return result
+    datanode = load(path)
+    text = datanode.getExternalAttr('cdms_filemap')
+    if text is not None:
+        filemap = compileFileMap(text)
+    else:
+        filemap = None
+    if cachefile is not None:
+        # Cache the parsed axis values, so that a hit maps them from the file
+        for node in list(datanode.getIdDict().values()):
+            if node.tag == 'axis':
+                node.loadData()
+        cdmlcache.write(cachefile, path, (datanode, filemap))
+    return datanode, filemap
+
 # Create a tree from a URI
 # URI is of the form scheme://netloc/path;parameters?query#fragment
 # where fragment may be an XPointer.
@@ -459,7 +525,7 @@ def createDataset(path, template=None):
 # 'mode' is 'r', 'r+', 'a', or 'w'
 
 def openDataset(uri, mode='r', template=None,
-                dods=1, dpath=None, hostObj=None):
+                dods=1, dpath=None, hostObj=None, metadata_only=False):
     """
     Open Dataset
 
@@ -470,6 +536,8 @@ def openDataset(uri, mode='r', template=None,
     template : A string template for the datafile(s), for dataset creation
     dods : (int) Default set to 1
     dpath : (str) Destination path.
+    metadata_only : (bool) For a single file opened read-only, defer reading
+        coordinate values and building grids until they are first used.
 
     Returns
     -------
@@ -488,7 +556,7 @@ def openDataset(uri, mode='r', template=None,
         if ext in ['.xml', '.cdml']:
             if mode != 'r':
                 raise ModeNotSupported(mode)
-            datanode = load(path)
+            datanode, filemap = loadCompiled(path)
         else:
             # If the doesn't exist allow it to be created
             # Ok mpi has issues with bellow we need to test this only with 1
@@ -503,7 +571,7 @@ def openDataset(uri, mode='r', template=None,
                 return CdmsFile(path, mode, mpiBarrier=CdMpi)
 
             if libcf is not None:
-                file = CdmsFile(path, mode, hostObj)
+                file = CdmsFile(path, mode, hostObj, metadata_only=metadata_only)
 
                 if hasattr(file, libcf.CF_FILETYPE):
                     if getattr(file, libcf.CF_FILETYPE) == libcf.CF_GLATT_FILETYPE_HOST:
@@ -511,7 +579,7 @@ def openDataset(uri, mode='r', template=None,
                         file = gsHost.open(path, mode)
                 return file
             else:
-                return CdmsFile(path, mode)
+                return CdmsFile(path, mode, metadata_only=metadata_only)
     elif scheme in ['http', 'gridftp', 'https']:
 
         if (dods):
@@ -519,7 +587,7 @@ def openDataset(uri, mode='r', template=None,
                 raise ModeNotSupported(mode)
             # DODS file?
             try:
-                file = CdmsFile(uri, mode)
+                file = CdmsFile(uri, mode, metadata_only=metadata_only)
                 return file
             except Exception:
                 msg = "Error in DODS open of: " + uri
@@ -558,7 +626,7 @@ def openDataset(uri, mode='r', template=None,
         else:
             dpath = head
 
-    dataset = Dataset(uri, mode, datanode, None, dpath)
+    dataset = Dataset(uri, mode, datanode, None, dpath, filemap)
     return dataset
 
 # Functions for parsing the file map.
@@ -689,6 +757,106 @@ def parseFileMap(text):
     return result
 
 
+def compileFileMap(text):
+    """Build the internal filemap of a dataset from its 'cdms_filemap' attribute.
+
+       Parameters
+       ----------
+       text : the cdms_filemap string.
+
+       Returns
+       -------
+       (filemap, varparts) where filemap is a dictionary mapping
+       (varname, timestart, levstart, forecast) => path, and varparts maps
+       each varname to [timepart, levpart]. timepart is the partition for
+       time (or None if not time-dependent) and levpart is the partition in
+       the level dimension, or None if not applicable.
+
+       Notes
+       -----
+       For variables partitioned in both time and level dimension, it is assumed that
+       for a given variable the partitions are orthogonal. That is, for a given
+       variable, at any timeslice the level partition is the same.
+    """
+    result = {}
+    varparts = {}
+    for varlist, varmap in parseFileMap(text):
+        for varname in varlist:
+            timemap = {}
+            levmap = {}
+            # The for loop was:
+            # for tstart, tend, levstart, levend, path in varmap:
+            # but now there _may_ be an additional item before path...
+            for varm1 in varmap:
+                tstart, tend, levstart, levend = varm1[0:4]
+                if (len(varm1) >= 6):
+                    forecast = varm1[4]
+                else:
+                    forecast = None
+                path = varm1[-1]
+                result[(varname, tstart, levstart, forecast)] = path
+                if tstart is not None:
+                    # Collect unique (tstart, tend) tuples
+                    timemap[(tstart, tend)] = 1
+                if levstart is not None:
+                    levmap[(levstart, levend)] = 1
+            tkeys = list(timemap.keys())
+            if len(tkeys) > 0:
+                tkeys.sort()
+                tpart = [list(x) for x in tkeys]
+            else:
+                tpart = None
+            levkeys = list(levmap.keys())
+            if len(levkeys) > 0:
+                levkeys.sort()
+                levpart = [list(x) for x in levkeys]
+            else:
+                levpart = None
+            varparts[varname] = [tpart, levpart]
+    return result, varparts
+
+
+# Files kept open by Dataset.openFile in the current thread, see keepFilesOpen
+_keptFiles = threading.local()
+
+
+class _KeptFile(object):
+    """Data file kept open across reads: close is deferred to closeFiles."""
+
+    def __init__(self, f):
+        self._file = f
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def close(self):
+        pass
+
+
+@contextlib.contextmanager
+def keepFilesOpen(handles, maxfiles=16):
+    """Keep the data files opened for reading by datasets in this thread open.
+
+    Within the context, Dataset.openFile reuses the files kept in <handles>, an
+    OrderedDict, instead of opening them again. At most <maxfiles> files are
+    kept, the least recently opened one is closed first. The files stay open on
+    exit, so that handles can be passed to successive contexts; close them with
+    closeFiles(handles).
+    """
+    previous = getattr(_keptFiles, 'state', None)
+    _keptFiles.state = (handles, maxfiles)
+    try:
+        yield handles
+    finally:
+        _keptFiles.state = previous
+
+
+def closeFiles(handles):
+    """Close the files kept by keepFilesOpen."""
+    while handles:
+        handles.popitem(last=False)[1]._file.close()
+
+
 # A CDMS dataset consists of a CDML/XML file and one or more data files
 try:
     from .cudsinterface import cuDataset
@@ -699,7 +867,7 @@ except BaseException:
 class Dataset(CdmsObj, cuDataset):
 
     def __init__(self, uri, mode, datasetNode=None,
-                 parent=None, datapath=None):
+                 parent=None, datapath=None, filemap=None):
         if datasetNode is not None and datasetNode.tag != 'dataset':
             raise CDMSError('Node is not a dataset node')
         CdmsObj.__init__(self, datasetNode)
@@ -868,59 +1036,14 @@ class Dataset(CdmsObj, cuDataset):
                 var.setBounds(bounds)
 
         # Create the internal filemap, if attribute 'cdms_filemap' is present.
-        # _filemap_ is a dictionary, mapping (varname, timestart, levstart) => path
-        #
-        # Also, for each partitioned variable, set attribute '_varpart_' to [timepart, levpart]
-        # where timepart is the partition for time (or None if not time-dependent)
-        # and levpart is the partition in the level dimension, or None if not applicable.
-        #
-        # For variables partitioned in both time and level dimension, it is assumed that
-        # for a given variable the partitions are orthogonal. That is, for a given
-        # variable, at any timeslice the level partition is the same.
+        # A precompiled filemap (from the CDML cache) skips the parse.
         if hasattr(self, 'cdms_filemap'):
-            self._filemap_ = {}
-            filemap = parseFileMap(self.cdms_filemap)
-            for varlist, varmap in filemap:
-                for varname in varlist:
-                    timemap = {}
-                    levmap = {}
-                    fcmap = {}
-                    # The for loop was:
-                    # for tstart, tend, levstart, levend, path in varmap:
-                    # but now there _may_ be an additional item before path...
-                    for varm1 in varmap:
-                        tstart, tend, levstart, levend = varm1[0:4]
-                        if (len(varm1) >= 6):
-                            forecast = varm1[4]
-                        else:
-                            forecast = None
-                        path = varm1[-1]
-                        self._filemap_[
-                            (varname, tstart, levstart, forecast)] = path
-                        if tstart is not None:
-                            # Collect unique (tstart, tend) tuples
-                            timemap[(tstart, tend)] = 1
-                        if levstart is not None:
-                            levmap[(levstart, levend)] = 1
-                        if forecast is not None:
-                            fcmap[(forecast, forecast)] = 1
-                    tkeys = list(timemap.keys())
-                    if len(tkeys) > 0:
-                        tkeys.sort()
-                        tpart = [list(x) for x in tkeys]
-                    else:
-                        tpart = None
-                    levkeys = list(levmap.keys())
-                    if len(levkeys) > 0:
-                        levkeys.sort()
-                        levpart = [list(x) for x in levkeys]
-                    else:
-                        levpart = None
-                    fckeys = list(fcmap.keys())
-                    if len(fckeys) > 0:
-                        fckeys.sort()
-                    if varname in self.variables:
-                        self.variables[varname]._varpart_ = [tpart, levpart]
+            if filemap is None:
+                filemap = compileFileMap(self.cdms_filemap)
+            self._filemap_, varparts = filemap
+            for varname, varpart in varparts.items():
+                if varname in self.variables:
+                    self.variables[varname]._varpart_ = varpart
 
     def getConvention(self):
         """Get the metadata convention associated with this dataset or file."""
@@ -1076,6 +1199,19 @@ class Dataset(CdmsObj, cuDataset):
     # <filename> is relative to the self.datapath
     # <mode> is the open mode.
     def openFile(self, filename, mode):
+        state = getattr(_keptFiles, 'state', None)
+        if state is None or mode != 'r':
+            return self._openFile(filename, mode)
+        handles, maxfiles = state
+        key = (id(self), filename)
+        f = handles.get(key)
+        if f is None:
+            f = handles[key] = _KeptFile(self._openFile(filename, mode))
+            while len(handles) > maxfiles:
+                handles.popitem(last=False)[1]._file.close()
+        return f
+
+    def _openFile(self, filename, mode):
 
         # Opened via a local XML file?
         if self.parent is None:
@@ -1155,6 +1291,17 @@ class Dataset(CdmsObj, cuDataset):
                         path = cache.getFile(fileurl, fileDN)
                         f = Cdunif.CdunifFile(path, mode)
                     return f
+                if scheme in ('http', 'https'):
+                    # netCDF byte-range mode fetches only the blocks which are read
+                    try:
+                        return Cdunif.CdunifFile(fileurl + '#mode=bytes', mode)
+                    except Exception as err:
+                        if cdmsobj._debug == 1:
+                            sys.stdout.write('%s#mode=bytes: %s\n' % (fileurl, err))
+                            sys.stdout.flush()
+                    cache = self.parent.enableCache()
+                    path = cache.getFile(fileurl, (self.uri, filename))
+                    return Cdunif.CdunifFile(path, mode)
 
             # File not found
             raise FileNotFound(filename)
@@ -1230,8 +1377,10 @@ class Dataset(CdmsObj, cuDataset):
 
 class CdmsFile(CdmsObj, cuDataset):
 
-    def __init__(self, path, mode, hostObj=None, mpiBarrier=False):
+    def __init__(self, path, mode, hostObj=None, mpiBarrier=False, metadata_only=False):
 
+        if metadata_only and mode != 'r':
+            raise CDMSError(ModeNotSupported + mode)
         if mpiBarrier:
             MPI.COMM_WORLD.Barrier()
 
@@ -1266,6 +1415,8 @@ class CdmsFile(CdmsObj, cuDataset):
         self.grids = {}
         self.xlinks = {}
         self._gridmap_ = {}
+        self._gridsLock_ = threading.RLock()
+        self._gridsBuilding_ = False
 
         # self.attributes returns the Cdunif file dictionary.
 # self.replace_external_attributes(self._file_.__dict__)
@@ -1327,109 +1478,155 @@ class CdmsFile(CdmsObj, cuDataset):
                 self.axes[name] = FileAxis(self, name, cdunifvar)
             self.axes = OrderedDict(sorted(list(self.axes.items())))
 
-            # Attach boundary variables
-            for name in coordsaux:
-                var = self.variables[name]
-                bounds = self._convention_.getVariableBounds(self, var)
-                var.setBounds(bounds)
+            # Attach boundary variables, unless deferred
+            if metadata_only:
+                self._pendingBounds_ = coordsaux
+            else:
+                self._pendingBounds_ = []
+                self._attachBounds(coordsaux)
 
             self.dictdict = {
                 'variable': self.variables,
                 'axis': self.axes,
-                'rectGrid': self.grids,
-                'curveGrid': self.grids,
-                'genericGrid': self.grids}
+                'rectGrid': self.__dict__['grids'],
+                'curveGrid': self.__dict__['grids'],
+                'genericGrid': self.__dict__['grids']}
 
             # Initialize variable domains
             for var in list(self.variables.values()):
                 var.initDomain(self.axes)
 
-            # Build grids
-            for var in list(self.variables.values()):
-                # Get grid information for the variable. gridkey has the form
-                # (latname,lonname,order,maskname, abstract_class).
-                gridkey, lat, lon = var.generateGridkey(
-                    self._convention_, self.variables)
-
-                # If the variable is gridded, lookup the grid. If no such grid exists,
-                # create a unique gridname, create the grid, and add to the
-                # gridmap.
-                if gridkey is None:
-                    grid = None
-                else:
-                    grid = self._gridmap_.get(gridkey)
-                    if grid is None:
-
-                        if hasattr(var, 'grid_type'):
-                            gridtype = var.grid_type
-                        else:
-                            gridtype = "generic"
+            # Build grids, unless deferred until the grids are first used
+            self._gridsPending_ = True
+            if not metadata_only:
+                self._initGrids()
+        except BaseException:
+            self.close()
+            raise
 
-                        candidateBasename = None
-                        if gridkey[4] == 'rectGrid':
-                            gridshape = (len(lat), len(lon))
-                        elif gridkey[4] == 'curveGrid':
-                            gridshape = lat.shape
-                        elif gridkey[4] == 'genericGrid':
-                            gridshape = lat.shape
-                            candidateBasename = 'grid_%d' % gridshape
-                        else:
-                            gridshape = (len(lat), len(lon))
+    def _attachBounds(self, coordsaux):
+        """Attach boundary variables to the auxiliary coordinate axes."""
+        for name in coordsaux:
+            var = self.variables[name]
+            bounds = self._convention_.getVariableBounds(self, var)
+            var.setBounds(bounds)
+
+    def _initGrids(self):
+        """Build the file grids and set the grid of each variable.
+
+        This is done when the file is opened, or on first use of the grids
+        for a file opened with metadata_only=True. The grids are built once,
+        under the grids lock of the file: other threads wait for the build,
+        and the grids stay pending if it fails, so that it is retried. A
+        call made while the grids are built, by the building thread, returns
+        at once.
+        """
+        with self._gridsLock_:
+            if not self.__dict__.get('_gridsPending_') or self._gridsBuilding_:
+                return
+            self._gridsBuilding_ = True
+            try:
+                self._buildGrids()
+                self._gridsPending_ = False
+            finally:
+                self._gridsBuilding_ = False
+
+    def _buildGrids(self):
+        """Build the file grids and set the grid of each variable, see _initGrids."""
+        self._attachBounds(self._pendingBounds_)
+        self._pendingBounds_ = []
+        grids = self.__dict__['grids']
+        for var in list(self.variables.values()):
+            # Get grid information for the variable. gridkey has the form
+            # (latname,lonname,order,maskname, abstract_class).
+            gridkey, lat, lon = var.generateGridkey(
+                self._convention_, self.variables)
+
+            # If the variable is gridded, lookup the grid. If no such grid exists,
+            # create a unique gridname, create the grid, and add to the
+            # gridmap.
+            if gridkey is None:
+                grid = None
+            else:
+                grid = self._gridmap_.get(gridkey)
+                if grid is None:
 
-                        if candidateBasename is None:
-                            candidateBasename = 'grid_%dx%d' % gridshape
-                        if candidateBasename not in self.grids:
-                            gridname = candidateBasename
-                        else:
-                            foundname = 0
-                            for i in range(97, 123):  # Lower-case letters
-                                candidateName = candidateBasename + \
-                                    '_' + chr(i)
-                                if candidateName not in self.grids:
-                                    gridname = candidateName
-                                    foundname = 1
-                                    break
+                    if hasattr(var, 'grid_type'):
+                        gridtype = var.grid_type
+                    else:
+                        gridtype = "generic"
+
+                    candidateBasename = None
+                    if gridkey[4] == 'rectGrid':
+                        gridshape = (len(lat), len(lon))
+                    elif gridkey[4] == 'curveGrid':
+                        gridshape = lat.shape
+                    elif gridkey[4] == 'genericGrid':
+                        gridshape = lat.shape
+                        candidateBasename = 'grid_%d' % gridshape
+                    else:
+                        gridshape = (len(lat), len(lon))
 
-                            if not foundname:
-                                print(
-                                    'Warning: cannot generate a grid for variable', var.id)
-                                continue
+                    if candidateBasename is None:
+                        candidateBasename = 'grid_%dx%d' % gridshape
+                    if candidateBasename not in grids:
+                        gridname = candidateBasename
+                    else:
+                        foundname = 0
+                        for i in range(97, 123):  # Lower-case letters
+                            candidateName = candidateBasename + \
+                                '_' + chr(i)
+                            if candidateName not in grids:
+                                gridname = candidateName
+                                foundname = 1
+                                break
+
+                        if not foundname:
+                            print(
+                                'Warning: cannot generate a grid for variable', var.id)
+                            continue
 
-                        # Create the grid
-                        if gridkey[4] == 'rectGrid':
-                            grid = FileRectGrid(
-                                self, gridname, lat, lon, gridkey[2], gridtype)
-                        else:
-                            if gridkey[3] != '':
-                                if gridkey[3] in self.variables:
-                                    maskvar = self.variables[gridkey[3]]
-                                else:
-                                    print(
-                                        'Warning: mask variable %s not found' %
-                                        gridkey[3])
-                                    maskvar = None
+                    # Create the grid
+                    if gridkey[4] == 'rectGrid':
+                        grid = FileRectGrid(
+                            self, gridname, lat, lon, gridkey[2], gridtype)
+                    else:
+                        if gridkey[3] != '':
+                            if gridkey[3] in self.variables:
+                                maskvar = self.variables[gridkey[3]]
                             else:
+                                print(
+                                    'Warning: mask variable %s not found' %
+                                    gridkey[3])
                                 maskvar = None
-                            if gridkey[4] == 'curveGrid':
-                                grid = FileCurveGrid(
+                        else:
+                            maskvar = None
+                        if gridkey[4] == 'curveGrid':
+                            grid = FileCurveGrid(
+                                lat, lon, gridname, parent=self, maskvar=maskvar)
+                        else:
+                            try:
+                                grid = FileGenericGrid(
                                     lat, lon, gridname, parent=self, maskvar=maskvar)
-                            else:
-                                try:
-                                    grid = FileGenericGrid(
-                                        lat, lon, gridname, parent=self, maskvar=maskvar)
-                                except BaseException:
-                                    if(lat.rank() == 1 and lon.rank() == 1):
-                                        grid = FileRectGrid(
-                                            self, gridname, lat, lon, gridkey[2], gridtype)
+                            except BaseException:
+                                if(lat.rank() == 1 and lon.rank() == 1):
+                                    grid = FileRectGrid(
+                                        self, gridname, lat, lon, gridkey[2], gridtype)
 
-                        self.grids[grid.id] = grid
-                        self._gridmap_[gridkey] = grid
+                    grids[grid.id] = grid
+                    self._gridmap_[gridkey] = grid
 
-                # Set the variable grid
-                var.setGrid(grid)
-        except BaseException:
-            self.close()
-            raise
+            # Set the variable grid
+            var.setGrid(grid)
+
+    def _getGrids(self):
+        # _initGrids checks the flag again under the grids lock
+        if self.__dict__.get('_gridsPending_'):
+            self._initGrids()
+        return self.__dict__['grids']
+
+    # Grids of a file opened with metadata_only=True are built on first use
+    grids = property(_getGrids)
 
     def __enter__(self):
         return self
@@ -1490,6 +1687,7 @@ class CdmsFile(CdmsObj, cuDataset):
                     obj.parent = None
                     del obj
         self.dictdict = self.variables = self.axes = {}
+        self._gridsPending_ = False
         self._file_.close()
         self._status_ = 'closed'
 
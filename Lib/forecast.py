@@ -5,13 +5,26 @@
 
 
 from __future__ import print_function
+from concurrent.futures import ThreadPoolExecutor
 import numpy
+import threading
 import cdtime
 import cdms2
 import copy
 from cdms2 import CDMSError
 from six import string_types
 
+# Maximum number of forecasts read concurrently by forecasts.__call__
+_maxWorkers = 4
+
+
+def setMaxWorkers(n):
+    """Set the maximum number of forecasts read concurrently."""
+    global _maxWorkers
+    if n < 1:
+        raise CDMSError("setMaxWorkers: number of workers must be >= 1")
+    _maxWorkers = n
+
 
 def two_times_from_one(t):
     """
@@ -115,9 +128,10 @@ class forecast():
         """close file."""
         self.file.close()
 
-    def __call__(self, varname):
-        """Reads the specified variable from this forecast's file."""
-        return self.file(varname)
+    def __call__(self, varname, *args, **kwargs):
+        """Reads the specified variable from this forecast's file. Selectors
+        are passed on to the file variable."""
+        return self.file(varname, *args, **kwargs)
 
     def __getitem__(self, varname):
         """Reads variable attributes from this forecast's file."""
@@ -287,7 +301,7 @@ class forecasts():
         for fc in self.fcs:
             fc.close()
 
-    def __call__(self, varname, forecast_times='All'):
+    def __call__(self, varname, forecast_times='All', *args, **kwargs):
         """
 
         Example
@@ -299,16 +313,17 @@ class forecasts():
         But you can read only the forecasts generated at particular times
         by providing a "forecast_times" argument, the same as the "forecast_times"
         argument in the forecasts.__init__ method.
+
+        Further arguments are selectors, applied to the variable of each
+        forecast, e.g. fcs('tas', 'All', latitude=(-30, 30)). Only the
+        selected hyperslab of each forecast is read.
         """
         # Assumptions include: For two forecasts, f1('var') and f2('var') are
         # the same variable in all but values - same names, same domain,
         # same units, same mask, etc.
-        # Note 1: Why can't we start out by doing self.dataset(varname) as in
+        # Note: Why can't we start out by doing self.dataset(varname) as in
         # __getitem__?  That's simpler to code, but in this case it would require
         # reading large amounts of data from files, only to throw it away.
-        # Note 2: if you want slices, e.g. in space axes, this isn't the
-        # function for you.  Invoke __getitem__ to get a DatasetVariable,
-        # then do your slicing on that.
 
         # Generate the forecast list, and read in the variable for every
         # listed forecast.
@@ -317,23 +332,50 @@ class forecasts():
         else:
             mytimesl = self.forecast_times_to_list(forecast_times)
             varfcs = [f for f in self.fcs if (f.fctl in mytimesl)]
-        vars = [fc(varname) for fc in varfcs]
+        if len(varfcs) == 0:
+            raise CDMSError("No forecasts selected for %s" % varname)
+
+        # The first forecast gives the shape of the result. The others are
+        # read concurrently; the data and mask of each read are copied into
+        # its slot of the result. The mask is allocated by the first masked
+        # forecast.
+        v0 = varfcs[0](varname, *args, **kwargs)
+        a = numpy.empty((len(varfcs),) + v0.shape, dtype=v0.dtype)
+        m = [None]
+        lock = threading.Lock()
+
+        def read(i):
+            if i == 0:
+                var = v0
+            else:
+                var = varfcs[i](varname, *args, **kwargs)
+            a[i] = numpy.ma.getdata(var)
+            mask = numpy.ma.getmask(var)
+            if mask is not numpy.ma.nomask and mask.any():
+                with lock:
+                    if m[0] is None:
+                        m[0] = numpy.zeros(a.shape, dtype=numpy.bool_)
+                m[0][i] = mask
+
+        with ThreadPoolExecutor(max_workers=min(_maxWorkers, len(varfcs))) as executor:
+            list(executor.map(read, range(len(varfcs))))
 
         # Create the variable from the data, with mask:
-        v0 = vars[0]
-        a = numpy.asarray([v.data for v in vars])
-        if (isinstance(v0._mask, numpy.ndarray)):
-            m = numpy.asarray([v._mask for v in vars])
+        if m[0] is not None:
             v = cdms2.tvariable.TransientVariable(
-                a, mask=m, fill_value=v0._fill_value)
+                a, mask=m[0], fill_value=v0._fill_value)
         else:
-            m = False
-            v = cdms2.tvariable.TransientVariable(a)
+            v = cdms2.tvariable.TransientVariable(a, fill_value=v0._fill_value)
 
         # Domain-related attributes:
             # We get the tomain from __getitem__ to make sure that fcs[var] is consistent
             # with fcs(var)
-        fvd = self.__getitem__(varname, varfcs).domain
+        if len(args) == 0 and len(kwargs) == 0:
+            fvd = self.__getitem__(varname, varfcs).domain
+        else:
+            # The forecast axis, followed by the (selected) axes of a forecast
+            fvd = [self.forecast_axis(varname, varfcs)] + \
+                [(axis, 0, len(axis), len(axis)) for axis in v0.getAxisList()]
         v._TransientVariable__domain = fvd
         # former domain code, not using __getitem:
         # ltvd = len(v0._TransientVariable__domain)
@@ -6,11 +6,13 @@ import re
 from .error import CDMSError
 import numpy  # , PropertiedClasses, internattr
 import copy
+import hashlib
 import sys
+from collections import OrderedDict
 from .cdmsobj import CdmsObj
 from .axis import TransientAxis, createAxis, createUniformLatitudeAxis
 from .axis import createUniformLongitudeAxis, getAutoBounds
-from .axis import createGaussianAxis, isSubsetVector
+from .axis import createGaussianAxis, isSubsetVector, gridattr
 from .axis import lookupArray  # noqa
 
 MethodNotImplemented = "Method not yet implemented"
@@ -23,6 +25,54 @@ _classifyGrids = 1
 # (if any). If 'off', the value of .grid_type overrides the classification.
 
 
+# Cache of classifications, digest of the latitude values => (type, nlats, isoffset)
+_classifyCache = OrderedDict()
+# Cache of subset tests, digests of (lat, lon, lat2, lon2) => (issubset, latindex)
+_subsetCache = OrderedDict()
+_classifyCacheSize = 1024
+
+
+def _axisDigest(axis):
+    """Return a digest of the values of axis.
+
+    The digest is kept on the axis while its version stamp and length are
+    unchanged, so it is computed once per axis."""
+    stamp = (axis.getVersion(), len(axis))
+    entry = axis.__dict__.get('_digest_')
+    if entry is not None and entry[0] == stamp:
+        return entry[1]
+    ar = numpy.ascontiguousarray(numpy.ma.filled(axis[:]))
+    digest = (ar.dtype.str, ar.shape, hashlib.sha1(ar).digest())
+    axis.__dict__['_digest_'] = (stamp, digest)
+    return digest
+
+
+def _cacheLookup(cache, key, func, *args):
+    """Return cache[key], setting it to func(*args) first if absent."""
+    result = cache.get(key)
+    if result is not None:
+        try:
+            cache.move_to_end(key)
+        except KeyError:
+            pass
+        return result
+    result = func(*args)
+    cache[key] = result
+    while len(cache) > _classifyCacheSize:
+        try:
+            cache.popitem(last=False)
+        except KeyError:
+            break
+    return result
+
+
+def _isSubsetGrid(lat, lon, lat2, lon2):
+    """Return (issubset, latindex): issubset is true if lat, lon are subsets of lat2, lon2."""
+    latIsSubset, latindex = isSubsetVector(lat[:], lat2[:], 1.e-2)
+    lonIsSubset, lonindex = isSubsetVector(lon[:], lon2[:], 1.e-2)
+    return (bool(latIsSubset and lonIsSubset), latindex)
+
+
 def setClassifyGrids(mode):
     """
     Not documented
@@ -526,15 +576,18 @@ class AbstractRectGrid(AbstractGrid):
     #     are the points wrt nlat, plus the poles.
     def classify(self):
         """
-        Not documented
-        """
-        import regrid2._regrid
+        Classify the grid from its latitudes.
 
-        CLOSE_ENOUGH = 1.e-3
+        Results are cached on a digest of the latitude values, so a grid with
+        the latitudes of one classified before is not classified again.
+        """
         lat = self.getLatitude()
         if len(lat) == 1:
             return ('generic', 1, 0)
+        return _cacheLookup(_classifyCache, _axisDigest(lat), self._classify, lat)
 
+    def _classify(self, lat):
+        CLOSE_ENOUGH = 1.e-3
         latar = lat[:]
         if lat[0] < lat[-1]:              # increasing?
             hassouth = (abs(lat[0] + 90.0) < 1.e-2)
@@ -553,17 +606,14 @@ class AbstractRectGrid(AbstractGrid):
         nlats = len(latar)
 
         # Get the related Gaussian latitude
-        gausslatns, wts, bnds = regrid2._regrid.gridattr(
-            len(latar), 'gaussian')
+        gausslatns, wts, bnds = gridattr(len(latar), 'gaussian')
         gausslatsn = gausslatns[::-1]
         diffs = latar[1:] - latar[:-1]
-        equalareans, wts, bnds = regrid2._regrid.gridattr(
-            len(latar), 'equalarea')
+        equalareans, wts, bnds = gridattr(len(latar), 'equalarea')
         equalareasn = equalareans[::-1]
 
         # Get the Gaussian lats for len+1, in case this is a boundary
-        dumlat, dumwt, bndsplusns = regrid2._regrid.gridattr(
-            len(latar) + 1, 'gaussian')
+        dumlat, dumwt, bndsplusns = gridattr(len(latar) + 1, 'gaussian')
         bndsplussn = bndsplusns[::-1]
 
         # Look for N-S equality
@@ -632,9 +682,9 @@ class AbstractRectGrid(AbstractGrid):
                 lon2 = grid2.getLongitude()
                 if len(lat) > len(lat2) or len(lon) > len(lon2):
                     continue
-                latIsSubset, latindex = isSubsetVector(lat[:], lat2[:], 1.e-2)
-                lonIsSubset, lonindex = isSubsetVector(lon[:], lon2[:], 1.e-2)
-                if latIsSubset and lonIsSubset:
+                key = (_axisDigest(lat), _axisDigest(lon), _axisDigest(lat2), _axisDigest(lon2))
+                isSubset, latindex = _cacheLookup(_subsetCache, key, _isSubsetGrid, lat, lon, lat2, lon2)
+                if isSubset:
                     if len(lat2) > nlats:
                         coverage = 'regional'
                     nlats = len(lat2)
@@ -648,8 +698,6 @@ class AbstractRectGrid(AbstractGrid):
         """
         Not documented
         """
-        import regrid2._regrid
-
         if hasattr(self, "parent") and self.parent is not None:
             gridfamily = list(self.parent.grids.values())
         else:
@@ -666,7 +714,7 @@ class AbstractRectGrid(AbstractGrid):
         lat = self.getLatitude()
         ascending = (lat[0] < lat[-1])
         if gridtype == 'gaussian':
-            pts, wts, bnds = regrid2._regrid.gridattr(nlats, 'gaussian')
+            pts, wts, bnds = gridattr(nlats, 'gaussian')
             if ascending:
                 bnds = bnds[::-1]
             latbnds = numpy.zeros((len(lat), 2), numpy.float)
@@ -677,7 +725,7 @@ class AbstractRectGrid(AbstractGrid):
             latbnds[-1, :] = numpy.maximum(-90.0,
                                            numpy.minimum(90.0, latbnds[-1, :]))
         elif gridtype == 'equalarea':
-            pts, wts, bnds = regrid2._regrid.gridattr(nlats, 'equalarea')
+            pts, wts, bnds = gridattr(nlats, 'equalarea')
             if ascending:
                 bnds = bnds[::-1]
             latbnds = numpy.zeros((len(lat), 2), numpy.float)
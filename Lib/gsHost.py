@@ -11,8 +11,12 @@ No guarantee is provided whatsoever. Use at your own risk.
 
 from __future__ import print_function
 from ctypes import c_char_p, c_int, CDLL, byref
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
 import cdms2
 from cdms2.error import CDMSError
+from cdms2.Cdunif import CdunifFile
 from cdms2.gsStaticVariable import StaticFileVariable
 from cdms2.gsTimeVariable import TimeFileVariable
 from six import string_types
@@ -144,7 +148,7 @@ class Host:
                                                              vfindx, gfindx,
                                                              fName_ct)
                 statFilenames.append(fName_ct.value)
-                f = cdms2.open(fName_ct.value, 'r')
+                f = self.openFile(fName_ct.value)
                 varNames = f.listvariable()
 
                 for vn in varNames:
@@ -160,7 +164,6 @@ class Host:
 
                     # set file name
                     self.statVars[vn][gfindx] = fName_ct.value
-                f.close()
 
         # time dependent data
         for vfindx in range(self.nTimeDataFiles):
@@ -173,7 +176,7 @@ class Host:
                                                             gfindx,
                                                             fName_ct)
                     timeFilenames.append(fName_ct.value)
-                    f = cdms2.open(fName_ct.value, 'r')
+                    f = self.openFile(fName_ct.value)
                     varNames = f.listvariable()
                     for vn in varNames:
                         # Add coordinate names a local list of coordinates
@@ -188,7 +191,6 @@ class Host:
                                  for ig in range(self.nGrids)]
                         # set file name
                         self.timeVars[vn][gfindx][tfindx] = fName_ct.value
-                    f.close()
 
         # Grid names and data. Must come after time and static file dictionaries
         # because they define the coordinates.
@@ -200,7 +202,7 @@ class Host:
                                                      gfindx,
                                                      gName_ct)
 
-            varNames = cdms2.open(fName_ct.value, 'r').listvariable()
+            varNames = self.openFile(fName_ct.value).listvariable()
             for vn in varNames:
                 if vn in coordinates:
                     if vn not in list(self.gridVars.keys()):
@@ -261,6 +263,101 @@ class Host:
         # global attributes
         self.attributes = {}
 
+        # Open file handles, {(filename, mode): file}, the files owned by
+        # variables, and the pool used to read tiles and time files
+        # concurrently
+        self._files = {}
+        self._cdunifFiles = {}
+        self._privateFiles = []
+        self._lock = threading.Lock()
+        self._executor = None
+        if not hasattr(self, 'maxWorkers'):
+            self.maxWorkers = min(8, os.cpu_count() or 1)
+
+    def openFile(self, filename, mode=None):
+        """
+        Return a cdms2 file object for a file of the aggregation. Files are
+        opened once and cached until the host is closed. The handles are
+        shared, so they must not be modified; see openPrivateFile.
+
+        Parameters
+        ----------
+        filename : file name
+        mode : open mode, defaults to the mode of the host
+
+        Returns
+        -------
+        file object
+        """
+        return self._cachedHandle(self._files, cdms2.open, filename, mode)
+
+    def openPrivateFile(self, filename, mode=None):
+        """
+        Return a new cdms2 file object for a file of the aggregation, for a
+        variable which adds its own variables and axes to the file. The file
+        is not shared, and is closed with the host.
+        """
+        if mode is None:
+            mode = self.mode
+        handle = cdms2.open(filename, mode)
+        with self._lock:
+            self._privateFiles.append(handle)
+        return handle
+
+    def openCdunifFile(self, filename, mode=None):
+        """
+        Return a Cdunif file object for a file of the aggregation. Files are
+        opened once and cached until the host is closed. The handles are
+        shared, so they are only read from.
+        """
+        return self._cachedHandle(self._cdunifFiles, CdunifFile, filename, mode)
+
+    def _cachedHandle(self, cache, opener, filename, mode):
+        if mode is None:
+            mode = self.mode
+        key = (filename, mode)
+        with self._lock:
+            handle = cache.get(key)
+        if handle is None:
+            handle = opener(filename, mode)
+            with self._lock:
+                cached = cache.setdefault(key, handle)
+            if cached is not handle:
+                # Opened concurrently by another thread
+                handle.close()
+                handle = cached
+        return handle
+
+    def setMaxWorkers(self, n):
+        """
+        Set the number of threads used to read tiles and time files
+        concurrently.
+        """
+        if n < 1:
+            raise CDMSError("setMaxWorkers: number of workers must be >= 1")
+        self.maxWorkers = n
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def map(self, func, *iterables):
+        """
+        Apply func to the items of iterables on the worker pool of the host.
+
+        Returns
+        -------
+        list of results, in order. The first exception raised by a call
+        is raised again, after all calls have completed.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.maxWorkers)
+        futures = [self._executor.submit(func, *args) for args in zip(*iterables)]
+        errors = [future.exception() for future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+        return [future.result() for future in futures]
+
     def getMosaic(self):
         """
         Get the mosaic filename
@@ -546,6 +643,10 @@ class Host:
         """
         Close the file
         """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        for handle in list(self._files.values()) + list(self._cdunifFiles.values()) + self._privateFiles:
+            handle.close()
         self.__initialize()
         self._status_ = 'closed'
 
@@ -12,7 +12,6 @@ import cdms2
 from cdms2.error import CDMSError
 from cdms2.hgrid import TransientCurveGrid, FileCurveGrid
 from cdms2.coord import TransientAxis2D, TransientVirtualAxis
-from cdms2.Cdunif import CdunifFile
 from cdms2.coord import FileAxis2D
 from cdms2.fvariable import FileVariable
 from cdms2.axis import FileAxis
@@ -233,7 +232,7 @@ class StaticFileVariable(StaticVariable):
         mode = hostObj.mode
         gridFilenames = hostObj.getGridFilenames()
 
-        for gridIndex in range(self.nGrids):
+        def openTile(gridIndex):
 
             # Get the filenames
             fn = hostObj.statVars[varName][gridIndex]
@@ -241,11 +240,12 @@ class StaticFileVariable(StaticVariable):
 
             # Open the files
             # Need f and u because they serve slightly different purposes
-            f = cdms2.open(fn, mode)
+            # f is private: the variable and its axes are added to it
+            f = hostObj.openPrivateFile(fn, mode)
             # f.axes exists while axes is not a part of u
-            u = CdunifFile(fn, mode)
+            u = hostObj.openCdunifFile(fn, mode)
 #            u.variables[varName].gridIndex = gridIndex
-            g = CdunifFile(gn, mode)
+            g = hostObj.openCdunifFile(gn, mode)
 
             # Turn the coordinates into a list
             if hasattr(u.variables[varName], "coordinates"):
@@ -285,7 +285,10 @@ class StaticFileVariable(StaticVariable):
 #            grid = FileGenericGrid(lat, lon, gridname, parent = f, maskvar = None)
             grid = FileCurveGrid(lat, lon, gridname, parent=f, maskvar=None)
             f.variables[varName]._grid_ = grid
-            self.vars[gridIndex] = f.variables[varName]
+            return f.variables[varName]
+
+        # Open the tiles concurrently
+        self.vars = hostObj.map(openTile, range(self.nGrids))
         self._repr_string = "StaticFileVariable"
 
     def listall(self, all=None):
@@ -7,15 +7,14 @@ This code is provided with the hope that it will be useful.
 No guarantee is provided whatsoever. Use at your own risk.
 """
 
+import numpy
 import cdms2
 from cdms2.MV2 import concatenate as MV2concatenate
 from cdms2.error import CDMSError
 from cdms2.hgrid import FileCurveGrid
-from cdms2.Cdunif import CdunifFile
 from cdms2.coord import FileAxis2D
 from cdms2.fvariable import FileVariable
 from cdms2.axis import FileAxis, TransientAxis
-from cdms2.axis import concatenate as axisConcatenate
 
 
 class TimeAggregatedFileVariable:
@@ -59,13 +58,19 @@ class TimeAggregatedFileVariable:
             sliced variable
         """
 
-        subsetList = []
-        for iFile in range(self.hostObj.nTimeSliceFiles):
+        # Read the time files concurrently. A file which does not intersect
+        # the selection raises a CDMSError and is skipped.
+        def select(fv):
             try:
-                var = self.fvs[iFile](*args, **kwargs)
-                subsetList.append(var)
-            except Exception:
-                pass
+                return fv(*args, **kwargs), None
+            except CDMSError as err:
+                return None, err
+
+        results = self.hostObj.map(select, self.fvs[:self.hostObj.nTimeSliceFiles])
+        subsetList = [var for var, err in results if var is not None]
+        if len(subsetList) == 0:
+            raise CDMSError("No data selected from %s:\n%s" %
+                            (self.fvs[0].id, "\n".join([str(err) for var, err in results])))
 
         newvar = self.createTransientVariableFromList(subsetList)
 
@@ -103,7 +108,7 @@ class TimeAggregatedFileVariable:
                 newslc = self.buildSlice(slc, tv.getAxisList())
                 return tv[newslc]
             elif isinstance(slc[timeAxisIndex], int):
-                fileIndex = slc[timeAxisIndex] / nTSF
+                fileIndex = slc[timeAxisIndex] // nTSF
                 timeIndex = slc[timeAxisIndex] % nTSF
 
                 # Get just the file needed for the index slice requested.
@@ -134,45 +139,26 @@ class TimeAggregatedFileVariable:
             the file index for a given time index
         """
 
-        # Loop over the number of time slices per file for the given variable and
-        # the number of time steps per file.
+        # Split the requested global time indices into runs of consecutive
+        # indices in the same file.
 
         nTSF = self.nTimeStepsPerFile
         nTSV = self.nTimeStepsPerVariable
-        timI1 = []
-        filI1 = []
-        timI2 = []
-        filI2 = []
 
-        if timeslc.step is None:
+        start, stop, step = timeslc.start, timeslc.stop, timeslc.step
+        if step is None:
             step = 1
-        else:
-            step = timeslc.step
-        stop = timeslc.stop
-        if timeslc.stop >= nTSV:
+        if start is None:
+            start = 0
+        if stop is None or stop >= nTSV:
             stop = nTSV
-        ii = [i / nTSF for i in range(timeslc.start, stop, step)]
-        tt = [i % nTSF for i in range(timeslc.start, stop, step)]
-        indx = 0
-        for i in ii:
-            if indx == 0:
-                timI1.append(tt[indx])
-                filI1.append(ii[indx])
-            else:
-                if ii[indx] == ii[indx - 1]:
-                    timI1.append(tt[indx])
-                    filI1.append(ii[indx])
-                else:
-                    timI2.append(timI1)
-                    filI2.append(filI1)
-                    timI1 = []
-                    filI1 = []
-                    timI1.append(tt[indx])
-                    filI1.append(ii[indx])
-            indx += 1
+        indices = numpy.arange(start, stop, step)
+        files = indices // nTSF
+        times = indices % nTSF
+        breaks = numpy.flatnonzero(numpy.diff(files)) + 1
 
-        filI2.append(filI1)
-        timI2.append(timI1)
+        filI2 = [f.tolist() for f in numpy.split(files, breaks)]
+        timI2 = [t.tolist() for t in numpy.split(times, breaks)]
 
         return filI2, timI2
 
@@ -267,13 +253,9 @@ class TimeAggregatedFileVariable:
             aggregated transient variable
         """
 
-        outvar = tvList[0]
         if len(tvList) > 1:
-            for varIndex in range(1, len(tvList)):
-                new = MV2concatenate((outvar, tvList[varIndex]))
-                outvar = new
-
-        return outvar
+            return MV2concatenate(tvList)
+        return tvList[0]
 
     def createTransientVariableFromIndices(self, fileIndices, timeIndices):
         """
@@ -293,60 +275,44 @@ class TimeAggregatedFileVariable:
 
              Subset the grid after exiting.
         """
-        from numpy import reshape
-        firsttime = True
         nTSF = self.nTimeStepsPerFile
-        if not isinstance(fileIndices, int):
-            for files, times in zip(fileIndices, timeIndices):
-                for indx, file in enumerate(files):
-                    # Should make these slices.
-                    cvar = self.fvs[file][times[indx]]
-
-                    grid = self.fvs[file].getGrid()
-                    atts = cvar.attributes
-
-                    # Insert the new time axis.
-                    axisTime = self.fvs[file].getTime()
-                    timeAxis = TransientAxis([file * nTSF + times[indx]],
-                                             attributes=axisTime.attributes,
-                                             id=axisTime.id)
-                    axes = self.buildAxes(
-                        timeAxis, self.fvs[file].getAxisList())
-
-                    # shape --> tm1.shape = (1, :, :)
-                    tm1 = reshape(cvar, tuple([1] + list(cvar.shape)))
-
-                    # Attach needed items
-                    var = cdms2.createVariable(tm1,
-                                               axes=axes,
-                                               grid=grid,
-                                               attributes=atts,
-                                               id=cvar.standard_name)
-
-                    # Create cdms2 transient variable
-                    if firsttime:
-                        new = var
-                        firsttime = False
-                    else:
-                        # insert the new time axis.
-                        taA = new.getTime()
-                        newTime = axisConcatenate((taA, timeAxis),
-                                                  attributes=axisTime.attributes,
-                                                  id=axisTime.id)
-                        axes = self.buildAxes(
-                            newTime, self.fvs[file].getAxisList())
-
-                        tmp = MV2concatenate((new, var))
-                        new = cdms2.createVariable(tmp,
-                                                   axes=axes,
-                                                   grid=grid,
-                                                   attributes=atts,
-                                                   id=cvar.standard_name)
-
-        else:
-            new = self.fvs[fileIndices][timeIndices]
-
-        return new
+        if isinstance(fileIndices, int):
+            return self.fvs[fileIndices][timeIndices]
+
+        # Each run of time steps in a file is read in one hyperslab, into a
+        # preallocated result.
+        runs = [(files[0], times) for files, times in zip(fileIndices, timeIndices) if len(times) > 0]
+        if len(runs) == 0:
+            raise CDMSError("No time steps requested")
+        nTimes = sum([len(times) for file, times in runs])
+        result = None
+        pos = 0
+        for file, times in runs:
+            first, last = times[0], times[-1]
+            step = (times[1] - first) if len(times) > 1 else 1
+            stop = last + (1 if step > 0 else -1)
+            if stop < 0:
+                stop = None
+            cvar = self.fvs[file][first:stop:step]
+            if result is None:
+                result = numpy.ma.empty((nTimes,) + cvar.shape[1:], dtype=cvar.dtype)
+                atts = cvar.attributes
+                varid = cvar.standard_name
+            result[pos:pos + len(times)] = cvar
+            pos += len(times)
+
+        # The time axis values are the global time indices
+        fv = self.fvs[runs[-1][0]]
+        axisTime = fv.getTime()
+        values = numpy.concatenate([file * nTSF + numpy.asarray(times) for file, times in runs])
+        timeAxis = TransientAxis(values, attributes=axisTime.attributes, id=axisTime.id)
+        axes = self.buildAxes(timeAxis, fv.getAxisList())
+
+        return cdms2.createVariable(result,
+                                    axes=axes,
+                                    grid=fv.getGrid(),
+                                    attributes=atts,
+                                    id=varid)
 
 
 class TimeFileVariable:
@@ -370,65 +336,70 @@ class TimeFileVariable:
         self.vars = []
         mode = hostObj.mode
 
-        for gridIndex in range(hostObj.nGrids):
+        def openTimeFile(gridIndex, timeFileIndex):
 
             # Get the filenames
             aa = list(hostObj.gridVars.keys())
             gn = hostObj.gridVars[aa[0]][gridIndex]
-            g = CdunifFile(gn, mode)
-
-            vars = []
-
-            for timeFileIndex in range(hostObj.nTimeDataFiles):
-
-                # Open the files
-                fn = hostObj.timeVars[varName][gridIndex][timeFileIndex]
-                # Need f and u because they serve slightly different purposes
-                f = cdms2.open(fn, mode)
-                # f.axes exists while axes is not a part of u
-                u = CdunifFile(fn, mode)
-#                u.variables[varName].gridIndex = gridIndex
-
-                # Turn the coordinates into a list
-                if hasattr(u.variables[varName], "coordinates"):
-                    coords = u.variables[varName].coordinates.split()
-
-                # coords1d = f._convention_.getAxisIds(u.variables)
-                # coordsaux = f._convention_.getAxisAuxIds(u.variables, coords1d)
-                # Convert the variable into a FileVariable
-                f.variables[varName] = FileVariable(
-                    f, varName, u.variables[varName])
-
-                # Add the coordinates to the file
-                for coord in coords:
-                    f.variables[coord] = g.variables[coord]
-                    f.variables[coord] = FileAxis2D(
-                        f, coord, g.variables[coord])
-
-                # Build the axes
-                for key in list(f.axes.keys()):
-                    f.axes[key] = FileAxis(f, key, None)
-
-                # Set the boundaries
-                for coord in coords:
-                    bounds = f._convention_.getVariableBounds(
-                        f, f.variables[coord])
-                    f.variables[coord].setBounds(bounds)
-
-                # Initialize the domain
-                for var in list(f.variables.values()):
-                    var.initDomain(f.axes)
-
-                # Add the grid
-                gridkey, lat, lon = f.variables[varName].generateGridkey(
-                    f._convention_, f.variables)
-                gridname = ("grid%d_" % gridIndex) + "%dx%d" % lat.shape
-#                grid = FileGenericGrid(lat, lon, gridname, parent = f, maskvar = None)
-                grid = FileCurveGrid(
-                    lat, lon, gridname, parent=f, maskvar=None)
-                f.variables[varName]._grid_ = grid
-                vars.append(f.variables[varName])
+            g = hostObj.openCdunifFile(gn, mode)
+
+            # Open the files
+            fn = hostObj.timeVars[varName][gridIndex][timeFileIndex]
+            # Need f and u because they serve slightly different purposes
+            # f is private: the variable and its axes are added to it
+            f = hostObj.openPrivateFile(fn, mode)
+            # f.axes exists while axes is not a part of u
+            u = hostObj.openCdunifFile(fn, mode)
+#            u.variables[varName].gridIndex = gridIndex
+
+            # Turn the coordinates into a list
+            if hasattr(u.variables[varName], "coordinates"):
+                coords = u.variables[varName].coordinates.split()
+
+            # coords1d = f._convention_.getAxisIds(u.variables)
+            # coordsaux = f._convention_.getAxisAuxIds(u.variables, coords1d)
+            # Convert the variable into a FileVariable
+            f.variables[varName] = FileVariable(
+                f, varName, u.variables[varName])
+
+            # Add the coordinates to the file
+            for coord in coords:
+                f.variables[coord] = g.variables[coord]
+                f.variables[coord] = FileAxis2D(
+                    f, coord, g.variables[coord])
+
+            # Build the axes
+            for key in list(f.axes.keys()):
+                f.axes[key] = FileAxis(f, key, None)
+
+            # Set the boundaries
+            for coord in coords:
+                bounds = f._convention_.getVariableBounds(
+                    f, f.variables[coord])
+                f.variables[coord].setBounds(bounds)
+
+            # Initialize the domain
+            for var in list(f.variables.values()):
+                var.initDomain(f.axes)
+
+            # Add the grid
+            gridkey, lat, lon = f.variables[varName].generateGridkey(
+                f._convention_, f.variables)
+            gridname = ("grid%d_" % gridIndex) + "%dx%d" % lat.shape
+#            grid = FileGenericGrid(lat, lon, gridname, parent = f, maskvar = None)
+            grid = FileCurveGrid(
+                lat, lon, gridname, parent=f, maskvar=None)
+            f.variables[varName]._grid_ = grid
+            return f.variables[varName]
+
+        # Open the tiles and time files concurrently
+        nTimeDataFiles = hostObj.nTimeDataFiles
+        indices = [(gridIndex, timeFileIndex) for gridIndex in range(hostObj.nGrids)
+                   for timeFileIndex in range(nTimeDataFiles)]
+        fvs = hostObj.map(openTimeFile, [i for i, j in indices], [j for i, j in indices])
 
+        for gridIndex in range(hostObj.nGrids):
+            vars = fvs[gridIndex * nTimeDataFiles:(gridIndex + 1) * nTimeDataFiles]
             tafv = TimeAggregatedFileVariable(gridIndex, vars, hostObj)
             self.vars.append(tafv)
 
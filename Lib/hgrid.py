@@ -15,19 +15,22 @@ from .axis import TransientVirtualAxis
 from .axis import getAutoBounds, allclose
 from cdms2 import bindex
 from cdms2 import _bindex
-from functools import reduce
 import copy
 
 MethodNotImplemented = "Method not yet implemented"
 
 
-def _flatten(boundsar):
-    boundsshape = boundsar.shape
-    if len(boundsshape) > 2:
-        newshape = (reduce((lambda x, y: x * y),
-                           boundsshape[:-1], 1), boundsshape[-1])
-        boundsar.shape = newshape
-    return boundsar
+def _nonConvex(lonb, latb):
+    """Return a boolean array, true for the cells (rows of the (ncell, nnode)
+    bounds arrays) which fail the cross-product test at any node."""
+    lonb1 = numpy.roll(lonb, -1, axis=1)
+    latb1 = numpy.roll(latb, -1, axis=1)
+    vec0lon = lonb1 - lonb
+    vec0lat = latb1 - latb
+    vec1lon = numpy.roll(vec0lon, -1, axis=1)
+    vec1lat = numpy.roll(vec0lat, -1, axis=1)
+    cross = vec0lon * vec1lat - vec0lat * vec1lon
+    return numpy.any(cross < 0.0, axis=1)
 
 
 class AbstractHorizontalGrid(AbstractGrid):
@@ -155,35 +158,11 @@ class AbstractHorizontalGrid(AbstractGrid):
         -------
         a 1D numpy array of cells that fail the cross-product test.
         """
-
-        from numpy import zeros, where, less, logical_or, compress
-
         latb, lonb = self.getBounds()
-
-        saveshape = lonb.shape
-        lonb = _flatten(lonb)
-        latb = _flatten(latb)
-
-        ncell, nnode = lonb.shape
-        badmask = zeros((ncell,))
-        for n0 in range(nnode):
-            n1 = (n0 + 1) % nnode
-            n2 = (n1 + 1) % nnode
-            vec0lon = lonb[:, n1] - lonb[:, n0]
-            vec0lat = latb[:, n1] - latb[:, n0]
-            vec1lon = lonb[:, n2] - lonb[:, n1]
-            vec1lat = latb[:, n2] - latb[:, n1]
-            cross = vec0lon * vec1lat - vec0lat * vec1lon
-
-            mask = where(less(cross, 0.0), 1, 0)
-            badmask = logical_or(mask, badmask)
-
-        badcells = compress(badmask, list(range(len(badmask))))
-
-        lonb.shape = saveshape
-        latb.shape = saveshape
-
-        return badcells
+        nnode = lonb.shape[-1]
+        lonb = numpy.reshape(lonb, (-1, nnode))
+        latb = numpy.reshape(latb, (-1, nnode))
+        return numpy.nonzero(_nonConvex(lonb, latb))[0]
 
     def fixCutCells(self, nonConvexCells, threshold=270.0):
         """
@@ -208,58 +187,37 @@ class AbstractHorizontalGrid(AbstractGrid):
         -------
         value is a 1D array of indices of cells that cannot be repaired.
         """
-
-        from numpy import take, array
-
         latb, lonb = self.getBounds()
 
         saveshape = lonb.shape
-        lonb = _flatten(lonb)
-        latb = _flatten(latb)
-
-        ncell, nnode = lonb.shape
-
-        lonb2 = take(lonb, nonConvexCells, axis=0)
-        latb2 = take(latb, nonConvexCells, axis=0)
-
-        newbadcells = []
-        for k in range(len(nonConvexCells)):
-            savelons = lonb2[k]
-
-            # Loop twice
-            for node in range(2 * nnode):
-                n0 = node % nnode
-                n1 = (n0 + 1) % nnode
-                vec0lon = lonb2[k, n1] - lonb2[k, n0]
-                if vec0lon > threshold:
-                    lonb2[k, n1] -= 360.0
-                elif vec0lon < -threshold:
-                    lonb2[k, n1] += 360.0
-
-            # If the cross-product test still fails, restore
-            # the original values and add to the nonConvexCells list
-            for n0 in range(nnode):
-                n1 = (n0 + 1) % nnode
-                n2 = (n1 + 1) % nnode
-                vec0lon = lonb2[k, n1] - lonb2[k, n0]
-                vec0lat = latb2[k, n1] - latb2[k, n0]
-                vec1lon = lonb2[k, n2] - lonb2[k, n1]
-                vec1lat = latb2[k, n2] - latb2[k, n1]
-                cross = vec0lon * vec1lat - vec0lat * vec1lon
-
-                if cross < 0:
-                    lonb2[k] = savelons
-                    newbadcells.append(nonConvexCells[k])
-                    break
+        nnode = saveshape[-1]
+        lonb = numpy.array(lonb).reshape((-1, nnode))
+        latb = numpy.reshape(latb, (-1, nnode))
+
+        cells = numpy.asarray(nonConvexCells, dtype=numpy.intp)
+        lonb2 = lonb[cells]
+        latb2 = latb[cells]
+
+        # Shift each node by 360 degrees where the step from the previous
+        # node exceeds the threshold, going round all the cells twice
+        for node in range(2 * nnode):
+            n0 = node % nnode
+            n1 = (n0 + 1) % nnode
+            vec0lon = lonb2[:, n1] - lonb2[:, n0]
+            lonb2[:, n1] = numpy.where(vec0lon > threshold, lonb2[:, n1] - 360.0,
+                                       numpy.where(vec0lon < -threshold, lonb2[:, n1] + 360.0, lonb2[:, n1]))
+
+        # Cells which still fail the cross-product test keep their
+        # original values and are returned
+        bad = _nonConvex(lonb2, latb2)
+        lonb2[bad] = lonb[cells[bad]]
 
         # Scatter the repaired cell bounds back to the original bounds
         # and reset the grid bounds.
-        for k in range(len(nonConvexCells)):
-            lonb[nonConvexCells[k]] = lonb2[k]
-        lonb.shape = saveshape
-        self.getLongitude().setBounds(lonb)
+        lonb[cells] = lonb2
+        self.getLongitude().setBounds(lonb.reshape(saveshape))
 
-        return array(newbadcells)
+        return cells[bad]
 
 
 class AbstractCurveGrid(AbstractHorizontalGrid):
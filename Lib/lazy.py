@@ -0,0 +1,361 @@
+"""
+Deferred evaluation of MV2 arithmetic.
+
+In deferred mode (see MV2.setDeferred and MV2.deferred), elementwise MV2
+operations and the sum and average reductions return an Expression, which
+records the operation instead of computing it::
+
+    with MV2.deferred():
+        anomaly = (a - b) * w / MV2.sum(w)
+    result = anomaly.compute()
+
+The expression is evaluated when compute() is called, or when the values are
+needed (numpy.asarray, or any MV2 function which is not deferred). Evaluation
+is blocked along the first dimension of the result: the whole expression is
+applied to one block of rows of data and mask at a time, so the temporaries
+are the size of a block rather than the size of the result. Reductions are
+evaluated first, in the same blocked way over their argument. File variables
+in an expression are read one block at a time.
+"""
+import numpy
+
+from .error import CDMSError
+from .avariable import AbstractVariable
+from .tvariable import TransientVariable
+from .grid import AbstractRectGrid
+
+# Maximum number of elements of a result block
+_blockSize = 1 << 20
+
+
+def setBlockSize(n):
+    """Set the maximum number of elements evaluated in one block, or read in one block by cdms2.chunked."""
+    global _blockSize
+    if n < 1:
+        raise CDMSError("setBlockSize: block size must be >= 1")
+    _blockSize = int(n)
+
+
+def getBlockSize():
+    """Return the maximum number of elements evaluated in one block, or read in one block by cdms2.chunked."""
+    return _blockSize
+
+
+def _broadcastShape(shape1, shape2):
+    dummies = [numpy.lib.stride_tricks.as_strided(numpy.zeros(1), shape=s, strides=(0,) * len(s))
+               for s in (shape1, shape2)]
+    try:
+        return numpy.broadcast(*dummies).shape
+    except ValueError:
+        raise CDMSError("Shapes %s and %s cannot be broadcast together" % (shape1, shape2))
+
+
+def asExpression(x):
+    """Return x as an Expression."""
+    if isinstance(x, Expression):
+        return x
+    return Leaf(x)
+
+
+class Expression(object):
+    """Deferred result of MV2 operations.
+
+    An Expression has the shape of its result. Arithmetic on an expression
+    returns an expression; compute() returns the result as a
+    TransientVariable.
+    """
+
+    # Take precedence over numpy arrays and masked arrays in mixed operations
+    __array_priority__ = 100
+
+    def __init__(self, shape):
+        self.shape = tuple(shape)
+        self.ndim = len(self.shape)
+
+    def rank(self):
+        return self.ndim
+
+    def __len__(self):
+        if self.ndim == 0:
+            raise TypeError("len() of unsized expression")
+        return self.shape[0]
+
+    def __repr__(self):
+        return "<%s shape=%s>" % (self.__class__.__name__, repr(self.shape))
+
+    def compute(self):
+        """Evaluate the expression.
+
+        Returns
+        -------
+        a TransientVariable, with the axes of the operands when they
+        are variables.
+        """
+        memo = {}
+        result = _evaluate(self, memo)
+        axes, grid = self.getDomain()
+        return TransientVariable(result, axes=axes, grid=grid, no_update_from=True)
+
+    def __array__(self, dtype=None, copy=None):
+        result = numpy.ma.filled(self.compute())
+        if dtype is not None:
+            result = result.astype(dtype)
+        return result
+
+    def getDomain(self):
+        """Return (axes, grid) of the result, or (None, None) if unknown."""
+        return None, None
+
+    def children(self):
+        return ()
+
+    # Arithmetic
+
+    def __add__(self, other):
+        return Binary(numpy.ma.add, self, other)
+
+    def __radd__(self, other):
+        return Binary(numpy.ma.add, other, self)
+
+    def __sub__(self, other):
+        return Binary(numpy.ma.subtract, self, other)
+
+    def __rsub__(self, other):
+        return Binary(numpy.ma.subtract, other, self)
+
+    def __mul__(self, other):
+        return Binary(numpy.ma.multiply, self, other)
+
+    def __rmul__(self, other):
+        return Binary(numpy.ma.multiply, other, self)
+
+    def __truediv__(self, other):
+        return Binary(numpy.ma.true_divide, self, other)
+
+    def __rtruediv__(self, other):
+        return Binary(numpy.ma.true_divide, other, self)
+
+    __div__ = __truediv__
+    __rdiv__ = __rtruediv__
+
+    def __floordiv__(self, other):
+        return Binary(numpy.ma.floor_divide, self, other)
+
+    def __rfloordiv__(self, other):
+        return Binary(numpy.ma.floor_divide, other, self)
+
+    def __pow__(self, other):
+        return Binary(numpy.ma.power, self, other)
+
+    def __rpow__(self, other):
+        return Binary(numpy.ma.power, other, self)
+
+    def __neg__(self):
+        return Unary(numpy.ma.negative, self)
+
+    def __abs__(self):
+        return Unary(numpy.ma.absolute, self)
+
+
+class Leaf(Expression):
+    """Operand of an expression: a variable, array or scalar."""
+
+    def __init__(self, value):
+        if isinstance(value, AbstractVariable) or isinstance(value, numpy.ndarray):
+            shape = value.shape
+        else:
+            value = numpy.ma.asarray(value)
+            shape = value.shape
+        Expression.__init__(self, shape)
+        self.value = value
+
+    def getDomain(self):
+        if isinstance(self.value, AbstractVariable):
+            # A rectilinear grid is implicitly defined by the axes
+            grid = self.value.getGrid()
+            if isinstance(grid, AbstractRectGrid):
+                grid = None
+            return self.value.getAxisList(), grid
+        return None, None
+
+    def rows(self, i, j):
+        value = self.value
+        if isinstance(value, AbstractVariable) and not isinstance(value, TransientVariable):
+            return numpy.ma.asarray(value.getSlice(slice(i, j), squeeze=0, raw=1))
+        return numpy.ma.asarray(value)[i:j]
+
+    def whole(self):
+        value = self.value
+        if isinstance(value, AbstractVariable) and not isinstance(value, TransientVariable):
+            return numpy.ma.asarray(value.getValue(squeeze=0))
+        return numpy.ma.asarray(value)
+
+
+class Unary(Expression):
+    """Elementwise operation on one operand."""
+
+    def __init__(self, func, a, kwargs={}):
+        a = asExpression(a)
+        Expression.__init__(self, a.shape)
+        self.func = func
+        self.a = a
+        self.kwargs = kwargs
+
+    def children(self):
+        return (self.a,)
+
+    def getDomain(self):
+        return self.a.getDomain()
+
+
+class Binary(Expression):
+    """Elementwise operation on two operands, with broadcasting."""
+
+    def __init__(self, func, a, b, kwargs={}):
+        a = asExpression(a)
+        b = asExpression(b)
+        Expression.__init__(self, _broadcastShape(a.shape, b.shape))
+        self.func = func
+        self.a = a
+        self.b = b
+        self.kwargs = kwargs
+
+    def children(self):
+        return (self.a, self.b)
+
+    def getDomain(self):
+        for child in (self.a, self.b):
+            if child.shape == self.shape:
+                axes, grid = child.getDomain()
+                if axes is not None:
+                    return axes, grid
+        return None, None
+
+
+class Reduction(Expression):
+    """Sum or average of an operand along one axis (or all axes if axis is None)."""
+
+    def __init__(self, kind, a, axis=None, dtype=None):
+        a = asExpression(a)
+        if axis is not None:
+            if axis < 0:
+                axis = axis + a.ndim
+            if not 0 <= axis < a.ndim:
+                raise CDMSError("Reduction axis %d out of range" % axis)
+            shape = a.shape[:axis] + a.shape[axis + 1:]
+        else:
+            shape = ()
+        Expression.__init__(self, shape)
+        self.kind = kind
+        self.a = a
+        self.axis = axis
+        self.dtype = dtype
+
+    def children(self):
+        return (self.a,)
+
+    def getDomain(self):
+        if self.axis is None:
+            return None, None
+        axes, grid = self.a.getDomain()
+        if axes is None:
+            return None, None
+        return axes[:self.axis] + axes[self.axis + 1:], None
+
+
+# Evaluation. Results of subexpressions which are needed whole (reductions,
+# and operands broadcast along the first dimension) are computed once and
+# kept in memo, keyed on the node id.
+
+def _evaluate(node, memo):
+    """Return the value of node as a masked array."""
+    key = id(node)
+    if key in memo:
+        return memo[key]
+    if isinstance(node, Leaf):
+        result = node.whole()
+    elif isinstance(node, Reduction):
+        result = _reduce(node, memo)
+    elif node.ndim == 0:
+        result = _rows(node, 0, 0, memo)
+    else:
+        data = mask = None
+        for i, j in _blocks(node.shape):
+            block = _rows(node, i, j, memo)
+            if data is None:
+                data = numpy.empty(node.shape, dtype=block.dtype)
+            data[i:j] = numpy.ma.getdata(block)
+            blockmask = numpy.ma.getmask(block)
+            if blockmask is not numpy.ma.nomask and blockmask.any():
+                if mask is None:
+                    mask = numpy.zeros(node.shape, dtype=numpy.bool_)
+                mask[i:j] = blockmask
+        result = numpy.ma.array(data, mask=(numpy.ma.nomask if mask is None else mask), copy=0)
+    memo[key] = result
+    return result
+
+
+def _blocks(shape):
+    """Generate the row ranges (i, j) of the blocks of an array of <shape>."""
+    rowsize = 1
+    for n in shape[1:]:
+        rowsize *= n
+    nrows = max(1, _blockSize // max(rowsize, 1))
+    for i in range(0, shape[0], nrows):
+        yield i, min(i + nrows, shape[0])
+
+
+def _rows(node, i, j, memo, top=None):
+    """Return rows i:j of node, aligned with the first dimension of <top>.
+
+    Operands which do not extend along the first dimension of top (lower
+    rank, or broadcast from length 1) are evaluated whole, once.
+    """
+    if top is None:
+        top = node
+    if node.ndim < top.ndim or node.ndim == 0 or node.shape[0] != top.shape[0] or \
+            isinstance(node, Reduction):
+        return _evaluate(node, memo)
+    if isinstance(node, Leaf):
+        return node.rows(i, j)
+    if isinstance(node, Unary):
+        return node.func(_rows(node.a, i, j, memo, top), **node.kwargs)
+    return node.func(_rows(node.a, i, j, memo, top), _rows(node.b, i, j, memo, top), **node.kwargs)
+
+
+def _reduce(node, memo):
+    """Evaluate a Reduction over the blocks of its operand."""
+    a = node.a
+    axis = node.axis
+    if a.ndim == 0:
+        value = _evaluate(a, memo)
+        return value if node.kind == 'average' else numpy.ma.sum(value, dtype=node.dtype)
+
+    if axis is not None and axis != 0:
+        # Reduce each block, the results are blocks of the reduced array
+        if node.kind == 'sum':
+            parts = [numpy.ma.sum(_rows(a, i, j, memo), axis, dtype=node.dtype) for i, j in _blocks(a.shape)]
+        else:
+            parts = [numpy.ma.average(_rows(a, i, j, memo), axis) for i, j in _blocks(a.shape)]
+        return numpy.ma.concatenate(parts, axis=0)
+
+    # Accumulate sums and counts over the blocks
+    total = count = None
+    for i, j in _blocks(a.shape):
+        block = _rows(a, i, j, memo)
+        if node.kind == 'sum':
+            blocktotal = numpy.ma.filled(block, 0).sum(axis, dtype=node.dtype)
+        else:
+            blocktotal = numpy.ma.filled(block, 0).sum(axis, dtype=numpy.float64)
+        blockcount = numpy.ma.count(block, axis)
+        if total is None:
+            total, count = blocktotal, blockcount
+        else:
+            total = total + blocktotal
+            count = count + blockcount
+    if node.kind == 'average':
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            total = numpy.true_divide(total, count)
+    if axis is None:
+        return numpy.ma.masked if count == 0 else total
+    return numpy.ma.array(total, mask=(count == 0))
@@ -8,8 +8,43 @@ Abstract class for writing data into file
 
 """
 
+import numpy
 from . import mvSphereMesh
 
+# VTK legacy format: data type name, big-endian binary dtype and ASCII format
+_vtkTypes = {'float': ('>f4', '%g'), 'int': ('>i4', '%d')}
+
+
+def writeVTKArray(f, data, vtktype='float', binary=True, ncols=1):
+    """
+    Write an array to a legacy VTK file opened in binary mode, as
+    big-endian raw values (binary) or text with ncols values per line.
+
+    Parameters
+    ----------
+
+         f file object, opened with mode 'wb'
+
+         data array
+
+         vtktype 'float' or 'int'
+
+         binary True for binary output
+    """
+    dtype, fmt = _vtkTypes[vtktype]
+    data = numpy.ravel(data)
+    if binary:
+        data.astype(dtype).tofile(f)
+        f.write(b'\n')
+    else:
+        numpy.savetxt(f, numpy.reshape(data, (-1, ncols)), fmt=fmt)
+
+
+def writeVTKLines(f, *lines):
+    """Write header lines to a legacy VTK file opened in binary mode."""
+    for line in lines:
+        f.write((line + '\n').encode('ascii'))
+
 
 class BaseWriter:
     """
@@ -54,6 +89,28 @@ class BaseWriter:
 
         self.mesh = sphere_mesh.getXYZCoords(sphereRadius)
 
+    def setVariable(self, var):
+        """
+        Replace the variable to write, keeping the mesh. This is used to
+        write successive time steps of a variable without rebuilding the mesh.
+
+        Parameters
+        ----------
+
+             var a cdms2 variable on the same grid
+        """
+        if var.size != self.mesh.shape[0]:
+            raise ValueError('variable size %d does not match the mesh size %d' %
+                             (var.size, self.mesh.shape[0]))
+        self.var = var
+
+    def getPointData(self, dtype=numpy.float32):
+        """
+        Return the data of the variable as a flat array, in mesh point order.
+        Missing values are set to the fill value of the variable.
+        """
+        return numpy.ravel(numpy.ma.filled(self.var)).astype(dtype)
+
     def write(self, filename):
         """
         Write data to file. This method is overloaded.
@@ -7,7 +7,6 @@ Write data to VTK file format using the structured grid format
 
 """
 
-from __future__ import print_function
 import numpy
 import time
 from . import mvBaseWriter
@@ -26,37 +25,34 @@ class VTKSGWriter(mvBaseWriter.BaseWriter):
           _: None
     """
 
-    def write(self, filename):
+    def write(self, filename, binary=True):
         """
+        Write the variable and its mesh as a legacy VTK structured grid.
 
+        Parameters
+        ----------
+
+             filename file name
+
+             binary write big-endian binary data (the default) rather than text
         """
-        f = open(filename, 'w')
-        print('# vtk DataFile Version 2.0', file=f)
-        print('generated on %s' % time.asctime(), file=f)
-        print('ASCII', file=f)
-        print('DATASET STRUCTURED_GRID', file=f)
         shp = self.shape[:]
         shp.reverse()
-        print('DIMENSIONS %d %d %d' % tuple(shp), file=f)
         npts = self.mesh.shape[0]
-        print('POINTS %d float' % npts, file=f)
-        for i in range(npts):
-            print('%f %f %f' % tuple(self.mesh[i, :]), file=f)
         n0, n1, n2 = self.shape
-        # nodal data
-        print('POINT_DATA %d' % (n0 * n1 * n2), file=f)
-        print('SCALARS %s float' % (self.var.id), file=f)
-        print('LOOKUP_TABLE default', file=f)
-        if n0 > 1:
-            for k in range(n0):
-                for j in range(n1):
-                    for i in range(n2):
-                        print('%f' % self.var[k, j, i], file=f)
-        else:
-            for j in range(n1):
-                for i in range(n2):
-                    print('%f' % self.var[j, i], file=f)
-        f.close()
+        with open(filename, 'wb') as f:
+            mvBaseWriter.writeVTKLines(f, '# vtk DataFile Version 2.0',
+                                       'generated on %s' % time.asctime(),
+                                       'BINARY' if binary else 'ASCII',
+                                       'DATASET STRUCTURED_GRID',
+                                       'DIMENSIONS %d %d %d' % tuple(shp),
+                                       'POINTS %d float' % npts)
+            mvBaseWriter.writeVTKArray(f, self.mesh, 'float', binary, ncols=3)
+            # nodal data
+            mvBaseWriter.writeVTKLines(f, 'POINT_DATA %d' % (n0 * n1 * n2),
+                                       'SCALARS %s float' % (self.var.id),
+                                       'LOOKUP_TABLE default')
+            mvBaseWriter.writeVTKArray(f, self.getPointData(), 'float', binary)
 
 
 ######################################################################
@@ -7,7 +7,6 @@ Write data to VTK file format using the unstructured grid format
 
 """
 
-from __future__ import print_function
 import numpy
 import time
 from . import mvBaseWriter
@@ -27,67 +26,56 @@ class VTKUGWriter(mvBaseWriter.BaseWriter):
 
     """
 
-    def write(self, filename):
+    def write(self, filename, binary=True):
         """
+        Write the variable and its mesh as a legacy VTK unstructured grid of
+        hexahedra (3d) or quads (2d).
 
+        Parameters
+        ----------
+
+             filename file name
+
+             binary write big-endian binary data (the default) rather than text
         """
-        f = open(filename, 'w')
-        print('# vtk DataFile Version 2.0', file=f)
-        print('generated on %s' % time.asctime(), file=f)
-        print('ASCII', file=f)
-        print('DATASET UNSTRUCTURED_GRID', file=f)
         npts = self.mesh.shape[0]
-        print('POINTS %d float' % npts, file=f)
-        for i in range(npts):
-            print('%f %f %f' % tuple(self.mesh[i, :]), file=f)
         n0, n1, n2 = self.shape
-        ncells = (n0 - 1) * (n1 - 1) * (n2 - 1)
-        if ncells != 0:
-            # 3d
-            ntot = ncells * (8 + 1)
-            print('CELLS %d %d' % (ncells, ntot), file=f)
-            for k in range(n0 - 1):
-                for j in range(n1 - 1):
-                    for i in range(n2 - 1):
-                        index = i + n2 * (j + n1 * k)
-                        print('8 %d %d %d %d %d %d %d %d' %
-                              (index, index + 1, index + 1 + n2, index + n2,
-                               index + n1 * n2, index + n1 * n2 + 1,
-                               index + n1 * n2 + 1 + n2, index + n1 * n2 + n2), file=f)
-            print('CELL_TYPES %d' % ncells, file=f)
-            for i in range(ncells):
-                # hexahedron
-                print(12, file=f)
-            # nodal data
-            print('POINT_DATA %d' % (n0 * n1 * n2), file=f)
-            print('SCALARS %s float' % (self.var.id), file=f)
-            print('LOOKUP_TABLE default', file=f)
-            for k in range(n0):
-                for j in range(n1):
-                    for i in range(n2):
-                        print('%f' % self.var[k, j, i], file=f)
+        dims = [n for n in self.shape if n > 1]
+        if len(dims) == 3:
+            # 3d: hexahedra, index of the first node of each cell
+            index = numpy.arange(npts).reshape(self.shape)[:-1, :-1, :-1].ravel()
+            nij = n1 * n2
+            nodes = [index, index + 1, index + 1 + n2, index + n2,
+                     index + nij, index + nij + 1, index + nij + 1 + n2, index + nij + n2]
+            celltype = 12
         else:
-            # 2d
-            ncells = (n1 - 1) * (n2 - 1)
-            ntot = ncells * (4 + 1)
-            print('CELLS %d %d' % (ncells, ntot), file=f)
-            for j in range(n1 - 1):
-                for i in range(n2 - 1):
-                    index = i + n2 * j
-                    print('4 %d %d %d %d' %
-                          (index, index + 1, index + 1 + n2, index + n2), file=f)
-            print('CELL_TYPES %d' % ncells, file=f)
-            for i in range(ncells):
-                # quad
-                print(9, file=f)
+            # 2d: quads. Unit dimensions do not change the point order.
+            nj, ni = (dims + [1, 1])[:2]
+            index = numpy.arange(nj * ni).reshape((nj, ni))[:-1, :-1].ravel()
+            nodes = [index, index + 1, index + 1 + ni, index + ni]
+            celltype = 9
+        ncells = len(index)
+        cells = numpy.empty((ncells, len(nodes) + 1), numpy.int32)
+        cells[:, 0] = len(nodes)
+        for k, node in enumerate(nodes):
+            cells[:, k + 1] = node
+
+        with open(filename, 'wb') as f:
+            mvBaseWriter.writeVTKLines(f, '# vtk DataFile Version 2.0',
+                                       'generated on %s' % time.asctime(),
+                                       'BINARY' if binary else 'ASCII',
+                                       'DATASET UNSTRUCTURED_GRID',
+                                       'POINTS %d float' % npts)
+            mvBaseWriter.writeVTKArray(f, self.mesh, 'float', binary, ncols=3)
+            mvBaseWriter.writeVTKLines(f, 'CELLS %d %d' % (ncells, cells.size))
+            mvBaseWriter.writeVTKArray(f, cells, 'int', binary, ncols=cells.shape[1])
+            mvBaseWriter.writeVTKLines(f, 'CELL_TYPES %d' % ncells)
+            mvBaseWriter.writeVTKArray(f, numpy.full(ncells, celltype), 'int', binary)
             # nodal data
-            print('POINT_DATA %d' % (n0 * n1 * n2), file=f)
-            print('SCALARS %s float' % (self.var.id), file=f)
-            print('LOOKUP_TABLE default', file=f)
-            for j in range(n1):
-                for i in range(n2):
-                    print('%f' % self.var[j, i], file=f)
-        f.close()
+            mvBaseWriter.writeVTKLines(f, 'POINT_DATA %d' % (n0 * n1 * n2),
+                                       'SCALARS %s float' % (self.var.id),
+                                       'LOOKUP_TABLE default')
+            mvBaseWriter.writeVTKArray(f, self.getPointData(), 'float', binary)
 
 
 ######################################################################
@@ -1,15 +1,171 @@
 from __future__ import print_function
-import urllib.request
-import urllib.error
 import urllib.parse
 import xml.etree.ElementTree
 try:
     import genutil
 except BaseException:
     pass
+import ast
+import hashlib
+import http.client
+import io
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from six import string_types
 
+_maxWorkers = 8                 # Number of result pages fetched concurrently
+_executor = None
+_timeout = 60                   # Seconds before a request times out
+_cacheDir = None                # Directory of the response cache, None for no cache
+_cacheTTL = 3600                # Seconds a cached response stays valid
+_local = threading.local()      # Per-thread connections, (scheme, netloc) => HTTPConnection
+
+
+def setMaxWorkers(n):
+    """Set the number of result pages fetched concurrently."""
+    global _maxWorkers, _executor
+    if n < 1:
+        raise esgfConnectionException("setMaxWorkers: number of workers must be >= 1")
+    _maxWorkers = int(n)
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+def getMaxWorkers():
+    """Return the number of result pages fetched concurrently."""
+    return _maxWorkers
+
+
+def _getExecutor():
+    """Return the pool fetching result pages; its threads keep their connections open."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=_maxWorkers)
+    return _executor
+
+
+def setResponseCache(directory, ttl=3600):
+    """
+    Cache search responses in <directory> for <ttl> seconds.
+
+    Repeated identical requests are then served from the cache. A directory of
+    None disables the cache.
+    """
+    global _cacheDir, _cacheTTL
+    if directory is not None and not os.path.isdir(directory):
+        os.makedirs(directory)
+    _cacheDir = directory
+    _cacheTTL = ttl
+
+
+def getResponseCache():
+    """Return (directory, ttl) of the response cache; directory is None if there is no cache."""
+    return _cacheDir, _cacheTTL
+
+
+def _get(url, redirects=5):
+    """GET <url> on a kept-alive connection of this thread, return the body."""
+    parts = urllib.parse.urlsplit(url)
+    connections = _local.__dict__.setdefault("connections", {})
+    key = (parts.scheme, parts.netloc)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    for attempt in range(2):
+        conn = connections.get(key)
+        if conn is None:
+            if parts.scheme == "https":
+                conn = http.client.HTTPSConnection(parts.netloc, timeout=_timeout)
+            else:
+                conn = http.client.HTTPConnection(parts.netloc, timeout=_timeout)
+            connections[key] = conn
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            data = response.read()
+            break
+        except (http.client.HTTPException, OSError):
+            # The server may have closed the kept-alive connection: retry once on a new one
+            conn.close()
+            del connections[key]
+            if attempt == 1:
+                raise
+    if response.status in (301, 302, 303, 307, 308) and redirects > 0:
+        return _get(urllib.parse.urljoin(url, response.getheader("Location")), redirects - 1)
+    if response.status != 200:
+        raise IOError("HTTP error %d %s: %s" % (response.status, response.reason, url))
+    return data
+
+
+def _fetch(url):
+    """Return the response to <url>, from the response cache if it is recent enough."""
+    if _cacheDir is None:
+        return _get(url)
+    path = os.path.join(_cacheDir, hashlib.sha1(url.encode()).hexdigest() + ".xml")
+    try:
+        if time.time() - os.path.getmtime(path) < _cacheTTL:
+            with open(path, "rb") as f:
+                return f.read()
+    except OSError:
+        pass
+    data = _get(url)
+    tmppath = "%s.%d.%d.tmp" % (path, os.getpid(), threading.get_ident())
+    with open(tmppath, "wb") as f:
+        f.write(data)
+    os.replace(tmppath, path)
+    return data
+
+
+def _numFound(data):
+    """Return the numFound attribute of the result element of a response."""
+    for event, element in xml.etree.ElementTree.iterparse(io.BytesIO(data), events=("start",)):
+        if element.tag == "result":
+            return int(element.get("numFound"))
+    return 0
+
+
+def _records(data):
+    """Parse the docs of a response incrementally, yielding one dictionary per doc."""
+    depth = 0
+    for event, element in xml.etree.ElementTree.iterparse(io.BytesIO(data), events=("start", "end")):
+        if event == "start":
+            if element.tag == "result":
+                depth = 1
+            elif depth:
+                depth += 1
+            continue
+        if depth == 2 and element.tag == "doc":
+            yield dict((f.get("name"), _extractTag(f)) for f in element)
+            element.clear()
+        if depth:
+            depth -= 1
+
+
+def _extractTag(f):
+    out = None
+    if f.tag == "str":
+        out = f.text
+    elif f.tag == "arr":
+        out = []
+        for sub in f[:]:
+            out.append(_extractTag(sub))
+
+    elif f.tag == "float":
+        out = float(f.text)
+    elif f.tag == "int":
+        out = int(f.text)
+    elif f.tag == "date":
+        # Convert to cdtime?
+        out = f.text
+    else:
+        out = f
+    if isinstance(out, list) and len(out) == 1:
+        out = out[0]
+    return out
+
 
 class esgfConnectionException(Exception):
     pass
@@ -41,10 +197,9 @@ class FacetConnection(object):
             if facet_param:
                 rqst = rqst + '&%s' % facet_param
             # print rqst
-            url = urllib.request.urlopen(rqst)
+            r = _fetch(rqst)
         except Exception as msg:
             raise self.EsgfObjectException(msg)
-        r = url.read()
         try:
             e = xml.etree.ElementTree.fromstring(r)
             return e
@@ -76,10 +231,9 @@ class FacetConnection(object):
             if facet_param:
                 rqst = rqst + '&%s' % facet_param
                 # print rqst
-            url = urllib.request.urlopen(rqst)
+            r = _fetch(rqst)
         except Exception as msg:
             raise self.EsgfObjectException(msg)
-        r = url.read()
         try:
             e = xml.etree.ElementTree.fromstring(r)
             return e
@@ -184,6 +338,19 @@ class esgfConnection(object):
         return
 
     def _search(self, search="", searchType=None, stringType=False):
+        r = self._fetchSearch(search, searchType)
+        if stringType:
+            return r
+        else:
+            try:
+                e = xml.etree.ElementTree.fromstring(r)
+                return e
+            except Exception as err:
+                raise self.EsgfObjectException(
+                    "Could not interpret server's results: %s" % err)
+
+    def _fetchSearch(self, search="", searchType=None):
+        """Return the raw response to a search."""
         if searchType is None:
             searchType = self.defaultSearchType
         if searchType not in self.validSearchTypes:
@@ -206,19 +373,9 @@ class esgfConnection(object):
             tmp = rqst[6:].replace("//", "/")
             rqst = rqst[:6] + tmp
             # print "Request:%s"%rqst
-            url = urllib.request.urlopen(rqst)
+            return _fetch(rqst)
         except Exception as msg:
             raise self.EsgfObjectException(msg)
-        r = url.read()
-        if stringType:
-            return r
-        else:
-            try:
-                e = xml.etree.ElementTree.fromstring(r)
-                return e
-            except Exception as err:
-                raise self.EsgfObjectException(
-                    "Could not interpret server's results: %s" % err)
 
     def generateRequest(self, stringType=False, **keys):
         search = ""
@@ -254,90 +411,85 @@ class esgfConnection(object):
         search = search.replace(" ", "%20")
         return search
 
+    def _fetchPages(self, **keys):
+        """Return the raw response pages of a search.
+
+        The first page gives the number of results, the other pages are then
+        fetched concurrently.
+        """
+        limit = self["limit"]
+        pagesize = limit
+        if limit is None or limit > 1000:
+            pagesize = 1000
+        searches = []
+        try:
+            self["limit"] = pagesize
+            self["offset"] = 0
+            searches.append(self.generateRequest(**keys))
+            first = self._fetchSearch(searches[0])
+            try:
+                n = _numFound(first)
+            except Exception as err:
+                raise self.EsgfObjectException(
+                    "Could not interpret server's results: %s" % err)
+            total = n if limit is None else min(limit, n)
+            for offset in range(pagesize, total, pagesize):
+                self["offset"] = offset
+                searches.append(self.generateRequest(**keys))
+        finally:
+            self["limit"] = limit
+            self["offset"] = 0
+
+        if len(searches) == 1:
+            return [first]
+        rest = list(_getExecutor().map(self._fetchSearch, searches[1:]))
+        return [first] + rest
+
     def request(self, **keys):
-        numFound = 0
-        cont = True
+        pages = self._fetchPages(**keys)
+        if keys.get("stringType", False):
+            return pages
         r = []
-        limit = self["limit"]
-        while cont:
-            # print "Continuing",limit
-            self["offset"] = numFound
-            if limit is None or limit > 1000:
-                self["limit"] = 1000
-            search = self.generateRequest(**keys)
-            stringType = keys.get("stringType", False)
-            r.append(self._search(search, stringType=stringType))
-            if numFound == 0:
-                for s in r[0][:]:
-                    if s.tag == "result":
-                        n = int(s.get("numFound"))
-            numFound += self["limit"]
-            if limit is None:
-                if numFound >= n:
-                    cont = False
-            else:
-                if numFound >= limit:
-                    cont = False
-            # print "N is:",numFound,n
-        self["limit"] = limit
-        self["offset"] = 0
+        for page in pages:
+            try:
+                r.append(xml.etree.ElementTree.fromstring(page))
+            except Exception as err:
+                raise self.EsgfObjectException(
+                    "Could not interpret server's results: %s" % err)
         return r
 
+    def records(self, **keys):
+        """Return the results of a search as a list of dictionaries, one per result doc."""
+        result = []
+        for page in self._fetchPages(**keys):
+            result.extend(_records(page))
+        return result
+
     def extractTag(self, f):
-        out = None
-        if f.tag == "str":
-            out = f.text
-        elif f.tag == "arr":
-            out = []
-            for sub in f[:]:
-                out.append(self.extractTag(sub))
-
-        elif f.tag == "float":
-            out = float(f.text)
-        elif f.tag == "int":
-            out = int(f.text)
-        elif f.tag == "date":
-            # Convert to cdtime?
-            out = f.text
-        else:
-            out = f
-        if isinstance(out, list) and len(out) == 1:
-            out = out[0]
-        return out
+        return _extractTag(f)
 
     def searchDatasets(self, **keys):
-        resps = self.request(**keys)
         stringType = keys.get("stringType", False)
         if stringType:
-            return resps
+            return self.request(**keys)
         datasets = []
-        for resp in resps:
-            for r in resp[:]:
-                if r.tag == "result":
-                    # Ok let's go thru these datasets
-                    for d in r[:]:
-                        # print
-                        # "************************************************"
-                        tmpkeys = {}
-                        for f in d[:]:
-                            k = f.get("name")
-                            tmpkeys[k] = self.extractTag(f)
-                        if tmpkeys["type"] == "Dataset":
-                            # datasetid = tmpkeys["id"]
-                            # print datasetid,self.restPath
-                            # print "KEYS FOR DATASET",keys.keys()
-                            datasets.append(
-                                esgfDataset(
-                                    host=self.host,
-                                    port=self.port,
-                                    limit=1000,
-                                    offset=0,
-                                    mapping=self.mapping,
-                                    datasetids=self.datasetids,
-                                    fileids=self.fileids,
-                                    keys=tmpkeys,
-                                    originalKeys=keys,
-                                    restPath=self.restPath))
+        for tmpkeys in self.records(**keys):
+            if tmpkeys["type"] == "Dataset":
+                # datasetid = tmpkeys["id"]
+                # print datasetid,self.restPath
+                # print "KEYS FOR DATASET",keys.keys()
+                datasets.append(
+                    esgfDataset(
+                        host=self.host,
+                        port=self.port,
+                        limit=1000,
+                        offset=0,
+                        mapping=self.mapping,
+                        datasetids=self.datasetids,
+                        fileids=self.fileids,
+                        keys=tmpkeys,
+                        originalKeys=keys,
+                        restPath=self.restPath))
         return datasets
 
 
@@ -416,6 +568,11 @@ class esgfDataset(esgfConnection):
         # We need to stick in there the bit from Luca to fill in the matching
         # key from facet for now it's empty
         files = []
+        if isinstance(resp, bytes):
+            for keys in _records(resp):
+                if keys["type"] == "File":
+                    files.append(esgfFile(**keys))
+            return files
 #        skipped = [
 #            "type",
 #            "title",
@@ -509,43 +666,46 @@ class esgfDataset(esgfConnection):
         self.resp = None
 
     def saveCache(self, target="."):
+        """Save the last search response in the cache file <target> (or <target>/esgfDatasetsCache.pckl)."""
         if self.resp is None:
             return
         if os.path.isdir(target):
             target = os.path.join(target, "esgfDatasetsCache.pckl")
-        if os.path.exists(target):
-            f = open(target)
-            # dict=eval(bz2.decompress(f.read()))
-            dico = eval(f.read())
-            f.close()
-        else:
-            dico = {}
+        dico = self._readCache(target)
+        resp = self.resp
+        if not isinstance(resp, bytes):
+            resp = xml.etree.ElementTree.tostring(resp)
         dico[self.id] = [self["timestamp"],
-                         xml.etree.ElementTree.tostring(self.resp),
-                         self.originalKeys]
-        f = open(target, "w")
-        # f.write(bz2.compress(repr(self.cache)))
-        f.write(repr(self.cache))
-        f.close()
-
-    def loadCache(self, source):
+                         resp.decode("utf-8"),
+                         self.originalKeys,
+                         time.time()]
+        tmppath = "%s.%d.tmp" % (target, os.getpid())
+        with open(tmppath, "w") as f:
+            f.write(repr(dico))
+        os.replace(tmppath, target)
+
+    def loadCache(self, source, ttl=None):
+        """Restore the search response saved by saveCache, if it is less than <ttl> seconds old."""
         if isinstance(source, dict):
             dico = source
         else:
             if os.path.isdir(source):
                 source = os.path.join(source, "esgfDatasetsCache.pckl")
-            if os.path.exists(source):
-                f = open(source)
-                # dict=eval(bz2.decompress(f.read()))
-                dico = eval(f.read())
-                f.close()
-            else:
-                dico = {}
+            dico = self._readCache(source)
         vals = dico.get(self.id, ["", None, {}])
-        if vals[1] is not None:
-            self.cacheTime = vals[0]
-            self.resp = xml.etree.ElementTree.fromstring(vals[0])
-            self.originalKeys = vals[1]
+        if vals[1] is None:
+            return
+        if ttl is not None and (len(vals) < 4 or time.time() - vals[3] > ttl):
+            return
+        self.cacheTime = vals[0]
+        self.resp = vals[1].encode("utf-8")
+        self.originalKeys = vals[2]
+
+    def _readCache(self, path):
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return ast.literal_eval(f.read())
 
     def clearOriginalQueryCache(self):
         self.originalKeys = {}
@@ -571,7 +731,7 @@ class esgfDataset(esgfConnection):
             # st+="&%s=%s" % (k,keys[k])
         # if self.resp is None:
             # self.resp = self._search("dataset_id=%s%s" % (self["id"],st),stringType=stringType)
-        self.resp = self._search(st, stringType=stringType)
+        self.resp = self._fetchSearch(st)
         if stringType:
             return self.resp
         return esgfFiles(self._extractFiles(self.resp, **keys), self)
@@ -117,7 +117,10 @@ class Selector:
 
            This procedure is repeated until no more components are postponed.
            Then the options are applied to the result in the order
-           listed above, and the result is returned.
+           listed above, and the result is returned. When nothing is
+           postponed and no component post-processes the result, the
+           options are passed to the subRegion call, so the selection is a
+           single read.
 
            Execption SelectorError is thrown if the selection is
            impossible.
@@ -141,12 +144,21 @@ class Selector:
 
     def unmodified_select(self, variable, raw=0,
                           squeeze=0, order=None, grid=None):
-        "Select using this selector without further modification"
+        """Select using this selector without further modification.
+
+        The index ranges of a non-rectilinear grid intersection and the
+        specifications of all the components are planned into one subRegion
+        call; further calls are only made for postponed components.
+        """
         result = variable
         components = self.components()
+        axes = variable.getAxisList()
+        specifications = [':'] * len(axes)
+        confined_by = [None] * len(axes)
+        gridmask = None
 
-        # If the grid is non-rectilinear, first select on coordinateComponents
-        # that confine the grid.
+        # If the grid is non-rectilinear, confine the grid dimensions to the
+        # index ranges of the intersection with the coordinateComponents.
         vargrid = variable.getGrid()
         if (vargrid is not None) and (
                 not isinstance(vargrid, AbstractRectGrid)):
@@ -159,18 +171,26 @@ class Selector:
             components = newcomponents
             if specs != defaultRegion():
                 vgindices = result.getGridIndices()
-                mask, indexspecs = vargrid.intersect(specs)
-                result = result(**indexspecs)
-                result = result.setMaskFromGridMask(
-                    mask, vgindices)  # Propagate the grid mask to result
+                gridmask, indexspecs = vargrid.intersect(specs)
+                if [c for c in components if isinstance(c, positionalComponent)]:
+                    # Positional components count the axes of the grid subset
+                    result = result(**indexspecs)
+                    result = result.setMaskFromGridMask(
+                        gridmask, vgindices, inplace=True)  # Propagate the grid mask to result
+                    gridmask = None
+                    axes = result.getAxisList()
+                    specifications = [':'] * len(axes)
+                    confined_by = [None] * len(axes)
+                else:
+                    for i in vgindices:
+                        if axes[i].id in indexspecs:
+                            specifications[i] = indexspecs[axes[i].id]
+                            confined_by[i] = vargrid
 
         # Now select on non-coordinate components.
-        while(components):
-            axes = result.getAxisList()
+        while True:
             if _debug:
                 print("Axes:", axes)
-            specifications = [':'] * len(axes)
-            confined_by = [None] * len(axes)
             aux = {}  # for extra state
             overflow = []
             if _debug:
@@ -186,27 +206,41 @@ class Selector:
                     print("Confined_by", confined_by)
                     print("aux", aux)
                     print("-----------------")
+            if components and not len(overflow) < len(components) and gridmask is None:
+                raise SelectorError(
+                    'Internal selector error, infinite loop detected.')
+
+            # Last read: apply the options directly, unless the result is post-processed
+            if not overflow and gridmask is None and \
+                    not [c for c in components if type(c).post is not SelectorComponent.post]:
+                if _debug:
+                    print('About to call subRegion:', specifications)
+                return result.subRegion(*specifications, squeeze=squeeze, order=order, grid=grid, raw=raw)
+
             if _debug:
                 print('About to call subRegion:', specifications)
             fetched = result.subRegion(*specifications)
+            if gridmask is not None:
+                fetched.setMaskFromGridMask(gridmask, vgindices, inplace=True)  # Propagate the grid mask to result
+                gridmask = None
             axismap = list(range(len(axes)))
             for c in components:
                 if c in overflow:
                     continue
                 fetched = c.post(fetched, result, axes, specifications,
                                  confined_by, aux, axismap)
-            if not len(overflow) < len(components):
-                raise SelectorError(
-                    'Internal selector error, infinite loop detected.')
             components = overflow
             result = fetched
+            if not components:
+                break
+            axes = result.getAxisList()
+            specifications = [':'] * len(axes)
+            confined_by = [None] * len(axes)
 
         if squeeze != 0 or \
            order is not None or \
            grid is not None or \
-           raw != 0 or \
-           result is variable:
-            # result is variable when there are no components, for example.
+           raw != 0:
             return result.subRegion(squeeze=squeeze, order=order,
                                     grid=grid, raw=raw)
         else:
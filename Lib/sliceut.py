@@ -1,5 +1,6 @@
 from __future__ import print_function
 "Utilities for manipulating slices"
+from bisect import bisect_left, bisect_right
 
 # Intersect a slice with a half-open interval [i,j).
 # slice.start and slice.stop must be integers (not None).
@@ -43,8 +44,44 @@ def sliceIntersect(aSlice, interval):
 
     return newSlice
 
+
+class PartitionIndex(object):
+    """Sorted index over a partition, a list of intervals with shape (n,2).
+
+    For a partition of sorted, non-overlapping intervals (the usual case for
+    datasets split in time or level), the intervals which can intersect a
+    slice are found by bisection over the interval starts and ends, so the
+    cost of a lookup is O(log n + k) rather than O(n). Unsorted partitions
+    are scanned linearly.
+    """
+
+    def __init__(self, partition):
+        self.partition = partition
+        self.starts = [int(interval[0]) for interval in partition]
+        self.ends = [int(interval[1]) for interval in partition]
+        self.issorted = True
+        for i in range(len(self.starts) - 1):
+            if self.ends[i] > self.starts[i + 1] or self.starts[i] > self.ends[i]:
+                self.issorted = False
+                break
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        return iter(self.partition)
+
+    def candidates(self, aSlice):
+        """Return the intervals which may intersect aSlice, in partition order."""
+        step = aSlice.step
+        if not self.issorted or (step is not None and step < 0):
+            return self.partition
+        first = bisect_right(self.ends, aSlice.start)
+        last = bisect_left(self.starts, aSlice.stop, first)
+        return self.partition[first:last]
+
 # Intersect a slice with a partition. The partition is a list of
-# intervals, with shape (n,2). The result is a list of pairs
+# intervals, with shape (n,2), or a PartitionIndex. The result is a list of pairs
 # [(interval,slice), (interval,slice) ...]  where the intervals are
 # those intervals in the partition which have non-empty intersection,
 # in the same order as in the partition. If the intersection is empty,
@@ -52,6 +89,8 @@ def sliceIntersect(aSlice, interval):
 
 
 def slicePartition(aSlice, partition):
+    if isinstance(partition, PartitionIndex):
+        partition = partition.candidates(aSlice)
     result = []
     for interval in partition:
         intslice = sliceIntersect(aSlice, interval)
@@ -17,7 +17,7 @@ from numpy import sctype2char
 from .error import CDMSError
 from .avariable import AbstractVariable
 
-from .axis import createAxis, AbstractAxis
+from .axis import createAxis, AbstractAxis, TransientAxis
 from .grid import createRectGrid, AbstractRectGrid
 from .hgrid import AbstractCurveGrid
 from .gengrid import AbstractGenericGrid
@@ -214,7 +214,12 @@ class TransientVariable(AbstractVariable, numpy.ma.MaskedArray):
 
         if isinstance(data, AbstractVariable):
             if not isinstance(data, TransientVariable):
-                data = data.subSlice()
+                # Reuse the slice read by __new__ rather than reading again
+                fromvariable, fromslice = self.__dict__.pop('_fromslice_', (None, None))
+                if fromvariable is data:
+                    data = fromslice
+                else:
+                    data = data.subSlice()
 #               if attributes is None: attributes = data.attributes
             if axes is None and not no_update_from:
                 axes = [x[0] for x in data.getDomain()]
@@ -346,15 +351,11 @@ class TransientVariable(AbstractVariable, numpy.ma.MaskedArray):
         typecode = sctype2char(dtype)
         if isinstance(data, tuple):
             data = list(data)
+        fromvariable = None
         if isinstance(data, AbstractVariable):
             if not isinstance(data, TransientVariable):
+                fromvariable = data
                 data = data.subSlice()
-        if isinstance(data, numpy.ma.MaskedArray):
-            try:
-                if fill_value is None:
-                    fill_value = data.fill_value
-            except BaseException:
-                pass
 
         ncopy = (copy != 0)
         if mask is None:
@@ -368,11 +369,12 @@ class TransientVariable(AbstractVariable, numpy.ma.MaskedArray):
             data = numpy.ma.masked.data
             mask = numpy.ma.masked.mask
 
+        # Arrays know their dtype, only other sequences need a conversion
         if dtype is None and data is not None:
-            dtype = numpy.array(data).dtype
-
-        if any(x == 'N/A' for x in str(fill_value)):
-            fill_value = None
+            if isinstance(data, numpy.ndarray):
+                dtype = data.dtype
+            else:
+                dtype = numpy.asarray(data).dtype
 
         self = numpy.ma.MaskedArray.__new__(cls, data, dtype=dtype,
                                             copy=ncopy,
@@ -380,6 +382,10 @@ class TransientVariable(AbstractVariable, numpy.ma.MaskedArray):
                                             subok=False,
                                             order=order)
 
+        # Keep the slice read from a file variable, for __init__
+        if fromvariable is not None:
+            self.__dict__['_fromslice_'] = (fromvariable, data)
+
         return self
 
     # typecode = numpy.ma.array.typecode
@@ -478,12 +484,17 @@ class TransientVariable(AbstractVariable, numpy.ma.MaskedArray):
 
     def copyAxis(self, n, axis):
         """Set n axis of self to a copy of axis. (0-based index)
-           Invalidates grid.
+           Invalidates grid. A transient axis shares its storage with
+           the copy until either is modified.
         """
         if n < 0:
             n = n + self.rank()
         if not isinstance(axis, AbstractAxis):
             raise CDMSError("copydimension, other not an axis.")
+        if isinstance(axis, TransientAxis):
+            # Share the values and bounds, they are copied on write
+            self.setAxis(n, axis.share())
+            return
         isGeneric = [False]
         b = axis.getBounds(isGeneric)
         mycopy = createAxis(axis[:], b, genericBounds=isGeneric[0])
@@ -526,9 +537,11 @@ class TransientVariable(AbstractVariable, numpy.ma.MaskedArray):
         return TransientVariable(maresult, copy=0, axes=self.getAxisList(), fill_value=self.fill_value,
                                  attributes=self.attributes, id=self.id, grid=self.getGrid())
 
-    def setMaskFromGridMask(self, mask, gridindices):
+    def setMaskFromGridMask(self, mask, gridindices, inplace=False):
         """Set the mask for self, given a grid mask and the variable domain
         indices corresponding to the grid dimensions.
+
+        Returns a new variable, or self with its mask updated if inplace is true.
         """
 
         # Get the variable indices that are NOT in gridindices
@@ -562,6 +575,11 @@ class TransientVariable(AbstractVariable, numpy.ma.MaskedArray):
         if currentmask is not numpy.ma.nomask:
             bigmask = numpy.logical_or(currentmask, bigmask)
 
+        if inplace:
+            # Rebind rather than assign: the current mask may be shared with another array
+            self._mask = numpy.array(bigmask, dtype=numpy.bool_)
+            self._sharedmask = False
+            return self
         result = TransientVariable(self, mask=bigmask)
         return result
 
@@ -782,36 +800,39 @@ class TransientVariable(AbstractVariable, numpy.ma.MaskedArray):
         if timeAxis is None or timeIndex == -1:
             # static data
             if format == 'VTK':
-                vw = mvVTKSGWriter.VTKSGWriter(self, maxElev)
+                vw = mvVTKSGWriter.VTKSGWriter(self, sphereRadius, maxElev)
                 if filename.find('.vtk') == -1:
                     filename += '.vtk'
                 vw.write(filename)
             else:
-                vw = mvVsWriter.VsWriter(self, maxElev)
+                vw = mvVsWriter.VsWriter(self, sphereRadius, maxElev)
                 if filename.find('.vsh5') == -1:
                     filename += '.vsh5'
                 vw.write(filename)
         else:
-            # time dependent data
+            # time dependent data, the mesh is built once and each time
+            # step is written to its own file
             tIndexMax = len(timeAxis)
+            if format == 'VTK':
+                if filename.find('.vtk') == -1:
+                    filename += '.vtk'
+                suffix = 'vtk'
+                writerClass = mvVTKSGWriter.VTKSGWriter
+            else:
+                if filename.find('.h5') == -1:
+                    filename += '.h5'
+                suffix = 'h5'
+                writerClass = mvVsWriter.VsWriter
+            vw = None
             for tIndex in range(tIndexMax):
-                sliceOp = 'self[' + (':,' * timeIndex) + \
-                    ('%d,' % tIndex) + '...]'
-                var = eval(sliceOp)
-                if format == 'VTK':
-                    if filename.find('.vtk') == -1:
-                        filename += '.vtk'
-                    tFilename = generateTimeFileName(filename,
-                                                     tIndex, tIndexMax, 'vtk')
-                    vw = mvVTKSGWriter.VTKSGWriter(var, maxElev)
-                    vw.write(tFilename)
+                var = self[(slice(None),) * timeIndex + (tIndex, Ellipsis)]
+                if vw is None:
+                    vw = writerClass(var, sphereRadius, maxElev)
                 else:
-                    if filename.find('.h5') == -1:
-                        filename += '.h5'
-                    tFilename = generateTimeFileName(filename,
-                                                     tIndex, tIndexMax, 'h5')
-                    vw = mvVsWriter.VsWriter(var, maxElev)
-                    vw.write(tFilename)
+                    vw.setVariable(var)
+                tFilename = generateTimeFileName(filename,
+                                                 tIndex, tIndexMax, suffix)
+                vw.write(tFilename)
 
     # Following are distributed array methods, they require mpi4py
     # to be installed
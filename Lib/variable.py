@@ -15,7 +15,7 @@ import string
 # from . import cdmsobj
 from .cdmsobj import getPathFromTemplate, Max32int
 from .avariable import AbstractVariable
-from .sliceut import slicePartition, sliceIntersect, reverseSlice, lenSlice
+from .sliceut import slicePartition, sliceIntersect, reverseSlice, lenSlice, PartitionIndex
 from .error import CDMSError
 
 InvalidGridElement = "Grid domain elements are not yet implemented: "
@@ -61,6 +61,8 @@ class DatasetVariable(AbstractVariable):
         self.___cdms_internals__ = val
         self.id = id
         self.domain = []
+        self._partindex_ = {}           # axis id => PartitionIndex
+        self._pathmap_ = {}             # partition intervals => file path
         # Get self.name_in_file from the .xml file if present
         if not hasattr(self, 'name_in_file'):
             self.name_in_file = id
@@ -308,6 +310,45 @@ class DatasetVariable(AbstractVariable):
             partition = axis.partition
         return partition
 
+    def getPartitionIndex(self, axis):
+        """Get a sorted PartitionIndex over getPartition(axis).
+
+        The index is built on first use and kept for the life of the variable,
+        so repeated reads locate their files by bisection.
+        """
+        index = self._partindex_.get(axis.id)
+        if index is None:
+            index = PartitionIndex(self.getPartition(axis))
+            self._partindex_[axis.id] = index
+        return index
+
+    def getIntervalPath(self, realid, template, *partitions):
+        """Memoized file path lookup for expertPaths.
+
+        Parameters
+        ----------
+
+        realid : is the variable name in the file.
+
+        template : is the dataset template, or None if a filemap is used.
+
+        partitions : (axis, interval) pairs, one per partitioned axis.
+
+        Returns
+        -------
+        the file path, as genMatch followed by getFilePath would.
+        """
+        key = (realid, template) + tuple((axis.id, int(interval[0]), int(interval[1]))
+                                         for axis, interval in partitions)
+        filename = self._pathmap_.get(key)
+        if filename is None:
+            matchnames = [realid, None, None, None, None, None, None]
+            for axis, interval in partitions:
+                matchnames = self.genMatch(axis, interval, matchnames)
+            filename = self.getFilePath(matchnames, template)
+            self._pathmap_[key] = filename
+        return filename
+
     def expertPaths(self, slist):
         """
         Expert Paths
@@ -391,7 +432,7 @@ class DatasetVariable(AbstractVariable):
             # intersect the slice and partition for that axis
             slice1 = slicelist[npart1]
             (axis, startelem, length, true_length) = self.domain[npart1]
-            partition = slicePartition(slice1, self.getPartition(axis))
+            partition = slicePartition(slice1, self.getPartitionIndex(axis))
             if partition == []:
                 return (1, (npart1,), None)
 
@@ -417,9 +458,7 @@ class DatasetVariable(AbstractVariable):
                 prevhigh = interval[1]
 
                 # generate the filename
-                matchnames = [realid, None, None, None, None, None, None]
-                matchnames = self.genMatch(axis, interval, matchnames)
-                filename = self.getFilePath(matchnames, template)
+                filename = self.getIntervalPath(realid, template, (axis, interval))
 
                 # adjust the partslice for the interval offset
                 # and replace in the slice list
@@ -438,8 +477,8 @@ class DatasetVariable(AbstractVariable):
             slice2 = slicelist[npart2]
             (axis1, startelem1, length1, true_length1) = self.domain[npart1]
             (axis2, startelem2, length2, true_length2) = self.domain[npart2]
-            partition1 = slicePartition(slice1, self.getPartition(axis1))
-            partition2 = slicePartition(slice2, self.getPartition(axis2))
+            partition1 = slicePartition(slice1, self.getPartitionIndex(axis1))
+            partition2 = slicePartition(slice2, self.getPartitionIndex(axis2))
             if partition1 == [] or partition2 == []:
                 return (2, (npart1, npart2), None)
 
@@ -461,10 +500,6 @@ class DatasetVariable(AbstractVariable):
                         resultlist.append([(None, copy.copy(slicelist))])
                 prevhigh1 = interval1[1]
 
-                # generate matchnames
-                matchnames = [realid, None, None, None, None, None, None]
-                matchnames = self.genMatch(axis1, interval1, matchnames)
-
                 # adjust the partslice for the interval offset
                 # and replace in the slice list
                 filestart = partslice1.start - interval1[0]
@@ -491,8 +526,8 @@ class DatasetVariable(AbstractVariable):
                     prevhigh2 = interval2[1]
 
                     # generate the filename
-                    matchnames = self.genMatch(axis2, interval2, matchnames)
-                    filename = self.getFilePath(matchnames, template)
+                    filename = self.getIntervalPath(realid, template,
+                                                    (axis1, interval1), (axis2, interval2))
 
                     filestart = partslice2.start - interval2[0]
                     filestop = partslice2.stop - interval2[0]
@@ -0,0 +1,36 @@
+"""
+Time checkConvex and fixCutCells on a synthetic 500 x 1440 curvilinear grid
+with a longitude cut at 0/360 degrees. This is a benchmark, not a test: it
+prints the times and checks nothing. The results are checked by
+tests/test_curvilinear_grid.py testFixCutCells.
+"""
+import time
+import numpy
+from cdms2.coord import TransientAxis2D, TransientVirtualAxis
+from cdms2.hgrid import TransientCurveGrid
+
+
+def cells(nodes):
+    return numpy.stack([nodes[:-1, :-1], nodes[:-1, 1:], nodes[1:, 1:], nodes[1:, :-1]], axis=-1)
+
+
+def makeGrid(ny=500, nx=1440):
+    lonn = numpy.mod(numpy.linspace(-20., 340., nx + 1), 360.)[numpy.newaxis, :].repeat(ny + 1, 0)
+    latn = numpy.linspace(-80., 89., ny + 1)[:, numpy.newaxis].repeat(nx + 1, 1)
+    iaxis = TransientVirtualAxis("i", ny)
+    jaxis = TransientVirtualAxis("j", nx)
+    lat = TransientAxis2D(cells(latn).mean(-1), axes=(iaxis, jaxis), bounds=cells(latn), id="latitude")
+    lon = TransientAxis2D(cells(lonn).mean(-1), axes=(iaxis, jaxis), bounds=cells(lonn), id="longitude")
+    return TransientCurveGrid(lat, lon)
+
+
+if __name__ == "__main__":
+    grid = makeGrid()
+    tic = time.time()
+    bad = grid.checkConvex()
+    toc = time.time()
+    print("checkConvex: %d cells in %.3f s" % (len(bad), toc - tic))
+    tic = time.time()
+    left = grid.fixCutCells(bad)
+    toc = time.time()
+    print("fixCutCells: %d cells left in %.3f s" % (len(left), toc - tic))
@@ -0,0 +1,18 @@
+"""
+Time the construction of a TransientVariable around existing masked arrays of
+increasing size, with copy=0. The time should not grow with the size of the
+array, as neither the data nor the mask is copied. This is a benchmark, not a
+test: it prints the times and checks nothing. That the data are shared is
+checked by tests/test_tvariable.py test_zerocopy.
+"""
+import timeit
+import numpy
+from cdms2.tvariable import TransientVariable
+
+
+if __name__ == "__main__":
+    repeat = 100
+    for n in (10 ** 3, 10 ** 5, 10 ** 7):
+        data = numpy.ma.masked_less(numpy.arange(float(n)), 2.)
+        seconds = min(timeit.repeat(lambda: TransientVariable(data, copy=0), number=repeat, repeat=5)) / repeat
+        print("%9d elements: %8.1f us per construction" % (n, seconds * 1.e6))
@@ -5,7 +5,7 @@ __all__ = ["horizontal", "pressure", "crossSection", "scrip",
            "error", "mvGenericRegrid", ]
 
 from .error import RegridError  # noqa
-from .horizontal import Horizontal, Regridder  # noqa
+from .horizontal import Horizontal, Regridder, getHorizontal, readHorizontal  # noqa
 from .pressure import PressureRegridder  # noqa
 from .crossSection import CrossSectionRegridder  # noqa
 from .scrip import ConservativeRegridder, BilinearRegridder, BicubicRegridder  # noqa
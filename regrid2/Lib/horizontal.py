@@ -2,6 +2,13 @@
 
 import numpy
 import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 # from . import _regrid
 import regrid2._regrid as _regrid
 from .error import RegridError
@@ -10,6 +17,151 @@ import cdms2
 
 _debug = 0                              # Set to 1 for debug
 
+# Number of threads regridding the (time, level) stack of an array
+_maxWorkers = min(4, os.cpu_count() or 1)
+
+# Regridders returned by getHorizontal, grid signature => Horizontal, least recently used first
+_cache = OrderedDict()
+_cacheSize = 16
+_cacheDir = None
+_cacheLock = threading.Lock()
+
+
+def setMaxWorkers(n):
+    """Set the number of threads used to regrid the (time, level) stack of an array."""
+    global _maxWorkers
+    if n < 1:
+        raise RegridError("setMaxWorkers: number of workers must be >= 1")
+    _maxWorkers = int(n)
+
+
+def getMaxWorkers():
+    """Return the number of threads used to regrid the (time, level) stack of an array."""
+    return _maxWorkers
+
+
+def setCacheSize(n):
+    """Set the number of regridders kept in memory by getHorizontal, 0 to disable."""
+    global _cacheSize
+    if n < 0:
+        raise RegridError("setCacheSize: cache size must be >= 0")
+    _cacheSize = int(n)
+    with _cacheLock:
+        while len(_cache) > _cacheSize:
+            _cache.popitem(last=False)
+
+
+def getCacheSize():
+    """Return the number of regridders kept in memory by getHorizontal."""
+    return _cacheSize
+
+
+def setCacheDir(path):
+    """Set the directory where getHorizontal saves and finds regridders, None to disable."""
+    global _cacheDir
+    if path is not None and not os.path.isdir(path):
+        os.makedirs(path)
+    _cacheDir = path
+
+
+def getCacheDir():
+    """Return the directory where getHorizontal saves and finds regridders, or None."""
+    return _cacheDir
+
+
+def _axisAttributes(axis):
+    return {key: value for key, value in axis.attributes.items() if isinstance(value, (str, int, float))}
+
+
+def gridSignature(ingrid, outgrid):
+    """
+    Return a digest identifying the regridding from ingrid to outgrid.
+
+    Pairs of grids with the same signature have the same Horizontal regridder: the digest
+    covers the coordinates, bounds and masks of both grids, the order of the input grid and
+    the metadata of the output axes.
+    """
+    digest = hashlib.sha1()
+    for grid in (ingrid, outgrid):
+        digest.update(grid.getOrder().encode())
+        for axis in (grid.getLatitude(), grid.getLongitude()):
+            digest.update(axis.id.encode())
+            digest.update(json.dumps(_axisAttributes(axis), sort_keys=True, default=str).encode())
+            values = numpy.ascontiguousarray(axis[:], numpy.float64)
+            digest.update(str(values.shape).encode())
+            digest.update(values.tobytes())
+        for bounds in grid.getBounds():
+            bounds = numpy.ascontiguousarray(bounds, numpy.float64)
+            digest.update(str(bounds.shape).encode())
+            digest.update(bounds.tobytes())
+        mask = grid.getMask()
+        if mask is not None:
+            mask = numpy.ascontiguousarray(mask, numpy.int8)
+            digest.update(b'mask' + str(mask.shape).encode())
+            digest.update(mask.tobytes())
+    return digest.hexdigest()
+
+
+def getHorizontal(ingrid, outgrid):
+    """
+    Return a Horizontal regridder from ingrid to outgrid.
+
+    Regridders are memoized by gridSignature, so regridding repeatedly between the same grids
+    computes the overlap weights only once. If a cache directory is set (see setCacheDir),
+    regridders are also saved there, and read back by later sessions.
+    """
+    key = gridSignature(ingrid, outgrid)
+    with _cacheLock:
+        regridder = _cache.get(key)
+        if regridder is not None:
+            _cache.move_to_end(key)
+            return regridder
+
+    path = None
+    if _cacheDir is not None:
+        path = os.path.join(_cacheDir, key + '.npz')
+        if os.path.isfile(path):
+            try:
+                regridder = readHorizontal(path)
+            except Exception:
+                # A corrupt or truncated entry is recomputed, and replaced
+                regridder = None
+    if regridder is None:
+        regridder = Horizontal(ingrid, outgrid)
+        if path is not None:
+            regridder.save(path)
+
+    if _cacheSize > 0:
+        with _cacheLock:
+            _cache[key] = regridder
+            while len(_cache) > _cacheSize:
+                _cache.popitem(last=False)
+    return regridder
+
+
+def readHorizontal(path):
+    """Read a Horizontal regridder saved by Horizontal.save."""
+    with numpy.load(path) as data:
+        regridder = Horizontal.__new__(Horizontal)
+        regridder.nlati, regridder.nlato, regridder.nloni, regridder.nlono = [int(n) for n in data['sizes']]
+        for name in ('londx', 'lonpt', 'wtlon', 'latdx', 'latpt', 'wtlat'):
+            setattr(regridder, name, data[name])
+        regridder.inmask = data['inmask'] if 'inmask' in data.files else None
+        regridder.outmask = data['outmask'] if 'outmask' in data.files else None
+        regridder.inshape = tuple(int(n) for n in data['inshape'])
+        regridder.inorder = str(data['inorder'])
+        regridder.outlat = _readAxis(data, 'outlat')
+        regridder.outlon = _readAxis(data, 'outlon')
+    return regridder
+
+
+def _readAxis(data, name):
+    bounds = data[name + '_bounds'] if (name + '_bounds') in data.files else None
+    axis = cdms2.createAxis(data[name], bounds=bounds, id=str(data[name + '_id']))
+    for key, value in json.loads(str(data[name + '_attributes'])).items():
+        setattr(axis, key, value)
+    return axis
+
 # Map (n,2) boundary arrays to individual boundary arrays. Returns
 # (lowerBounds, upperBounds)
 
@@ -88,6 +240,45 @@ class Horizontal:
         self.londx, self.lonpt, self.wtlon, self.latdx, self.latpt, self.wtlat = _regrid.maparea(
             self.nloni, self.nlono, self.nlati, self.nlato, bnin, bnout, bsin, bsout, bein, beout, bwin, bwout)
 
+    def save(self, path):
+        """
+        Save the regridder to a file, in numpy .npz format.
+
+        Parameters
+        ----------
+
+        path :
+            is the file name. The regridder is read back with readHorizontal.
+        """
+        arrays = dict(sizes=numpy.array([self.nlati, self.nlato, self.nloni, self.nlono]),
+                      londx=self.londx, lonpt=self.lonpt, wtlon=self.wtlon,
+                      latdx=self.latdx, latpt=self.latpt, wtlat=self.wtlat,
+                      inshape=numpy.array(self.inshape), inorder=numpy.array(self.inorder))
+        if self.inmask is not None:
+            arrays['inmask'] = self.inmask
+        if self.outmask is not None:
+            arrays['outmask'] = self.outmask
+        for name, axis in (('outlat', self.outlat), ('outlon', self.outlon)):
+            arrays[name] = axis[:]
+            bounds = axis.getBounds()
+            if bounds is not None:
+                arrays[name + '_bounds'] = bounds
+            arrays[name + '_id'] = numpy.array(axis.id)
+            arrays[name + '_attributes'] = numpy.array(json.dumps(_axisAttributes(axis), default=str))
+
+        # Write a temporary file first, so that a concurrent reader never sees a partial file.
+        # The name is unique to this call, as other threads or processes may save the same path.
+        fd, tmppath = tempfile.mkstemp(suffix='.tmp', prefix=os.path.basename(path) + '.',
+                                       dir=os.path.dirname(path) or '.')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                numpy.savez(f, **arrays)
+            os.chmod(tmppath, 0o644)
+            os.replace(tmppath, path)
+        except BaseException:
+            os.unlink(tmppath)
+            raise
+
     def __call__(self, ar, missing=None, order=None,
                  mask=None, returnTuple=0, **args):
         """
@@ -305,31 +496,8 @@ class Horizontal:
         # Perform the regridding. The return array has the same shape
         # as the output array, and is the fraction of the zone which overlaps
         # a non-masked zone of the input grid.
-        amskout = _regrid.rgdarea(
-            ilon,
-            ilat,
-            itim1,
-            itim2,
-            ntim1,
-            ntim2,
-            nloni,
-            self.nlono,
-            nlati,
-            self.nlato,
-            flag2D,
-            missing,
-            self.londx,
-            self.lonpt,
-            self.wtlon,
-            self.latdx,
-            self.latpt,
-            self.wtlat,
-            inmask,
-            ar,
-            outar)
-
-        # Correct the shape of output weights
-        amskout.shape = outar.shape
+        amskout = self._rgdarea(ilon, ilat, itim1, itim2, ntim1, ntim2, flag2D, missing,
+                                inmask, numpy.ascontiguousarray(ar), outar)
 
         # Set the missing data mask of the output array, if any.
         hasMissing = not numpy.ma.alltrue(numpy.ma.ravel(amskout))
@@ -366,6 +534,43 @@ class Horizontal:
         else:
             return result, amskout
 
+    def _rgdarea(self, ilon, ilat, itim1, itim2, ntim1, ntim2, flag2D, missing, inmask, ar, outar):
+        """
+        Regrid ar into outar with rgdarea, and return the output weights.
+
+        If the first dimension of ar is a time or level dimension, the stack is split along it
+        into one chunk per thread, and the chunks are regridded concurrently.
+        """
+        rank = len(ar.shape)
+        nchunks = min(_maxWorkers, ar.shape[0])
+        if rank == 2 or nchunks < 2 or (rank - 1) in (ilon, ilat):
+            amskout = _regrid.rgdarea(ilon, ilat, itim1, itim2, ntim1, ntim2, self.nloni, self.nlono,
+                                      self.nlati, self.nlato, flag2D, missing, self.londx, self.lonpt,
+                                      self.wtlon, self.latdx, self.latpt, self.wtlat, inmask, ar, outar)
+            amskout.shape = outar.shape
+            return amskout
+
+        # The leading dimension is the last one in rgdarea's (Fortran) numbering
+        inmask = numpy.ascontiguousarray(inmask)
+        amskout = numpy.empty(outar.shape, numpy.float32)
+
+        def regridChunk(i, j):
+            chunkmask = inmask if flag2D else inmask[i:j]
+            chunkntim1 = (j - i) if itim1 == rank - 1 else ntim1
+            chunkntim2 = (j - i) if itim2 == rank - 1 else ntim2
+            chunkout = outar[i:j]
+            result = _regrid.rgdarea(ilon, ilat, itim1, itim2, chunkntim1, chunkntim2, self.nloni, self.nlono,
+                                     self.nlati, self.nlato, flag2D, missing, self.londx, self.lonpt,
+                                     self.wtlon, self.latdx, self.latpt, self.wtlat, chunkmask, ar[i:j], chunkout)
+            amskout[i:j] = result.reshape(chunkout.shape)
+
+        limits = [int(n) for n in numpy.linspace(0, ar.shape[0], nchunks + 1)]
+        with ThreadPoolExecutor(max_workers=nchunks) as executor:
+            futures = [executor.submit(regridChunk, i, j) for i, j in zip(limits[:-1], limits[1:])]
+            for future in futures:
+                future.result()
+        return amskout
+
 
 class Regridder(Horizontal):
     def __init__(self, ingrid, outgrid):
@@ -1,11 +1,41 @@
 # Automatically adapted for numpy.oldnumeric Aug 02, 2007 by
 import cdms2
 import numpy
-# from . import _regrid
-import regrid2._regrid as _regrid
+from concurrent.futures import ThreadPoolExecutor
 from .error import RegridError
 import copy
 
+# Maximum number of values of an input block (levels x columns) interpolated at once
+_blockSize = 1 << 18
+# Number of threads interpolating blocks, 1 to interpolate in the calling thread
+_maxWorkers = 1
+
+
+def setBlockSize(n):
+    """Set the maximum number of input values (levels x columns) interpolated in one block."""
+    global _blockSize
+    if n < 1:
+        raise RegridError("setBlockSize: block size must be >= 1")
+    _blockSize = int(n)
+
+
+def getBlockSize():
+    """Return the maximum number of input values interpolated in one block."""
+    return _blockSize
+
+
+def setMaxWorkers(n):
+    """Set the number of threads used to interpolate blocks of columns."""
+    global _maxWorkers
+    if n < 1:
+        raise RegridError("setMaxWorkers: number of workers must be >= 1")
+    _maxWorkers = int(n)
+
+
+def getMaxWorkers():
+    """Return the number of threads used to interpolate blocks of columns."""
+    return _maxWorkers
+
 
 class PressureRegridder:
     """
@@ -54,7 +84,7 @@ class PressureRegridder:
         self.nlevi = len(axisIn)
         self.nlevo = len(axisOut)
 
-    def __call__(self, ar, missing=None, order=None, method="log"):
+    def __call__(self, ar, missing=None, order=None, method="log", surface=None):
         """
         Call the pressure regridder function.
         ar is the input array, a variable, masked array, or numpy array.
@@ -62,6 +92,8 @@ class PressureRegridder:
           defined for the input array, if any.
         order is of the form "tzyx", "tyx", etc.
         method is either 'log' to interpolate in the log of pressure, or 'linear' for linear interpolation.
+        surface is the surface pressure of each column, if any, with the shape of ar without the level
+          dimension. Output levels with pressure greater than the surface pressure are missing.
         """
 
         from cdms2.avariable import AbstractVariable
@@ -136,7 +168,9 @@ class PressureRegridder:
             logYes = 'yes'
         else:
             logYes = 'no'
-        outar = self.rgrd(ar, missing, 'greater', logYes, positionIn)
+        if surface is not None:
+            surface = numpy.ma.filled(surface)
+        outar = self.rgrd(ar, missing, 'greater', logYes, positionIn, surface=surface)
 
         # Reconstruct the same class as on input
         if inputIsVariable == 1:
@@ -148,7 +182,7 @@ class PressureRegridder:
         return result
 
     def rgrd(self, dataIn, missingValueIn, missingMatch,
-             logYes='yes', positionIn=None, missingValueOut=None):
+             logYes='yes', positionIn=None, missingValueOut=None, surface=None):
         """
         To perform all the tasks required to regrid the input data, dataIn, into the ouput data,
         dataout along the level dimension only.
@@ -204,6 +238,10 @@ class PressureRegridder:
             * If left at the default entry, None, the code uses missingValueIn
             * If present or as a last resort 1.0e20
 
+        surface : optional level of the surface (surface pressure) of each column, an array with the
+            shape of dataIn without the level dimension. Output levels greater than the surface are set
+            to missing.
+
         Returns
         -------
         dataOut : the regridded data
@@ -265,43 +303,17 @@ class PressureRegridder:
 
         # --- evaluate positionIn ----
 
-        # --- make standard positionIn as a check----
-        positionList = []
-        for n in range(numberDim):              # insert a sequence of numbers
-            positionList.append(n)
-        positionList.reverse()
-
-        for n in range(numberDim, 4):            # fill end of list with Nones
-            positionList.append(None)
-
-        positionCheck = tuple(positionList)
-
-        standardPosition = 0                            # transpose required
-
         if positionIn is None:                          # construct the default positionIn tuple
-            positionIn = positionCheck
-            standardPosition = 1                        # no need for a transpose with this data
-        else:
-            if positionIn == positionCheck:             # compare to the standard
-                standardPosition = 1                    # no need for a transpose with this data
+            positionList = list(range(numberDim))
+            positionList.reverse()
+            positionList.extend([None] * (4 - numberDim))
+            positionIn = tuple(positionList)
 
         if len(positionIn) != 4:
             msg = 'Error in call to rgrd -- positionIn must be a tuple of length 4'
             sendmsg(msg)
             raise TypeError
 
-        # transpose data to the standard order (t,z,y,x)
-        if standardPosition == 0:
-
-            newOrder, inverseOrder = checkorder(positionIn)
-
-            # transpose data to standard order (t,z,y,x)
-            dataIn = numpy.transpose(dataIn, newOrder)
-            dataIn = numpy.array(
-                dataIn.astype(
-                    numpy.float32),
-                numpy.float32)       # make contiguous
-
         # set dimension sizes and check for consistency
 
         if positionIn[0] is not None:
@@ -312,68 +324,23 @@ class PressureRegridder:
             self.nlat = (dataShape[positionIn[1]])
         else:
             self.nlat = 0
-        if positionIn[2] is not None:
-            if self.nlevi != (dataShape[positionIn[2]]):
-                msg = 'Level size is inconsistent with input data'
-                sendmsg(msg)
-                raise ValueError
         if positionIn[3] is not None:
             self.ntime = (dataShape[positionIn[3]])
         else:
             self.ntime = 0
 
-        # allocate memory for dataOut -- the array with new number of levels
-
-        outList = list(dataIn.shape)
-
-        for i in range(len(outList)):
-            if outList[i] == self.nlevi:
-                outList[i] = self.nlevo
-                break
-
-        dataOut = numpy.zeros(
-            tuple(outList),
-            numpy.float32)                      # memory for aout
-
-        if missingMatch is None:                                                # if no missing do not pass None
-            missingMatch = 'none'
-
-        # if no missing do not pass None
-        if missingValueIn is None:
-            missingValueIn = 1.333e33
+        levelPosition = positionIn[2]
+        if levelPosition is None and self.nlevi in dataShape:
+            levelPosition = dataShape.index(self.nlevi)
+        if levelPosition is None or self.nlevi != (dataShape[levelPosition]):
+            msg = 'Level size is inconsistent with input data'
+            sendmsg(msg)
+            raise ValueError
 
-        if logYes != 'yes':
-            logYes = 'no'
+        # interpolate along the level dimension, without transposing the data
 
-        levIn = self.axisIn[:].astype(numpy.float64)
-        levOut = self.axisOut[:].astype(numpy.float64)
-        _regrid.rgdpressure(
-            self.nlevi,
-            self.nlevo,
-            self.nlat,
-            self.nlon,
-            self.ntime,
-            missingValueIn,
-            missingMatch,
-            logYes,
-            levIn,
-            levOut,
-            dataIn,
-            dataOut)
-
-        # if no missing do not pass None
-        if missingMatch == 'none':
-            missingMatch = None
-        if missingValueIn == 1.333e33:
-            missingValueIn = None
-
-        if standardPosition == 0:
-            # transpose data to original order
-            dataOut = numpy.transpose(dataOut, inverseOrder)
-            dataOut = numpy.array(
-                dataOut.astype(
-                    numpy.float32),
-                numpy.float32)            # make contiguous
+        dataOut = interpolate(dataIn, self.axisIn[:], self.axisOut[:], levelPosition,
+                              missingValueIn, missingMatch, logYes, surface)
 
         if missingValueOut is not None:                # set the missing value in data to missingValueOut
 
@@ -415,6 +382,158 @@ class PressureRegridder:
         return dataOut
 
 
+def interpolate(dataIn, levIn, levOut, axis=0, missingValueIn=None, missingMatch=None,
+                logYes='yes', surface=None, dataOut=None):
+    """
+    Interpolate data from the levels levIn to the levels levOut along one dimension.
+
+    Each column (the values along <axis> at one point of the other dimensions) is interpolated
+    linearly in the level, or in the log of the level. Output levels outside the range of the
+    input levels take the value at the nearest input level. The level dimension may be at any
+    position: the data are not transposed, but interpolated in blocks of columns of at most
+    getBlockSize() input values, on getMaxWorkers() threads.
+
+    Parameters
+    ----------
+    dataIn : numpy array with the input levels along <axis>
+
+    levIn : the input levels, increasing or decreasing
+
+    levOut : the output levels
+
+    axis : position of the level dimension in dataIn
+
+    missingValueIn : the missing data value, or None if there is no missing data. Output values
+        interpolated from a missing input value are set to missingValueIn.
+
+    missingMatch : comparison used to find missing data, 'greater', 'equal', 'less' or None,
+        as in PressureRegridder.rgrd
+
+    logYes : 'yes' to interpolate in the log of the level, anything else is linear in level
+
+    surface : optional level of the surface of each column, an array with the shape of dataIn
+        without the level dimension, or broadcastable to it. Output values at levels greater
+        than the surface level are set to missingValueIn, or 1.0e20 if it is None.
+
+    dataOut : optional float32 output array, with the shape of dataIn except len(levOut) along <axis>
+
+    Returns
+    -------
+    dataOut : the interpolated data
+    """
+
+    dataIn = numpy.asarray(dataIn)
+    levIn = numpy.asarray(levIn, dtype=numpy.float64)
+    levOut = numpy.asarray(levOut, dtype=numpy.float64)
+    nlevi = len(levIn)
+    if axis < 0:
+        axis = axis + dataIn.ndim
+    if dataIn.shape[axis] != nlevi:
+        raise RegridError('Level size is inconsistent with input data')
+    if missingMatch not in ('greater', 'equal', 'less', None):
+        raise RegridError('missingMatch must be None or the string greater, equal, or less')
+
+    if logYes == 'yes':
+        x = numpy.log(levIn)
+        xp = numpy.log(levOut)
+    else:
+        x = levIn
+        xp = levOut
+
+    # input levels bracketing each output level, and the interpolation weights
+    if x[-1] > x[0]:
+        below = numpy.searchsorted(x, xp, 'left') - 1
+    else:
+        below = nlevi - numpy.searchsorted(x[::-1], xp, 'left') - 1
+    interior = (below >= 0) & (below < nlevi - 1)
+    lo = numpy.clip(below, 0, nlevi - 1)
+    hi = numpy.where(interior, below + 1, lo)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        weight = numpy.where(interior, (xp - x[lo]) / (x[hi] - x[lo]), 0.0)
+
+    isMissing = None
+    if missingValueIn is not None:
+        isMissing = _missingTest(missingValueIn, missingMatch)
+    fill = missingValueIn
+    if fill is None:
+        fill = 1.0e20
+
+    outShape = list(dataIn.shape)
+    outShape[axis] = len(levOut)
+    if dataOut is None:
+        dataOut = numpy.empty(tuple(outShape), numpy.float32)
+
+    # views with the level dimension first
+    dataT = numpy.moveaxis(dataIn, axis, 0)
+    outT = numpy.moveaxis(dataOut, axis, 0)
+    columnShape = dataT.shape[1:]
+    if surface is not None:
+        surface = numpy.broadcast_to(numpy.asarray(surface), columnShape)
+
+    def interpolateBlock(index):
+        key = (slice(None),) + index
+        y = dataT[key]
+        ylo = y[lo]
+        yhi = y[hi]
+        levelShape = (len(xp),) + (1,) * (y.ndim - 1)
+        result = ylo + (yhi - ylo) * weight.reshape(levelShape)
+        if isMissing is not None:
+            result[(isMissing(ylo) | isMissing(yhi)) & interior.reshape(levelShape)] = missingValueIn
+        if surface is not None:
+            result[levOut.reshape(levelShape) > surface[index]] = fill
+        outT[key] = result
+
+    blocks = list(_columnBlocks(columnShape, max(1, _blockSize // max(nlevi, 1))))
+    if _maxWorkers > 1 and len(blocks) > 1:
+        with ThreadPoolExecutor(max_workers=min(_maxWorkers, len(blocks))) as executor:
+            list(executor.map(interpolateBlock, blocks))
+    else:
+        for index in blocks:
+            interpolateBlock(index)
+
+    return dataOut
+
+
+def _missingTest(missingValueIn, missingMatch):
+    """Return a function flagging the missing values of an array, or None if missingMatch is None."""
+    if missingMatch == 'greater':
+        if missingValueIn > 0.0:
+            missing = 0.99 * missingValueIn
+        else:
+            missing = 1.01 * missingValueIn
+        return lambda y: y > missing
+    elif missingMatch == 'equal':
+        return lambda y: y == missingValueIn
+    elif missingMatch == 'less':
+        if missingValueIn < 0.0:
+            missing = 0.99 * missingValueIn
+        else:
+            missing = 1.01 * missingValueIn
+        return lambda y: y < missing
+    return None
+
+
+def _columnBlocks(shape, ncols):
+    """
+    Generate the indices of blocks of at most ncols columns of an array of columns of <shape>.
+    Each index is a tuple of integers followed by a slice of the next dimension, or () for
+    the whole array.
+    """
+    size = 1
+    k = len(shape)
+    while k > 0 and size * shape[k - 1] <= ncols:
+        k -= 1
+        size *= shape[k]
+    if k == 0:
+        yield ()
+        return
+    step = max(1, ncols // size)
+    n = shape[k - 1]
+    for outer in numpy.ndindex(*shape[:k - 1]):
+        for i in range(0, n, step):
+            yield outer + (slice(i, min(i + step, n)),)
+
+
 def checkorder(positionIn):
     """
     Purpose :
@@ -1303,6 +1303,10 @@ static PyObject *rgd_rgdarea(PyObject *self, PyObject *args)
 	exit(1);
     }
 
+    /* the loops do not use the Python API: let other threads run */
+
+    Py_BEGIN_ALLOW_THREADS
+
     /* branch to special version of the loops for 2D case */
 
     if (flag2D) {
@@ -1504,6 +1508,8 @@ static PyObject *rgd_rgdarea(PyObject *self, PyObject *args)
         }
     }
 
+    Py_END_ALLOW_THREADS
+
     free(accum);
     free(wtmsk);
 
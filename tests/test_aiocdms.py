@@ -0,0 +1,34 @@
+import asyncio
+import os
+import numpy
+import cdat_info
+from cdms2 import aiocdms
+import basetest
+
+
+class TestAsyncIO(basetest.CDMSBaseTest):
+    def testCoalescedReads(self):
+        path = os.path.join(cdat_info.get_sampledata_path(), "clt.nc")
+        f = self.getFile(path)
+        clt = f["clt"]
+
+        async def read():
+            async with await aiocdms.open(path) as af:
+                aclt = af["clt"]
+                return await asyncio.gather(aclt.subSlice(slice(0, 5)),
+                                            aclt.subSlice(slice(3, 8)),
+                                            aclt.getRegion(latitude=(-30, 30)),
+                                            af.read("clt", time=slice(2, 4)),
+                                            aclt[1:3])
+
+        a, b, c, d, e = asyncio.run(read())
+        self.assertTrue(numpy.ma.allequal(a, clt.subSlice(slice(0, 5))))
+        self.assertTrue(numpy.ma.allequal(a.getTime()[:], clt.getTime()[0:5]))
+        self.assertTrue(numpy.ma.allequal(b, clt.subSlice(slice(3, 8))))
+        self.assertTrue(numpy.ma.allequal(c, clt.getRegion(latitude=(-30, 30))))
+        self.assertTrue(numpy.ma.allequal(d, clt(time=slice(2, 4))))
+        self.assertTrue(numpy.ma.allequal(e, clt[1:3]))
+
+
+if __name__ == "__main__":
+    basetest.run()
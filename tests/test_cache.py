@@ -0,0 +1,134 @@
+import http.server
+import os
+import re
+import shutil
+import threading
+from cdms2 import cache, cdurllib
+import basetest
+
+
+class TestCache(basetest.CDMSBaseTest):
+    def setUp(self):
+        super(TestCache, self).setUp()
+        self.transfers = []
+        self.source = os.path.join(self.tempdir, "source.nc")
+        with open(self.source, "wb") as f:
+            f.write(b"x" * 1000)
+
+        def copyFile(fromURL, toURL, **keys):
+            self.transfers.append(fromURL)
+            shutil.copyfile(self.source, toURL)
+
+        self.saved = (cache._cache_tempdir, cache.copyFile, cache.getMaxCacheSize())
+        cache._cache_tempdir = os.path.join(self.tempdir, "cache")
+        os.mkdir(cache._cache_tempdir)
+        cache.copyFile = copyFile
+
+    def tearDown(self):
+        cache._cache_tempdir, cache.copyFile, maxsize = self.saved
+        cache.setMaxCacheSize(maxsize)
+        super(TestCache, self).tearDown()
+
+    def testConcurrentGetFile(self):
+        c = cache.Cache()
+        paths = []
+        threads = [threading.Thread(target=lambda: paths.append(c.getFile("ftp://host/a.nc", ("ds", "a.nc"))))
+                   for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.transfers, ["ftp://host/a.nc"])
+        self.assertEqual(len(set(paths)), 1)
+        self.assertTrue(os.path.isfile(paths[0]))
+        self.assertEqual(c.get(("ds", "a.nc")), paths[0])
+        self.assertIsNone(c.get(("ds", "b.nc")))
+        c.delete()
+        self.assertFalse(os.path.exists(paths[0]))
+
+    def testEviction(self):
+        c = cache.Cache()
+        cache.setMaxCacheSize(2500)
+        paths = [c.getFile("ftp://host/%d.nc" % i, ("ds", i)) for i in range(4)]
+        self.assertEqual([os.path.isfile(p) for p in paths], [False, False, True, True])
+        self.assertIsNone(c.get(("ds", 0)))
+        self.assertEqual(c.get(("ds", 3)), paths[3])
+
+    def testEvictionOutsideCache(self):
+        c = cache.Cache()
+        cache.setMaxCacheSize(2500)
+        # A file registered by put() outside the cache directory is never deleted
+        external = os.path.join(self.tempdir, "external.nc")
+        shutil.copyfile(self.source, external)
+        os.utime(external, (0, 0))
+        c.put("external", external)
+        # A sparse file of openRemote is evicted with its block map
+        sparse = c._path("remote") + ".sparse"
+        for path in (sparse, sparse + ".blocks"):
+            shutil.copyfile(self.source, path)
+        os.utime(sparse, (1, 1))
+        c.put("remote#blocks", sparse)
+        paths = [c.getFile("ftp://host/%d.nc" % i, ("ds", i)) for i in range(3)]
+        self.assertTrue(os.path.isfile(external))
+        self.assertIsNone(c.get("external"))
+        self.assertFalse(os.path.exists(sparse))
+        self.assertFalse(os.path.exists(sparse + ".blocks"))
+        self.assertEqual([os.path.isfile(p) for p in paths], [False, True, True])
+
+
+class RangeHandler(http.server.BaseHTTPRequestHandler):
+    """Serve the bytes of the test file, honouring single range requests."""
+
+    def do_GET(self):
+        data = self.server.data
+        self.server.requests.append(self.headers.get('Range'))
+        match = re.match(r'bytes=(\d+)-(\d+)', self.headers.get('Range', ''))
+        if match is None:
+            self.send_response(200)
+            start, stop = 0, len(data)
+        else:
+            start, stop = int(match.group(1)), min(int(match.group(2)) + 1, len(data))
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes %d-%d/%d' % (start, stop - 1, len(data)))
+        self.send_header('Content-Length', str(stop - start))
+        self.end_headers()
+        self.wfile.write(data[start:stop])
+
+    def log_message(self, *args):
+        pass
+
+
+class TestRangeReader(basetest.CDMSBaseTest):
+    def setUp(self):
+        super(TestRangeReader, self).setUp()
+        self.server = http.server.HTTPServer(('127.0.0.1', 0), RangeHandler)
+        self.server.data = bytes(bytearray(range(256))) * 40
+        self.server.requests = []
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = 'http://127.0.0.1:%d/data.nc' % self.server.server_port
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        super(TestRangeReader, self).tearDown()
+
+    def testBlocks(self):
+        data = self.server.data
+        path = os.path.join(self.tempdir, 'data.sparse')
+        with cdurllib.RangeReader(self.url, path, blocksize=1000) as f:
+            self.assertEqual(f.size, len(data))
+            f.seek(2500)
+            self.assertEqual(f.read(1000), data[2500:3500])
+            self.assertEqual(f.nfetched, 1)
+            self.assertFalse(f.complete())
+            f.seek(-100, os.SEEK_END)
+            self.assertEqual(f.read(), data[-100:])
+        self.assertEqual(self.server.requests[1:], ['bytes=2000-3999', 'bytes=10000-10239'])
+
+        # A second reader of the cache file only fetches the missing blocks
+        with cdurllib.RangeReader(self.url, path, blocksize=1000) as f:
+            self.assertEqual(f.read(), data)
+            self.assertEqual(f.nfetched, 2)
+            self.assertTrue(f.complete())
@@ -0,0 +1,72 @@
+import numpy
+import cdms2
+import MV2
+from cdms2 import chunked
+import basetest
+
+
+class TestChunked(basetest.CDMSBaseTest):
+    def setUp(self):
+        super(TestChunked, self).setUp()
+        data = numpy.ma.masked_greater(numpy.random.random((12, 8, 16)), 0.8)
+        data[:, 2, 3] = numpy.ma.masked
+        v = cdms2.createVariable(data, id='v')
+        v.getAxis(0).designateTime()
+        v.getAxis(1).designateLatitude()
+        v.getAxis(2).designateLongitude()
+        f = self.getTempFile('chunked.nc', 'w')
+        f.write(v)
+        f.close()
+        self.file = self.getTempFile('chunked.nc')
+        self.var = self.file['v']
+        self.data = self.var()
+        self.saved = cdms2.lazy.getBlockSize()
+        cdms2.lazy.setBlockSize(200)
+
+    def tearDown(self):
+        cdms2.lazy.setBlockSize(self.saved)
+        super(TestChunked, self).tearDown()
+
+    def testReductions(self):
+        for axis in (0, 1, 2):
+            for blockaxis in (0, 1, 2):
+                s = chunked.sum(self.var, axis, blockaxis=blockaxis)
+                self.assertTrue(numpy.ma.allclose(s, MV2.sum(self.data, axis)))
+                self.assertEqual([ax.id for ax in s.getAxisList()],
+                                 [ax.id for ax in self.var.getAxisList(omit=axis)])
+                a = chunked.average(self.var, axis, blockaxis=blockaxis)
+                self.assertTrue(numpy.ma.allclose(a, MV2.average(self.data, axis)))
+                self.assertTrue(numpy.ma.allequal(chunked.max(self.var, axis, blockaxis=blockaxis),
+                                                  MV2.max(self.data, axis)))
+                self.assertTrue(numpy.ma.allequal(chunked.min(self.var, axis, blockaxis=blockaxis),
+                                                  MV2.min(self.data, axis)))
+                self.assertTrue(numpy.array_equal(chunked.count(self.var, axis, blockaxis=blockaxis),
+                                                  MV2.count(self.data, axis)))
+
+        # All values masked along the reduced axis
+        self.assertTrue(chunked.average(self.var, 'time')[2, 3] is numpy.ma.masked)
+
+        # Several axes, by name
+        s = chunked.sum(self.var, ('lat', 'lon'))
+        self.assertTrue(numpy.ma.allclose(s, numpy.ma.sum(self.data, axis=(1, 2))))
+        self.assertTrue(s.getAxis(0).isTime())
+        self.assertTrue(numpy.ma.allclose(chunked.average(self.var), MV2.average(self.data)))
+
+    def testWeights(self):
+        weights = numpy.arange(1., 9.)
+        a, w = chunked.average(self.var, 'lat', weights=weights, returned=True)
+        b, x = MV2.average(self.data, 1, weights=numpy.broadcast_to(weights[None, :, None], (12, 8, 16)), returned=True)
+        self.assertTrue(numpy.ma.allclose(a, b))
+        self.assertTrue(numpy.ma.allclose(w, x))
+        with self.assertRaises(cdms2.CDMSError):
+            chunked.reduce(self.var, 'sum', 0, weights=weights)
+
+    def testProcesses(self):
+        s = chunked.sum(self.var, 'time', processes=2)
+        self.assertTrue(numpy.ma.allclose(s, MV2.sum(self.data, 0)))
+        m = chunked.max(self.var, 'lon', blockaxis='time', processes=2)
+        self.assertTrue(numpy.ma.allequal(m, MV2.max(self.data, 2)))
+
+
+if __name__ == "__main__":
+    basetest.run()
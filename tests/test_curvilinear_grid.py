@@ -172,6 +172,48 @@ class TestCurvilinearGrids(basetest.CDMSBaseTest):
         curveGrid = rectGrid.toCurveGrid()
         genGrid = curveGrid.toGenericGrid()
 
+    def testSelectMaskedSubset(self):
+        f = self.getDataFile('sampleCurveGrid4.nc')
+        samp = f['sample']
+        x = samp(lat=(-10, 30), lon=(90, 150))
+
+        # Options are applied to the masked subset
+        r = samp(lat=(-10, 30), lon=(90, 150), raw=1)
+        self.assertFalse(isinstance(r, cdms2.tvariable.TransientVariable))
+        self.assertTrue(numpy.ma.allequal(r, x))
+        self.assertTrue(numpy.array_equal(numpy.ma.getmaskarray(r), numpy.ma.getmaskarray(x)))
+
+        # Selecting from a transient variable leaves its mask unchanged
+        t = samp()
+        mask = numpy.ma.getmaskarray(t).copy()
+        z = t(lat=(-10, 30), lon=(90, 150))
+        self.assertTrue(numpy.array_equal(numpy.ma.getmaskarray(z), numpy.ma.getmaskarray(x)))
+        self.assertTrue(numpy.array_equal(numpy.ma.getmaskarray(t), mask))
+
+    def testFixCutCells(self):
+        from cdms2.coord import TransientAxis2D, TransientVirtualAxis
+        from cdms2.hgrid import TransientCurveGrid
+
+        # Synthetic tripolar-like grid, with a longitude cut at 0/360 degrees
+        ny, nx = 500, 1440
+        lonn = numpy.mod(numpy.linspace(-20., 340., nx + 1), 360.)[numpy.newaxis, :].repeat(ny + 1, 0)
+        latn = numpy.linspace(-80., 89., ny + 1)[:, numpy.newaxis].repeat(nx + 1, 1)
+
+        def cells(nodes):
+            return numpy.stack([nodes[:-1, :-1], nodes[:-1, 1:], nodes[1:, 1:], nodes[1:, :-1]], axis=-1)
+
+        iaxis = TransientVirtualAxis("i", ny)
+        jaxis = TransientVirtualAxis("j", nx)
+        lat = TransientAxis2D(cells(latn).mean(-1), axes=(iaxis, jaxis), bounds=cells(latn), id="latitude")
+        lon = TransientAxis2D(cells(lonn).mean(-1), axes=(iaxis, jaxis), bounds=cells(lonn), id="longitude")
+        grid = TransientCurveGrid(lat, lon)
+
+        bad = grid.checkConvex()
+        self.assertTrue(numpy.array_equal(bad, numpy.arange(ny) * nx + 79))
+        self.assertEqual(len(grid.fixCutCells(bad)), 0)
+        self.assertEqual(len(grid.checkConvex()), 0)
+        self.assertTrue(numpy.allclose(grid.getBounds()[1][0, 79], [359.75, 360., 360., 359.75]))
+
 
 if __name__ == "__main__":
     basetest.run()
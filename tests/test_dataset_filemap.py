@@ -90,6 +90,16 @@ class TestDatasetFilemap(basetest.CDMSBaseTest):
         tar2p = numpy.ma.concatenate((tar[numpy.newaxis, 54], tar[60:66]))
         self.assertTrue(numpy.ma.allclose(tar2, tar2p))
 
+    def testPartitionIndex(self):
+        from cdms2.sliceut import slicePartition, PartitionIndex
+        partition = [[0, 12], [12, 24], [30, 36], [36, 48]]
+        index = PartitionIndex(partition)
+        for aSlice in [slice(0, 48), slice(10, 13), slice(24, 30), slice(25, 40, 3),
+                       slice(47, 48), slice(48, 60)]:
+            self.assertEqual(slicePartition(aSlice, index),
+                             slicePartition(aSlice, partition))
+        self.assertEqual(len(index.candidates(slice(13, 14))), 1)
+
 
 if __name__ == "__main__":
     basetest.run()
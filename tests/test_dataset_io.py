@@ -3,6 +3,7 @@ import numpy
 import string
 import os
 import sys
+import threading
 
 cdms2.setNetcdfUseParallelFlag(0)
 
@@ -105,6 +106,70 @@ class TestDatasetIO(basetest.CDMSBaseTest):
         with self.assertRaises(cdms2.CDMSError):
             u.assignValue(transient_u)
 
+    def testCdmlCache(self):
+        cachedir = os.path.join(self.tempdir, 'cdmlc')
+        cdms2.setCdmlCache(cachedir)
+        try:
+            path = self.file.uri
+            first = self.getFile(path)
+            self.assertEqual(len(os.listdir(cachedir)), 1)
+            second = self.getFile(path)
+        finally:
+            cdms2.setCdmlCache(None)
+        self.assertEqual(sorted(first.variables.keys()), sorted(second.variables.keys()))
+        self.assertEqual(first._filemap_, second._filemap_)
+        self.assertTrue(numpy.ma.allequal(second('u'), self.u[:]))
+        self.assertTrue(numpy.ma.allequal(second['u'].getTime()[:], [0., 366., 731.]))
+
+        # Entries writable by others are not loaded
+        entry = os.path.join(cachedir, os.listdir(cachedir)[0])
+        self.assertIsNotNone(cdms2.cdmlcache.read(entry, path))
+        os.chmod(entry, 0o666)
+        self.assertIsNone(cdms2.cdmlcache.read(entry, path))
+
+        # Sidecar entries are named from the full file name
+        self.assertNotEqual(cdms2.cdmlcache.cachePath('/data/x.xml', 'sidecar'),
+                            cdms2.cdmlcache.cachePath('/data/x.cdml', 'sidecar'))
+
+    def testAxisCacheSize(self):
+        cdms2.setAxisCacheSize(0)
+        try:
+            f = self.getFile(self.file.uri)
+            t = f['u'].getTime()
+            self.assertEqual(len(t), 3)
+            self.assertTrue(numpy.ma.allequal(t[:], [0., 366., 731.]))
+            f['u'].getLatitude()[:]
+            self.assertTrue(numpy.ma.allequal(t[:], [0., 366., 731.]))
+        finally:
+            cdms2.setAxisCacheSize(None)
+
+    def testAxisCacheThreads(self):
+        from cdms2 import cdmsNode
+        nodes = []
+        for i in range(20):
+            node = cdmsNode.AxisNode('ax%d' % i, 100, cdmsNode.CdDouble)
+            node._datastring_ = ' '.join(str(float(x)) for x in range(100))
+            nodes.append(node)
+        errors = []
+
+        def read(offset):
+            try:
+                for k in range(2000):
+                    self.assertEqual(len(nodes[(7 * k + offset) % 20].data), 100)
+            except Exception as e:
+                errors.append(e)
+
+        cdms2.setAxisCacheSize(4000)
+        try:
+            threads = [threading.Thread(target=read, args=(i,)) for i in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            cdms2.setAxisCacheSize(None)
+        self.assertEqual(errors, [])
+
 
 if __name__ == '__main__':
     basetest.run()
@@ -85,6 +85,13 @@ class TestForecastIO(basetest.CDMSBaseTest):
         self.assertEqual(fcaxis._data_, [2010082500000, 2010082600000])
         self.assertEqual(fcaxis.id, 'fctau0')
 
+        # Read a hyperslab of each forecast
+        vsub = fcs('var', 'All', x=slice(1, 2))
+        self.assertEqual(vsub.shape, (2, 2, 1))
+        self.assertTrue(numpy.alltrue(vsub[:, :, 0] == vin[:, :, 1]))
+        self.assertEqual(vsub.getAxis(0).id, 'fctau0')
+        self.assertTrue(numpy.allclose(vsub.getAxis(2)[:], [0.2]))
+
 
 if __name__ == "__main__":
     basetest.run()
@@ -0,0 +1,47 @@
+import os
+import threading
+import numpy
+import cdat_info
+from cdms2 import gsHost
+import basetest
+
+
+class TestGsHost(basetest.CDMSBaseTest):
+    def testConcurrentVariables(self):
+        path = os.path.join(cdat_info.get_sampledata_path(), 'sampleCurveGrid4.nc')
+        expected = self.getFile(path)('sample')
+
+        # A host with one tile, without a libcf host file
+        host = gsHost.Host.__new__(gsHost.Host)
+        host._Host__initialize()
+        host.mode = 'r'
+        host.nGrids = 1
+        host.gridVars = {'lat': [path]}
+        host.statVars = {'sample': [path]}
+
+        results = [None, None]
+        errors = []
+
+        def build(i):
+            try:
+                results[i] = gsHost.StaticFileVariable(host, 'sample')
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=build, args=(i,)) for i in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+
+        # Each variable is set up in a file of its own
+        first, second = [r.vars[0] for r in results]
+        self.assertFalse(first.parent is second.parent)
+        self.assertTrue(numpy.ma.allequal(first(), expected))
+        self.assertTrue(numpy.ma.allequal(second(), expected))
+        host.close()
+
+
+if __name__ == "__main__":
+    basetest.run()
@@ -2,6 +2,7 @@
 
 import numpy
 import cdms2
+from concurrent.futures import ThreadPoolExecutor
 import os
 import sys
 from cdms2.tvariable import TransientVariable as TV
@@ -346,6 +347,86 @@ class TestMV2(basetest.CDMSBaseTest):
         mv2_reg = mv2.crossSectionRegrid(lev_out, lat_out)
         self.assertTrue(numpy.ma.is_masked(mv2_reg[:, :, -1].all()))
 
+    def testSharedAxes(self):
+        # Results share the axis values of their operands, not the axes
+        diff = self.u_transient - self.u_transient
+        lat = self.u_transient.getLatitude()
+        self.assertFalse(diff.getLatitude() is lat)
+        self.assertTrue(numpy.shares_memory(diff.getLatitude()[:], lat[:]))
+
+        # Editing the axes of the result does not touch the operand
+        units = lat.units
+        diff.getLatitude().units = 'radians'
+        diff.getLatitude().designateLongitude()
+        self.assertEqual(lat.units, units)
+        self.assertTrue(lat.isLatitude())
+
+        # Cached axis comparisons are invalidated when an axis is modified
+        lat = self.u_transient.getLatitude()
+        other = lat.clone()
+        self.assertTrue(cdms2.axis.allclose(lat, other))
+        version = other.getVersion()
+        other[0] = other[0] + 10.
+        self.assertNotEqual(other.getVersion(), version)
+        self.assertFalse(cdms2.axis.allclose(lat, other))
+
+        # Concurrent comparisons evicting each other from a small cache
+        axes = [lat.clone() for i in range(16)]
+        size = cdms2.axis._allcloseCacheSize
+        cdms2.axis._allcloseCacheSize = 2
+        try:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(lambda i: cdms2.axis.allclose(axes[i % 16], axes[(i + 1) % 16]),
+                                            range(2000)))
+        finally:
+            cdms2.axis._allcloseCacheSize = size
+        self.assertTrue(all(results))
+
+    def testDeferred(self):
+        u = self.u_transient
+        v = self.v_transient
+        w = MV2.ones(u.shape[-1])
+        expected = (u - v) * w / MV2.sum(w)
+        blocksize = cdms2.lazy.getBlockSize()
+        cdms2.lazy.setBlockSize(u.size // 3)
+        try:
+            with MV2.deferred():
+                expr = (u - v) * w / MV2.sum(w)
+            self.assertTrue(isinstance(expr, cdms2.lazy.Expression))
+            self.assertEqual(expr.shape, u.shape)
+            result = expr.compute()
+            self.assertTrue(MV2.allclose(result, expected))
+            self.assertTrue(numpy.shares_memory(result.getLatitude()[:], u.getLatitude()[:]))
+
+            with MV2.deferred():
+                mean = MV2.average(u - v, axis=0)
+            self.assertTrue(MV2.allclose(mean.compute(), MV2.average(u - v, axis=0)))
+
+            # Operations which are not elementwise are evaluated immediately
+            with MV2.deferred():
+                indices = MV2.nonzero(u - v)
+                total = MV2.sum(u, fill_value=1.)
+            self.assertEqual(len(indices), u.ndim)
+            self.assertFalse(isinstance(total, cdms2.lazy.Expression))
+
+            # Outside deferred mode, MV2 functions evaluate expressions
+            with MV2.deferred():
+                expr = u - v
+            diff = MV2.absolute(expr)
+            self.assertFalse(isinstance(diff, cdms2.lazy.Expression))
+            self.assertTrue(MV2.allclose(diff, MV2.absolute(u - v)))
+            self.assertTrue(diff.getLatitude().isLatitude())
+
+            # Masked values count as the fill value, on both paths
+            a = MV2.masked_greater(MV2.arange(4.), 1.5)
+            self.assertEqual(float(MV2.sum(a)), 1.)
+            self.assertEqual(float(MV2.sum(a, fill_value=10.)), 21.)
+            with MV2.deferred():
+                self.assertEqual(float(MV2.sum(a, fill_value=10.)), 21.)
+        finally:
+            cdms2.lazy.setBlockSize(blocksize)
+        self.assertFalse(MV2.getDeferred())
+
 
 if __name__ == "__main__":
     basetest.run()
@@ -1,3 +1,4 @@
+import threading
 import basetest
 import cdms2
 
@@ -5,5 +6,50 @@ class TestOpenFile(basetest.CDMSBaseTest):
     def test_write_to_file(self):
         f = cdms2.open("bad.nc", "w")
 
+    def test_metadata_only(self):
+        f = self.getDataFile("clt.nc")
+        g = cdms2.open(f.id, metadata_only=True)
+        self.files.append(g)
+        self.assertEqual(sorted(g.variables.keys()), sorted(f.variables.keys()))
+        self.assertEqual(g["clt"].shape, f["clt"].shape)
+        self.assertTrue(g._gridsPending_)
+        self.assertEqual(g["clt"].getGrid().id, f["clt"].getGrid().id)
+        self.assertFalse(g._gridsPending_)
+        self.assertEqual(sorted(g.grids.keys()), sorted(f.grids.keys()))
+
+    def test_metadata_only_threads(self):
+        f = self.getDataFile("clt.nc")
+        expected = dict((name, var.getGrid() and var.getGrid().id) for name, var in f.variables.items())
+
+        # A failed build leaves the grids pending, and is retried
+        g = cdms2.open(f.id, metadata_only=True)
+        self.files.append(g)
+
+        def fail():
+            raise RuntimeError("build failed")
+        g._buildGrids = fail
+        with self.assertRaises(RuntimeError):
+            g["clt"].getGrid()
+        self.assertTrue(g._gridsPending_)
+        del g.__dict__["_buildGrids"]
+
+        # Threads making first use of the grids all see them
+        barrier = threading.Barrier(8)
+        results = []
+
+        def first_use():
+            barrier.wait()
+            results.append(dict((name, var.getGrid() and var.getGrid().id)
+                                for name, var in g.variables.items()))
+        threads = [threading.Thread(target=first_use) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 8)
+        for result in results:
+            self.assertEqual(result, expected)
+        self.assertFalse(g._gridsPending_)
+
 if __name__ == "__main__":
     basetest.run()
@@ -171,6 +171,28 @@ class TestRegressions(basetest.CDMSBaseTest):
         gl = cdms2.createZonalGrid(g)
         regridded = s.regrid(gl)
 
+    def testGridClassify(self):
+        g = cdms2.createGaussianGrid(32)
+        self.assertEqual(g.classify(), ('gaussian', 32, 0))
+        self.assertEqual(cdms2.createGaussianGrid(32).classify(), ('gaussian', 32, 0))
+        self.assertEqual(cdms2.createUniformGrid(-87.5, 36, 5., 0., 72, 5.).classify(), ('uniform', 36, 0))
+
+        # The shared latitude tables are read-only
+        pts, wts, bnds = cdms2.axis.gridattr(32, 'gaussian')
+        self.assertFalse(pts.flags.writeable)
+
+        # A modified axis is classified again
+        lat = g.getLatitude()
+        lat[0] = lat[0] - 1.
+        self.assertEqual(g.classify()[0], 'generic')
+
+        # Regional subsets are found in the family
+        sub = cdms2.createRectGrid(g.getLatitude().subAxis(4, 10), g.getLongitude().subAxis(3, 9))
+        sub.id = 'sub'
+        full = cdms2.createGaussianGrid(32)
+        full.id = 'full'
+        self.assertEqual(sub.classifyInFamily([full])[1:5], ('regional', 32, 0, 'full'))
+
     def testAurore(self):
         """
         No idea what this is testing.
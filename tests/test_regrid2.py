@@ -120,6 +120,79 @@ class TestRegridding(basetest.CDMSBaseTest):
         dat2 = var.crossSectionRegrid(levout, latout)
         self.assertLess(abs(dat2[0, 0] - 3.26185), 1.e-4)
 
+    def testHorizontalCache(self):
+        from regrid2 import horizontal
+        f = cdms2.open(cdat_info.get_sampledata_path() + "/clt.nc")
+        clt = f("clt")
+        ingrid = clt.getGrid()
+        outgrid = cdms2.createGaussianGrid(32)
+        regridder = horizontal.getHorizontal(ingrid, outgrid)
+        self.assertIs(regridder, horizontal.getHorizontal(ingrid, cdms2.createGaussianGrid(32)))
+        self.assertIsNot(regridder, horizontal.getHorizontal(ingrid, cdms2.createGaussianGrid(16)))
+        # reference result on a single thread
+        workers = horizontal.getMaxWorkers()
+        horizontal.setMaxWorkers(1)
+        try:
+            expected = regridder(clt)
+        finally:
+            horizontal.setMaxWorkers(workers)
+        # save and read back
+        path = os.path.join(self.tempdir, 'clt.npz')
+        regridder.save(path)
+        result = horizontal.readHorizontal(path)(clt)
+        self.assertTrue(numpy.ma.allclose(result, expected))
+        self.assertTrue(numpy.allclose(result.getLatitude()[:], outgrid.getLatitude()[:]))
+        # regrid the time stack on several threads
+        horizontal.setMaxWorkers(3)
+        try:
+            result = regridder(clt)
+        finally:
+            horizontal.setMaxWorkers(workers)
+        self.assertTrue(numpy.ma.allclose(result, expected))
+        # a truncated entry of the cache directory is recomputed and replaced
+        size = horizontal.getCacheSize()
+        horizontal.setCacheDir(self.tempdir)
+        try:
+            horizontal.setCacheSize(0)
+            path = os.path.join(self.tempdir, horizontal.gridSignature(ingrid, outgrid) + '.npz')
+            horizontal.getHorizontal(ingrid, outgrid)
+            with open(path, 'r+b') as g:
+                g.truncate(100)
+            result = horizontal.getHorizontal(ingrid, outgrid)(clt)
+            self.assertTrue(numpy.ma.allclose(result, expected))
+            self.assertTrue(numpy.ma.allclose(horizontal.readHorizontal(path)(clt), expected))
+            self.assertEqual([name for name in os.listdir(self.tempdir) if name.endswith('.tmp')], [])
+        finally:
+            horizontal.setCacheDir(None)
+            horizontal.setCacheSize(size)
+        f.close()
+
+    def testPressureInterpolate(self):
+        from regrid2 import pressure
+        levin = numpy.array([1000., 850., 500., 200.])
+        levout = numpy.array([1100., 925., 700., 300., 100.])
+        # level in the last position, several blocks of columns
+        dat = numpy.zeros((2, 3, 4), numpy.float32)
+        dat[:] = numpy.log(levin)
+        dat[0, 1, 2] = 1.e20
+        blocksize = pressure.getBlockSize()
+        pressure.setBlockSize(8)
+        try:
+            out = pressure.interpolate(dat, levin, levout, axis=2, missingValueIn=1.e20,
+                                       missingMatch='greater')
+        finally:
+            pressure.setBlockSize(blocksize)
+        self.assertEqual(out.shape, (2, 3, 5))
+        self.assertTrue(numpy.allclose(out[1, 2], numpy.log([1000., 925., 700., 300., 200.])))
+        self.assertEqual(out[0, 1, 2], 1.e20)
+        self.assertEqual(out[0, 1, 3], 1.e20)
+        # levels below the surface are missing
+        surface = numpy.array([[950., 800., 1000.], [1000., 1000., 1000.]])
+        out = pressure.interpolate(dat, levin, levout, axis=2, surface=surface)
+        self.assertEqual(out[0, 0, 0], 1.e20)
+        self.assertEqual(out[0, 0, 1], out[1, 0, 1])
+        self.assertEqual(out[0, 1, 1], 1.e20)
+
 
     def testRegrid2Attributes(self):
         f = cdms2.open(cdat_info.get_sampledata_path()+"/clt.nc")
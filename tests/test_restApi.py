@@ -0,0 +1,90 @@
+import http.server
+import os
+import threading
+import urllib.parse
+from cdms2 import restApi
+import basetest
+
+
+class SearchHandler(http.server.BaseHTTPRequestHandler):
+    """Mock ESGF search service with two facets and <server.ndocs> datasets."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        self.server.queries.append(query)
+        self.server.clients.add(self.client_address)
+        offset = int(query.get("offset", ["0"])[0])
+        limit = int(query.get("limit", ["10"])[0])
+        docs = ""
+        for i in range(offset, min(offset + limit, self.server.ndocs)):
+            docs += ('<doc><str name="id">ds%d</str><str name="type">Dataset</str>'
+                     '<arr name="variable"><str>tas</str><str>pr</str></arr>'
+                     '<int name="number">%d</int></doc>' % (i, i))
+        body = ('<response><lst name="responseHeader"><lst name="params">'
+                '<arr name="facet.field"><str>project</str><str>variable</str></arr>'
+                '</lst></lst><result name="response" numFound="%d" start="%d">%s</result>'
+                '</response>' % (self.server.ndocs, offset, docs)).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestRestApi(basetest.CDMSBaseTest):
+    def setUp(self):
+        super(TestRestApi, self).setUp()
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), SearchHandler)
+        self.server.ndocs = 2500
+        self.server.queries = []
+        self.server.clients = set()
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.host = "http://127.0.0.1"
+        self.saved = restApi.getResponseCache()
+
+    def tearDown(self):
+        restApi.setResponseCache(*self.saved)
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        super(TestRestApi, self).tearDown()
+
+    def connect(self):
+        return restApi.esgfConnection(self.host, port=self.server.server_port, restPath="/esg-search/search")
+
+    def testPagedSearch(self):
+        conn = self.connect()
+        self.assertEqual(conn.serverOrder, ["project", "variable"])
+        datasets = conn.searchDatasets(project="CMIP5")
+        self.assertEqual([d["id"] for d in datasets], ["ds%d" % i for i in range(2500)])
+        self.assertEqual(datasets[7]["variable"], ["tas", "pr"])
+        self.assertEqual(datasets[7]["number"], 7)
+        offsets = sorted(int(q["offset"][0]) for q in self.server.queries[1:])
+        self.assertEqual(offsets, [0, 1000, 2000])
+        self.assertEqual(conn["limit"], None)
+        self.assertEqual(conn["offset"], 0)
+
+        pages = conn.request(project="CMIP5")
+        self.assertEqual([len(p.find("result")) for p in pages], [1000, 1000, 500])
+
+        # Connections are kept alive across searches
+        self.assertLessEqual(len(self.server.clients), restApi.getMaxWorkers() + 1)
+
+    def testResponseCache(self):
+        restApi.setResponseCache(os.path.join(self.tempdir, "responses"), ttl=3600)
+        conn = self.connect()
+        first = conn.searchDatasets(project="CMIP5")
+        nqueries = len(self.server.queries)
+        second = conn.searchDatasets(project="CMIP5")
+        self.assertEqual(len(self.server.queries), nqueries)
+        self.assertEqual([d["id"] for d in first], [d["id"] for d in second])
+
+        restApi.setResponseCache(os.path.join(self.tempdir, "responses"), ttl=0)
+        conn.searchDatasets(project="CMIP5")
+        self.assertEqual(len(self.server.queries), 2 * nqueries - 1)
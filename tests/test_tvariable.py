@@ -194,5 +194,94 @@ class TestTransientVariables(basetest.CDMSBaseTest):
         v_dim_attr = v.getdimattribute(0, 'bounds')
         self.assertTrue(numpy.array_equal(v_dim_attr, t_bounds))
 
+    def test_zerocopy(self):
+        # Construction around a masked array does not copy the data
+        large = numpy.ma.masked_less(numpy.arange(4000000.), 2.)
+        v = cdms2.tvariable.TransientVariable(large, copy=0)
+        self.assertTrue(numpy.shares_memory(v, large))
+        self.assertEqual(v.dtype, large.dtype)
+
+    def test_sharedaxes(self):
+        taxis = cdms2.createAxis(numpy.arange(1000.), id='time')
+        taxis.designateTime()
+        taxis.units = 'hours since 2000-1-1'
+        v1 = cdms2.createVariable(numpy.zeros(1000), axes=[taxis])
+        v2 = cdms2.createVariable(numpy.ones(1000), axes=[taxis])
+        t1 = v1.getTime()
+        t2 = v2.getTime()
+        self.assertFalse(t1 is t2)
+        self.assertTrue(numpy.shares_memory(t1[:], t2[:]))
+        self.assertEqual(t2.units, taxis.units)
+
+        # Copy on write
+        t2[0] = -1.
+        self.assertEqual(t2[0], -1.)
+        self.assertEqual(t1[0], 0.)
+        self.assertEqual(taxis[0], 0.)
+        self.assertFalse(numpy.shares_memory(t1[:], t2[:]))
+
+        # Equal axis values read again are interned
+        a1 = v1.subSlice(slice(10, 20)).getTime()
+        a2 = v1.subSlice(slice(10, 20)).getTime()
+        self.assertTrue(numpy.shares_memory(a1[:], a2[:]))
+
+    def test_tovisit(self):
+        lat = cdms2.createAxis(numpy.linspace(-60., 60., 5), id='latitude')
+        lat.designateLatitude()
+        lon = cdms2.createAxis(numpy.linspace(0., 300., 6), id='longitude')
+        lon.designateLongitude()
+        tim = cdms2.createAxis([0., 1., 2.], id='time')
+        tim.designateTime()
+        tim.units = 'days since 2000-1-1'
+        v = cdms2.createVariable(numpy.arange(90.).reshape((3, 5, 6)),
+                                 axes=[tim, lat, lon], id='v')
+        filename = os.path.join(self.tempdir, 'visit.vtk')
+        v.toVisit(filename, format='VTK')
+        npts = 30
+        for tIndex in range(3):
+            with open(os.path.join(self.tempdir, 'visit_%d.vtk' % tIndex), 'rb') as f:
+                content = f.read()
+            lines = content.split(b'\n')
+            self.assertEqual(lines[2], b'BINARY')
+            self.assertEqual(lines[4], b'DIMENSIONS 1 6 5')
+
+            # big-endian mesh coordinates follow the POINTS header, on the unit sphere
+            header = b'POINTS %d float\n' % npts
+            start = content.index(header) + len(header)
+            points = numpy.frombuffer(content, dtype='>f4', count=3 * npts, offset=start)
+            points = points.reshape((npts, 3))
+            self.assertTrue(numpy.allclose(numpy.sqrt((points ** 2).sum(axis=1)), 1.))
+            self.assertTrue(numpy.allclose(numpy.unique(points[:, 2]),
+                                           numpy.sin(numpy.radians(lat[:])), atol=1.e-6))
+
+            # big-endian point data follow the SCALARS header and lookup table
+            self.assertIn(b'SCALARS v float\nLOOKUP_TABLE default\n', content)
+            header = b'LOOKUP_TABLE default\n'
+            start = content.index(header) + len(header)
+            values = numpy.frombuffer(content, dtype='>f4', count=npts, offset=start)
+            self.assertTrue(numpy.array_equal(values, numpy.ravel(v[tIndex])))
+            self.assertEqual(content[start + 4 * npts:], b'\n')
+
+    def test_minHorizontalMask(self):
+        data = numpy.ma.masked_greater(numpy.random.random((6, 3, 4, 5)), 0.3)
+        data[:, :, 0, 0] = 1.
+        data[:, :, 1, 2] = numpy.ma.masked
+        v = cdms2.createVariable(data, id='v')
+        v.getAxis(0).designateTime()
+        v.getAxis(1).designateLevel()
+        v.getAxis(2).designateLatitude()
+        v.getAxis(3).designateLongitude()
+        expected = numpy.ma.getmaskarray(data).all(axis=(0, 1))
+        self.assertTrue(numpy.array_equal(cdms2.avariable.getMinHorizontalMask(v), expected))
+        self.assertTrue(expected[1, 2] and not expected[0, 0])
+
+        # File variables are reduced one block at a time
+        f = self.getTempFile('minmask.nc', 'w')
+        f.write(v)
+        f.close()
+        f = self.getTempFile('minmask.nc')
+        self.assertTrue(numpy.array_equal(cdms2.avariable.getMinHorizontalMask(f['v']), expected))
+
+
 if __name__ == "__main__":
     basetest.run()
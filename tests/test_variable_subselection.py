@@ -154,6 +154,19 @@ class TestVariableSubselection(basetest.CDMSBaseTest):
         #with self.assertRaises(cdms2.SelectorError):
         #    s3 = self.var.subSlice(required='lumbarsupport')
 
+    def testIterBlocks(self):
+        whole = self.var()
+        for prefetch in (True, False):
+            blocks = list(self.var.iterblocks('time', 1, prefetch=prefetch))
+            self.assertEqual(len(blocks), len(self.var.getTime()))
+            self.assertTrue(numpy.ma.allequal(MV.concatenate(blocks, axis=0), whole))
+            self.assertTrue(numpy.allclose(blocks[1].getTime()[:], self.var.getTime()[1:2]))
+            self.assertEqual(blocks[1].getLatitude().shape, self.var.getLatitude().shape)
+        blocks = list(self.var.iterblocks('latitude', 5))
+        self.assertTrue(numpy.ma.allequal(blocks[-1], whole[:, 15:]))
+        with self.assertRaises(cdms2.CDMSError):
+            self.var.iterblocks('lumbarsupport')
+
     def testSpatial(self):
         varlist = self.file.getVariables(spatial=1)
 
@@ -206,5 +219,25 @@ class TestCDTime(basetest.CDMSBaseTest):
         self.doCalTest(1582,10,4,1582,10,15,1.0)
         self.doCalTest(1582,10,15,1582,10,4,-1.0)
 
+    def testIntervalCache(self):
+        t = cdms2.createAxis(numpy.arange(24.), id='time')
+        t.designateTime()
+        t.units = 'months since 2000-1'
+        self.assertEqual(t.mapIntervalExt(('2000-3', '2000-6')), (2, 6, 1))
+        self.assertEqual(t.mapIntervalExt(('2000-3', '2000-6')), (2, 6, 1))
+        self.assertEqual(t.mapIntervalExt((cdtime.comptime(2000, 3), cdtime.comptime(2000, 6), 'co')), (2, 5, 1))
+
+        # Cached mappings are invalidated when the axis is modified
+        t.units = 'months since 1999-12'
+        self.assertEqual(t.mapIntervalExt(('2000-3', '2000-6')), (3, 7, 1))
+        t[:] = numpy.arange(1., 25.)
+        self.assertEqual(t.mapIntervalExt(('2000-3', '2000-6')), (2, 6, 1))
+        t._data_ = numpy.arange(2., 14.)
+        self.assertEqual(t.mapIntervalExt(('2000-3', '2000-6')), (1, 5, 1))
+        t._data_ = numpy.arange(1., 25.)
+        self.assertEqual(t.mapIntervalExt(('2000-3', '2000-6')), (2, 6, 1))
+        t.setBounds(numpy.array([[x - 1., x] for x in t[:]]))
+        self.assertEqual(t.mapIntervalExt((3., 3.)), (2, 3, 1))
+
 if __name__ == "__main__":
     basetest.run()